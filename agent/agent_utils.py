@@ -1,28 +1,35 @@
 """
 Utility functions for agent operations
 """
+import json
 import logging
+import re
+from typing import Optional
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 
 logger = logging.getLogger("agent_utils")
 
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
 
-def format_chat_history(messages: list) -> str:
+
+def format_chat_history(messages: list, summary: Optional[str] = None, limit: Optional[int] = 6) -> str:
     """
     Format chat history for inclusion in prompts.
     
     Args:
         messages: List of LangChain message objects (HumanMessage, AIMessage, etc.)
+        summary: Rolling summary of older turns no longer kept in messages
+        limit: Number of most recent messages to include (None for all)
         
     Returns:
         Formatted string of conversation history
     """
-    if not messages:
+    if not messages and not summary:
         return "No previous conversation."
     
-    formatted = []
-    # Only last 6 messages (3 exchanges)
-    for msg in messages[-6:]:
+    formatted = [f"Earlier in the conversation: {summary}"] if summary else []
+    # Only last 6 messages (3 exchanges) by default
+    for msg in (messages[-limit:] if limit else messages):
         # Handle LangChain message objects
         if isinstance(msg, HumanMessage):
             content = msg.content if hasattr(msg, 'content') else ""
@@ -65,3 +72,22 @@ def get_last_user_message(messages: list) -> str:
             return msg.get("content", "")
     
     return ""
+
+
+def parse_json_object(text: str) -> Optional[dict]:
+    """
+    Parse the JSON object in an LLM reply.
+    
+    Tolerates code fences or text around the object.
+    
+    Returns:
+        The parsed dict, or None if no valid object was found
+    """
+    match = _JSON_OBJECT.search(text or "")
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,353 @@
+"""
+Checkpoint retention - bounds the LangGraph checkpoint tables
+Deletes whole threads that have been idle longer than the TTL, and history
+older than the latest checkpoint of threads that have gone quiet. Runs as
+a scheduled background job and as a CLI:
+
+    python -m agent.checkpoint_retention --ttl-days 30 --keep-latest --vacuum
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+import psycopg
+from config.conf import settings
+from config.postgres import connection_kwargs, get_connection_pool
+
+logger = logging.getLogger("checkpoint_retention")
+
+
+CHECKPOINT_TABLES = ("checkpoints", "checkpoint_blobs", "checkpoint_writes")
+
+# Only one app worker prunes at a time
+ADVISORY_LOCK_KEY = 7042001
+
+# Latest checkpoint time per thread, from the "ts" LangGraph stores in each checkpoint
+IDLE_THREADS_SQL = """
+    SELECT thread_id
+    FROM checkpoints
+    WHERE thread_id > %s
+    GROUP BY thread_id
+    HAVING max((checkpoint->>'ts')::timestamptz) < now() - %s * interval '1 minute'
+    ORDER BY thread_id
+    LIMIT %s
+"""
+
+# Quiet threads that still carry more than one checkpoint
+THREADS_WITH_HISTORY_SQL = """
+    SELECT thread_id
+    FROM checkpoints
+    WHERE thread_id > %s
+    GROUP BY thread_id
+    HAVING count(*) > 1
+        AND max((checkpoint->>'ts')::timestamptz) < now() - %s * interval '1 minute'
+    ORDER BY thread_id
+    LIMIT %s
+"""
+
+# Each statement reports rows and bytes removed
+DELETE_THREAD_SQL = {
+    table: f"""
+        WITH deleted AS (
+            DELETE FROM {table} t WHERE t.thread_id = ANY(%s)
+            RETURNING pg_column_size(t.*) AS bytes
+        )
+        SELECT count(*) AS deleted_rows, coalesce(sum(bytes), 0) AS deleted_bytes FROM deleted
+    """
+    for table in CHECKPOINT_TABLES
+}
+
+# Order matters: writes and checkpoints first, then blobs no longer
+# referenced by the remaining (latest) checkpoint
+DELETE_HISTORY_SQL = {
+    "checkpoint_writes": """
+        WITH deleted AS (
+            DELETE FROM checkpoint_writes t
+            WHERE t.thread_id = ANY(%s)
+              AND t.checkpoint_id < (
+                  SELECT max(c.checkpoint_id) FROM checkpoints c
+                  WHERE c.thread_id = t.thread_id AND c.checkpoint_ns = t.checkpoint_ns
+              )
+            RETURNING pg_column_size(t.*) AS bytes
+        )
+        SELECT count(*) AS deleted_rows, coalesce(sum(bytes), 0) AS deleted_bytes FROM deleted
+    """,
+    "checkpoints": """
+        WITH deleted AS (
+            DELETE FROM checkpoints t
+            WHERE t.thread_id = ANY(%s)
+              AND t.checkpoint_id < (
+                  SELECT max(c.checkpoint_id) FROM checkpoints c
+                  WHERE c.thread_id = t.thread_id AND c.checkpoint_ns = t.checkpoint_ns
+              )
+            RETURNING pg_column_size(t.*) AS bytes
+        )
+        SELECT count(*) AS deleted_rows, coalesce(sum(bytes), 0) AS deleted_bytes FROM deleted
+    """,
+    "checkpoint_blobs": """
+        WITH deleted AS (
+            DELETE FROM checkpoint_blobs t
+            WHERE t.thread_id = ANY(%s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM checkpoints c
+                  WHERE c.thread_id = t.thread_id AND c.checkpoint_ns = t.checkpoint_ns
+                    AND c.checkpoint->'channel_versions'->>t.channel = t.version
+              )
+            RETURNING pg_column_size(t.*) AS bytes
+        )
+        SELECT count(*) AS deleted_rows, coalesce(sum(bytes), 0) AS deleted_bytes FROM deleted
+    """,
+}
+
+TABLE_SIZES_SQL = """
+    SELECT relname AS table_name, pg_total_relation_size(relid) AS bytes, n_live_tup AS live_rows,
+           n_dead_tup AS dead_rows
+    FROM pg_stat_user_tables
+    WHERE relname = ANY(%s)
+"""
+
+
+@dataclass
+class RetentionReport:
+    """What one retention run removed."""
+    threads_expired: int = 0
+    threads_pruned: int = 0
+    batches: int = 0
+    rows_deleted: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(CHECKPOINT_TABLES, 0))
+    bytes_deleted: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(CHECKPOINT_TABLES, 0))
+    duration_ms: float = 0.0
+    skipped: Optional[str] = None
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.rows_deleted.values())
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.bytes_deleted.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "total_rows": self.total_rows, "total_bytes": self.total_bytes}
+
+
+class CheckpointRetention:
+    """
+    Batched deletes over the checkpoint tables.
+
+    Work is split into batches of `batch_size` threads, each deleted in its
+    own short transaction with a pause in between, so locks stay short,
+    WAL is written in small bursts and autovacuum can keep up. Threads
+    written to within the last `min_idle_minutes` are never touched, so a
+    turn in progress can't lose the blobs of the checkpoint it is writing.
+    """
+
+    def __init__(
+        self,
+        ttl_days: float = 30,
+        keep_latest: bool = True,
+        min_idle_minutes: float = 30,
+        batch_size: int = 200,
+        batch_pause: float = 0.5,
+        interval_minutes: float = 60
+    ):
+        self.ttl_days = ttl_days
+        self.keep_latest = keep_latest
+        self.min_idle_minutes = min_idle_minutes
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.interval_minutes = interval_minutes
+        self.last_report: Optional[RetentionReport] = None
+        self.runs = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _delete_batch(self, pool, statements: Dict[str, str], thread_ids: List[str], report: RetentionReport):
+        async with pool.connection() as conn:
+            async with conn.transaction():
+                for table, statement in statements.items():
+                    cursor = await conn.execute(statement, (thread_ids,))
+                    result = await cursor.fetchone()
+                    report.rows_deleted[table] += result["deleted_rows"]
+                    report.bytes_deleted[table] += result["deleted_bytes"]
+        report.batches += 1
+
+    async def _sweep(self, pool, select_sql: str, idle_minutes: float, statements: Dict[str, str],
+                     report: RetentionReport) -> int:
+        """Walk matching threads in thread_id order, one batch at a time."""
+        done, last_thread = 0, ""
+        while True:
+            async with pool.connection() as conn:
+                cursor = await conn.execute(select_sql, (last_thread, idle_minutes, self.batch_size))
+                thread_ids = [row["thread_id"] for row in await cursor.fetchall()]
+            if not thread_ids:
+                return done
+            await self._delete_batch(pool, statements, thread_ids, report)
+            done += len(thread_ids)
+            last_thread = thread_ids[-1]
+            if len(thread_ids) < self.batch_size:
+                return done
+            await asyncio.sleep(self.batch_pause)
+
+    async def run_once(self, vacuum: bool = False) -> RetentionReport:
+        """Expire idle threads, then trim history of quiet ones."""
+        report = RetentionReport()
+        started = time.perf_counter()
+        pool = await get_connection_pool()
+        if pool is None:
+            report.skipped = "postgres not configured"
+            return report
+
+        lock_url = settings.POSTGRES_DIRECT_URL
+        if not lock_url:
+            if settings.POSTGRES_PGBOUNCER:
+                report.skipped = "POSTGRES_DIRECT_URL is required for the retention lock behind PgBouncer"
+                logger.warning(f"Checkpoint retention skipped: {report.skipped}")
+                return report
+            lock_url = settings.POSTGRES_DB_URL
+
+        # Session lock on a dedicated autocommit connection: it is never idle in a
+        # transaction (idle_in_transaction_session_timeout) and doesn't pin a pool slot
+        lock_conn = await psycopg.AsyncConnection.connect(lock_url, **connection_kwargs())
+        try:
+            cursor = await lock_conn.execute("SELECT pg_try_advisory_lock(%s) AS locked", (ADVISORY_LOCK_KEY,))
+            if not (await cursor.fetchone())["locked"]:
+                report.skipped = "another worker is running retention"
+                return report
+            try:
+                if self.ttl_days:
+                    report.threads_expired = await self._sweep(
+                        pool, IDLE_THREADS_SQL, self.ttl_days * 24 * 60, DELETE_THREAD_SQL, report
+                    )
+                if self.keep_latest:
+                    report.threads_pruned = await self._sweep(
+                        pool, THREADS_WITH_HISTORY_SQL, self.min_idle_minutes, DELETE_HISTORY_SQL, report
+                    )
+            finally:
+                await lock_conn.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+        finally:
+            # Closing the session also drops the lock if the unlock didn't get through
+            await lock_conn.close()
+
+        if vacuum:
+            # Plain VACUUM (can't run inside a transaction): makes the space
+            # reusable without an exclusive lock
+            async with pool.connection() as conn:
+                for table in CHECKPOINT_TABLES:
+                    await conn.execute(f"VACUUM (ANALYZE) {table}")
+
+        report.duration_ms = (time.perf_counter() - started) * 1000
+        self.last_report = report
+        self.runs += 1
+        logger.info(
+            f"Checkpoint retention: {report.threads_expired} threads expired, {report.threads_pruned} trimmed, "
+            f"{report.total_rows} rows / {report.total_bytes} bytes deleted in {report.duration_ms:.0f}ms"
+        )
+        return report
+
+    async def table_sizes(self) -> Dict[str, Dict[str, int]]:
+        """On-disk size and live/dead row estimates per checkpoint table."""
+        pool = await get_connection_pool()
+        if pool is None:
+            return {}
+        async with pool.connection() as conn:
+            cursor = await conn.execute(TABLE_SIZES_SQL, (list(CHECKPOINT_TABLES),))
+            return {
+                row["table_name"]: {"bytes": row["bytes"], "live_rows": row["live_rows"], "dead_rows": row["dead_rows"]}
+                for row in await cursor.fetchall()
+            }
+
+    async def _run(self):
+        logger.info(f"Checkpoint retention scheduled every {self.interval_minutes} min")
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Checkpoint retention error: {str(e)}")
+            await asyncio.sleep(self.interval_minutes * 60)
+
+    def start(self):
+        """Start the scheduled job (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "scheduled": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "last_run": self.last_report.to_dict() if self.last_report else None,
+            "tables": await self.table_sizes()
+        }
+
+
+_retention: Optional[CheckpointRetention] = None
+
+
+def get_checkpoint_retention() -> CheckpointRetention:
+    """Process-wide retention job configured from settings."""
+    global _retention
+    if _retention is None:
+        _retention = CheckpointRetention(
+            ttl_days=settings.CHECKPOINT_THREAD_TTL_DAYS,
+            keep_latest=settings.CHECKPOINT_KEEP_LATEST_ONLY,
+            min_idle_minutes=settings.CHECKPOINT_PRUNE_MIN_IDLE_MINUTES,
+            batch_size=settings.CHECKPOINT_PRUNE_BATCH_SIZE,
+            interval_minutes=settings.CHECKPOINT_RETENTION_INTERVAL_MINUTES
+        )
+    return _retention
+
+
+async def _main():
+    import argparse
+    from config.postgres import close_connection_pool
+
+    parser = argparse.ArgumentParser(description="Delete old LangGraph checkpoints")
+    parser.add_argument("--ttl-days", type=float, default=settings.CHECKPOINT_THREAD_TTL_DAYS,
+                        help="delete threads idle longer than this (0 disables)")
+    parser.add_argument("--keep-latest", action=argparse.BooleanOptionalAction,
+                        default=settings.CHECKPOINT_KEEP_LATEST_ONLY,
+                        help="keep only the latest checkpoint of quiet threads")
+    parser.add_argument("--min-idle-minutes", type=float, default=settings.CHECKPOINT_PRUNE_MIN_IDLE_MINUTES)
+    parser.add_argument("--batch-size", type=int, default=settings.CHECKPOINT_PRUNE_BATCH_SIZE)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) the tables afterwards")
+    args = parser.parse_args()
+
+    retention = CheckpointRetention(
+        ttl_days=args.ttl_days,
+        keep_latest=args.keep_latest,
+        min_idle_minutes=args.min_idle_minutes,
+        batch_size=args.batch_size
+    )
+    try:
+        before = await retention.table_sizes()
+        report = await retention.run_once(vacuum=args.vacuum)
+        after = await retention.table_sizes()
+    finally:
+        await close_connection_pool()
+
+    if report.skipped:
+        print(f"Skipped: {report.skipped}")
+        return
+    print(f"threads expired: {report.threads_expired}  threads trimmed: {report.threads_pruned}  "
+          f"batches: {report.batches}  time: {report.duration_ms:.0f}ms")
+    print(f"{'table':<18} {'rows deleted':>12} {'bytes deleted':>14} {'size before':>12} {'size after':>12}")
+    for table in CHECKPOINT_TABLES:
+        print(
+            f"{table:<18} {report.rows_deleted[table]:>12} {report.bytes_deleted[table]:>14} "
+            f"{before.get(table, {}).get('bytes', 0):>12} {after.get(table, {}).get('bytes', 0):>12}"
+        )
+    print(f"{'total':<18} {report.total_rows:>12} {report.total_bytes:>14}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,369 @@
+"""
+Email outbox - durable, idempotent background delivery of notification emails
+Tier 2 only enqueues; a background worker delivers over pooled SMTP
+connections with retries and exponential backoff, and batches requests for
+businesses with a digest policy into one email.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+from typing import Any, Dict, List, Optional
+from psycopg.types.json import Jsonb
+from agent.email_service import render_support_digest, render_support_email, send_email
+from config.conf import settings
+from config.postgres import get_connection_pool
+from utils.cache import TTLLRUCache
+
+logger = logging.getLogger("email_outbox")
+
+
+SETUP_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id BIGSERIAL PRIMARY KEY,
+        idempotency_key TEXT NOT NULL UNIQUE,
+        business_id TEXT,
+        thread_id TEXT,
+        recipient TEXT NOT NULL,
+        subject TEXT,
+        html_body TEXT,
+        payload JSONB,
+        digest_interval_minutes INT,
+        digest_max_requests INT,
+        digest_id BIGINT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INT NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        last_error TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        sent_at TIMESTAMPTZ
+    )
+    """,
+    # Tables created before digests/payloads existed
+    """
+    ALTER TABLE email_outbox
+        ADD COLUMN IF NOT EXISTS payload JSONB,
+        ADD COLUMN IF NOT EXISTS digest_interval_minutes INT,
+        ADD COLUMN IF NOT EXISTS digest_max_requests INT,
+        ADD COLUMN IF NOT EXISTS digest_id BIGINT,
+        ALTER COLUMN subject DROP NOT NULL,
+        ALTER COLUMN html_body DROP NOT NULL
+    """,
+    "CREATE INDEX IF NOT EXISTS email_outbox_due_idx ON email_outbox (status, next_attempt_at)"
+]
+
+# Rows are leased while being delivered; a worker that dies mid-send
+# releases its rows when the lease expires.
+CLAIM_SQL = """
+    UPDATE email_outbox
+    SET status = 'sending', attempts = attempts + 1,
+        next_attempt_at = now() + %s * interval '1 second'
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE status IN ('pending', 'sending') AND next_attempt_at <= now()
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, idempotency_key, recipient, subject, html_body, attempts
+"""
+
+# Digest groups whose policy says it's time to send: enough requests
+# collected, or the oldest one has waited the configured interval
+DUE_DIGESTS_SQL = """
+    SELECT business_id, recipient
+    FROM email_outbox
+    WHERE status = 'digest'
+    GROUP BY business_id, recipient
+    HAVING (max(digest_max_requests) IS NOT NULL AND count(*) >= max(digest_max_requests))
+        OR (max(digest_interval_minutes) IS NOT NULL
+            AND min(created_at) <= now() - max(digest_interval_minutes) * interval '1 minute')
+"""
+
+TAKE_DIGEST_SQL = """
+    UPDATE email_outbox SET status = 'digested'
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE status = 'digest' AND business_id IS NOT DISTINCT FROM %s AND recipient = %s
+        ORDER BY id
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, payload
+"""
+
+def make_idempotency_key(thread_id: str, request_id: str) -> str:
+    """One email per conversation thread and Tier 2 support request."""
+    return hashlib.sha256(f"{thread_id}\n{request_id}".encode("utf-8")).hexdigest()
+
+
+class EmailOutbox:
+    """
+    Postgres-backed outbox drained by a background task.
+
+    Claims use FOR UPDATE SKIP LOCKED, so several app workers can drain the
+    same table without sending an email twice. Items queued with a digest
+    policy are held (status "digest") until the policy is due, then merged
+    into a single pending email. Without Postgres, emails are delivered
+    immediately in a background task with an in-memory idempotency window.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 20,
+        max_attempts: int = 5,
+        base_delay: float = 5.0,
+        max_delay: float = 600.0,
+        poll_interval: float = 5.0,
+        lease_seconds: int = 300
+    ):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._table_ready = False
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._background: set = set()
+        self._recent_keys = TTLLRUCache(max_entries=10000, default_ttl=86400)
+        self.counters = {"queued": 0, "duplicates": 0, "digests": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    async def _get_pool(self):
+        pool = await get_connection_pool()
+        if pool is not None and not self._table_ready:
+            async with pool.connection() as conn:
+                for statement in SETUP_SQL:
+                    await conn.execute(statement)
+            self._table_ready = True
+        return pool
+
+    def _backoff(self, attempts: int) -> float:
+        """Full-jitter exponential backoff in seconds."""
+        return random.uniform(self.base_delay, min(self.max_delay, self.base_delay * (2 ** attempts)))
+
+    async def enqueue(
+        self,
+        idempotency_key: str,
+        business_id: Optional[str],
+        thread_id: Optional[str],
+        recipient: str,
+        subject: Optional[str],
+        html_body: Optional[str],
+        payload: Optional[Dict[str, Any]] = None,
+        digest: Optional[Dict[str, int]] = None
+    ) -> bool:
+        """
+        Queue an email for delivery.
+
+        Args:
+            subject, html_body: Rendered email (None for digest items)
+            payload: Support request data, used to render digests
+            digest: {"interval_minutes", "max_requests"} to hold the item for a digest
+
+        Returns:
+            True if queued now or already queued under the same key
+        """
+        pool = await self._get_pool()
+
+        if html_body is None:
+            if pool is None or digest is None:
+                subject, html_body = render_support_email(payload)
+
+        if pool is None:
+            if self._recent_keys.get(idempotency_key):
+                self.counters["duplicates"] += 1
+                return True
+            self._recent_keys.set(idempotency_key, True)
+            self.counters["queued"] += 1
+            task = asyncio.create_task(self._deliver_without_store(recipient, subject, html_body))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return True
+
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "INSERT INTO email_outbox (idempotency_key, business_id, thread_id, recipient, subject, html_body, "
+                "payload, status, digest_interval_minutes, digest_max_requests) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+                "ON CONFLICT (idempotency_key) DO NOTHING RETURNING id",
+                (
+                    idempotency_key, business_id, thread_id, recipient, subject, html_body,
+                    Jsonb(payload) if payload is not None else None,
+                    "digest" if digest else "pending",
+                    (digest or {}).get("interval_minutes"),
+                    (digest or {}).get("max_requests")
+                )
+            )
+            inserted = await cursor.fetchone()
+
+        if inserted is None:
+            self.counters["duplicates"] += 1
+            logger.info(f"Email for thread {thread_id} already queued - skipping duplicate")
+        else:
+            self.counters["queued"] += 1
+            logger.info(f"Queued email {inserted['id']} to {recipient}{' for digest' if digest else ''}")
+            self._wake.set()
+        return True
+
+    async def _deliver_without_store(self, recipient: str, subject: str, html_body: str):
+        """Fallback delivery with retries when no Postgres outbox is available."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await send_email(recipient, subject, html_body)
+                self.counters["sent"] += 1
+                return
+            except Exception as e:
+                if attempt >= self.max_attempts:
+                    self.counters["failed"] += 1
+                    logger.error(f"ERROR: Giving up on email to {recipient}: {str(e)}")
+                    return
+                self.counters["retried"] += 1
+                delay = self._backoff(attempt)
+                logger.warning(f"Email to {recipient} failed ({str(e)}), retry {attempt}/{self.max_attempts - 1} in {delay:.0f}s")
+                await asyncio.sleep(delay)
+
+    async def flush_digests(self, pool) -> int:
+        """Merge due digest items into one pending email per business; returns emails created."""
+        async with pool.connection() as conn:
+            cursor = await conn.execute(DUE_DIGESTS_SQL)
+            groups = await cursor.fetchall()
+
+        created = 0
+        for group in groups:
+            async with pool.connection() as conn:
+                async with conn.transaction():
+                    cursor = await conn.execute(TAKE_DIGEST_SQL, (group["business_id"], group["recipient"]))
+                    items = await cursor.fetchall()
+                    if not items:
+                        continue  # another worker took them
+
+                    ids = sorted(item["id"] for item in items)
+                    subject, html_body = render_support_digest([item["payload"] for item in items])
+                    key = "digest:" + hashlib.sha256(",".join(map(str, ids)).encode("utf-8")).hexdigest()
+                    cursor = await conn.execute(
+                        "INSERT INTO email_outbox (idempotency_key, business_id, recipient, subject, html_body) "
+                        "VALUES (%s, %s, %s, %s, %s) RETURNING id",
+                        (key, group["business_id"], group["recipient"], subject, html_body)
+                    )
+                    digest_id = (await cursor.fetchone())["id"]
+                    await conn.execute(
+                        "UPDATE email_outbox SET digest_id = %s WHERE id = ANY(%s)",
+                        (digest_id, ids)
+                    )
+
+            created += 1
+            self.counters["digests"] += 1
+            logger.info(f"Digest {digest_id} to {group['recipient']} covers {len(ids)} requests")
+        return created
+
+    async def _claim(self, pool) -> List[Dict[str, Any]]:
+        async with pool.connection() as conn:
+            cursor = await conn.execute(CLAIM_SQL, (self.lease_seconds, self.batch_size))
+            return await cursor.fetchall()
+
+    async def _deliver(self, pool, row: Dict[str, Any]):
+        try:
+            await send_email(row["recipient"], row["subject"], row["html_body"])
+        except Exception as e:
+            if row["attempts"] >= self.max_attempts:
+                status, delay = "failed", 0.0
+                self.counters["failed"] += 1
+                logger.error(f"ERROR: Giving up on email {row['id']} after {row['attempts']} attempts: {str(e)}")
+            else:
+                status, delay = "pending", self._backoff(row["attempts"])
+                self.counters["retried"] += 1
+                logger.warning(f"Email {row['id']} failed ({str(e)}), retrying in {delay:.0f}s")
+            async with pool.connection() as conn:
+                await conn.execute(
+                    "UPDATE email_outbox SET status = %s, last_error = %s, "
+                    "next_attempt_at = now() + %s * interval '1 second' WHERE id = %s",
+                    (status, str(e)[:1000], delay, row["id"])
+                )
+            return
+
+        self.counters["sent"] += 1
+        async with pool.connection() as conn:
+            await conn.execute(
+                "UPDATE email_outbox SET status = 'sent', sent_at = now(), last_error = NULL WHERE id = %s",
+                (row["id"],)
+            )
+
+    async def run_once(self) -> int:
+        """Claim and deliver one batch of due emails; returns how many were claimed."""
+        pool = await self._get_pool()
+        if pool is None:
+            return 0
+        await self.flush_digests(pool)
+        rows = await self._claim(pool)
+        if rows:
+            # Bounded by the SMTP pool size
+            await asyncio.gather(*(self._deliver(pool, row) for row in rows))
+        return len(rows)
+
+    async def _run(self):
+        logger.info("Email outbox worker started")
+        while True:
+            try:
+                claimed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+                claimed = 0
+
+            if claimed >= self.batch_size:
+                continue  # more may be due right away
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the background delivery task (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker; emails still pending stay in the table for the next start."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Delivery counters for this worker plus outbox row counts by status."""
+        by_status = None
+        pool = await get_connection_pool()
+        if pool is not None and self._table_ready:
+            async with pool.connection() as conn:
+                cursor = await conn.execute("SELECT status, count(*) AS n FROM email_outbox GROUP BY status")
+                by_status = {row["status"]: row["n"] for row in await cursor.fetchall()}
+        return {
+            "backend": "postgres" if self._table_ready else "memory",
+            "worker_running": self._task is not None and not self._task.done(),
+            **self.counters,
+            "by_status": by_status
+        }
+
+
+_outbox: Optional[EmailOutbox] = None
+
+
+def get_outbox() -> EmailOutbox:
+    """Process-wide email outbox."""
+    global _outbox
+    if _outbox is None:
+        _outbox = EmailOutbox(
+            batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+            poll_interval=settings.EMAIL_OUTBOX_POLL_SECONDS
+        )
+    return _outbox
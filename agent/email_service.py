@@ -1,16 +1,203 @@
 """
 Email service for sending support requests to business owners
 """
+import asyncio
 import logging
 import smtplib
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 from config.conf import settings
+from repositories.business_cache import get_business_cache
 
 logger = logging.getLogger("email_service")
 
 
-async def send_support_email(
+class _PooledSMTP:
+    """One authenticated SMTP connection, reused across messages."""
+
+    def __init__(self, max_idle: float):
+        self.max_idle = max_idle
+        self.server: Optional[smtplib.SMTP_SSL] = None
+        self.last_used = 0.0
+
+    def _connect(self):
+        self.close()
+        self.server = smtplib.SMTP_SSL(settings.EMAIL_HOST, settings.EMAIL_PORT_SSL, timeout=30)
+        self.server.login(settings.EMAIL_FROM, settings.EMAIL_PASSWORD)
+
+    def _alive(self) -> bool:
+        if self.server is None:
+            return False
+        if time.monotonic() - self.last_used < self.max_idle:
+            return True
+        # Idle for a while - servers drop idle sessions, so check before reuse
+        try:
+            return self.server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def send(self, msg: MIMEMultipart):
+        """Blocking send (run in a worker thread); reconnects once if the session dropped."""
+        if not self._alive():
+            self._connect()
+        try:
+            self.server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self._connect()
+            self.server.send_message(msg)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+
+class SMTPConnectionPool:
+    """
+    Small pool of authenticated SMTP connections.
+
+    Connections are opened lazily and kept between messages, so the TLS
+    handshake and login are paid once per connection rather than per email.
+    All blocking SMTP I/O runs in worker threads.
+    """
+
+    def __init__(self, size: int, max_idle: float = 60.0):
+        self.size = size
+        self._connections = [_PooledSMTP(max_idle) for _ in range(size)]
+        self._available: Optional[asyncio.Queue] = None
+
+    def _queue(self) -> asyncio.Queue:
+        if self._available is None:
+            self._available = asyncio.Queue()
+            for connection in self._connections:
+                self._available.put_nowait(connection)
+        return self._available
+
+    async def send(self, msg: MIMEMultipart):
+        """Send a message over a pooled connection; raises on failure."""
+        available = self._queue()
+        connection = await available.get()
+        try:
+            await asyncio.to_thread(connection.send, msg)
+        except Exception:
+            # Don't hand a broken session to the next sender
+            await asyncio.to_thread(connection.close)
+            raise
+        finally:
+            available.put_nowait(connection)
+
+    async def close(self):
+        for connection in self._connections:
+            await asyncio.to_thread(connection.close)
+
+
+_smtp_pool: Optional[SMTPConnectionPool] = None
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Process-wide SMTP connection pool."""
+    global _smtp_pool
+    if _smtp_pool is None:
+        _smtp_pool = SMTPConnectionPool(
+            size=settings.EMAIL_SMTP_POOL_SIZE,
+            max_idle=settings.EMAIL_SMTP_MAX_IDLE_SECONDS
+        )
+    return _smtp_pool
+
+
+async def send_email(recipient: str, subject: str, html_body: str):
+    """
+    Deliver one HTML email through the SMTP pool.
+
+    Raises:
+        smtplib.SMTPException / OSError on delivery failure
+    """
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = settings.EMAIL_FROM
+    msg['To'] = recipient
+    msg.attach(MIMEText(html_body, 'html'))
+
+    logger.info(f"Sending email to {recipient}")
+    await get_smtp_pool().send(msg)
+    logger.info(f"SUCCESS: Email sent to {recipient}")
+
+
+# Templates are compiled once at import and reused for every email
+_templates = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / "templates"),
+    autoescape=select_autoescape(["html"])
+)
+SUPPORT_REQUEST_TEMPLATE = _templates.get_template("support_request.html")
+SUPPORT_DIGEST_TEMPLATE = _templates.get_template("support_digest.html")
+
+
+def render_support_email(request: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Render the email for a single support request.
+
+    Args:
+        request: business_name, user_email, user_phone, conversation_summary,
+            support_request (and optionally received_at)
+
+    Returns:
+        (subject, html_body)
+    """
+    subject = f"SharpChat AI - Customer Support Request for {request['business_name']}"
+    return subject, SUPPORT_REQUEST_TEMPLATE.render(request=request)
+
+
+def render_support_digest(requests: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    Render one email covering several support requests for the same business.
+
+    Returns:
+        (subject, html_body)
+    """
+    if len(requests) == 1:
+        return render_support_email(requests[0])
+    business_name = requests[0]["business_name"]
+    subject = f"SharpChat AI - {len(requests)} Customer Support Requests for {business_name}"
+    return subject, SUPPORT_DIGEST_TEMPLATE.render(requests=requests)
+
+
+async def get_digest_policy(business_id: str) -> Optional[Dict[str, int]]:
+    """
+    The business's notification digest policy, if it opted in.
+
+    Stored on the business profile as
+    notificationDigest: {"interval_minutes": N, "max_requests": M};
+    either limit alone is enough.
+    """
+    try:
+        business = await get_business_cache().get(business_id)
+    except Exception as e:
+        logger.error(f"Error fetching digest policy: {str(e)}")
+        return None
+
+    policy = (business or {}).get("notificationDigest") or {}
+    interval_minutes = policy.get("interval_minutes") or None
+    max_requests = policy.get("max_requests") or None
+    if not interval_minutes and not max_requests:
+        return None
+    return {"interval_minutes": interval_minutes, "max_requests": max_requests}
+
+
+async def queue_support_email(
+    thread_id: str,
+    request_id: str,
+    business_id: str,
     business_name: str,
     business_email: str,
     user_email: str,
@@ -19,9 +206,17 @@ async def send_support_email(
     support_request: str
 ) -> bool:
     """
-    Send email to business owner about customer support request.
+    Queue an email to the business owner about a customer support request.
+    
+    Delivery happens in the background through the email outbox. Queueing
+    is idempotent per thread and request ID, so retrying a turn never sends
+    a second email for the same request. Businesses with a digest policy get
+    their requests batched into one email instead.
     
     Args:
+        thread_id: Conversation thread ID
+        request_id: Tier 2 support request ID (with thread_id, the idempotency key)
+        business_id: Business ID
         business_name: Name of the business
         business_email: Business owner's email
         user_email: Customer's email
@@ -30,118 +225,35 @@ async def send_support_email(
         support_request: What the customer needs
         
     Returns:
-        True if email sent successfully, False otherwise
+        True if the email was queued (or already queued before), False otherwise
     """
+    from agent.email_outbox import get_outbox, make_idempotency_key
+    
     try:
-        # Create email
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"SharpChat AI - Customer Support Request for {business_name}"
-        msg['From'] = settings.EMAIL_FROM
-        msg['To'] = business_email
-        
-        # Email body (HTML)
-        html_body = f"""
-        <html>
-<head>
-  <meta charset="UTF-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-</head>
-<body style="margin: 0; padding: 0; background-color: #fafafa; font-family: -apple-system, BlinkMacSystemFont, 'SF Pro Display', 'Helvetica Neue', Arial, sans-serif;">
-  <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #fafafa; padding: 40px 20px;">
-    <tr>
-      <td align="center">
-        <table width="600" cellpadding="0" cellspacing="0" style="background-color: #ffffff; border-radius: 12px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.04);">
-          <tr>
-            <td style="padding: 32px 40px 24px; background: #155dfc; display: flex; align-items: center; justify-content: space-between;">
-              <div>
-                <h1 style="margin: 0; color: #ffffff; font-size: 22px; font-weight: 600; letter-spacing: -0.3px;">
-                  New Support Request
-                </h1>
-                <p style="margin: 8px 0 0; color: rgba(255,255,255,0.9); font-size: 14px; font-weight: 400;">
-                  A customer needs your attention
-                </p>
-              </div>
-              <img src="https://rain-meta-hack-web.vercel.app/logo.jpeg" alt="SharpChat Logo" width="100" style="display: block; border-radius: 24px;">
-            </td>
-          </tr>
-          <tr>
-            <td style="padding: 32px 40px 0;">
-              <table width="100%" cellpadding="0" cellspacing="0">
-                <tr>
-                  <td style="padding: 12px 0; border-bottom: 1px solid #f5f5f7;">
-                    <span style="color: #86868b; font-size: 13px; font-weight: 500;  letter-spacing: 0.5px;">Customer Email</span>
-                    <p style="margin: 4px 0 0; color: #1d1d1f; font-size: 15px; font-weight: 400;">
-                      <a href="mailto:{user_email}" style="color: #0071e3; text-decoration: none;">{user_email}</a>
-                    </p>
-                  </td>
-                </tr>
-                <tr>
-                  <td style="padding: 12px 0;">
-                    <span style="color: #86868b; font-size: 13px; font-weight: 500;  letter-spacing: 0.5px;">Customer Phone</span>
-                    <p style="margin: 4px 0 0; color: #1d1d1f; font-size: 15px; font-weight: 400;">
-                      <a href="tel:{user_phone}" style="color: #0071e3; text-decoration: none;">{user_phone}</a>
-                    </p>
-                  </td>
-                </tr>
-              </table>
-            </td>
-          </tr>
-          <tr>
-            <td style="padding: 32px 40px 0;">
-              <h2 style="margin: 0 0 12px; color: #1d1d1f; font-size: 17px; font-weight: 600; letter-spacing: -0.2px;">
-                Request
-              </h2>
-              <div style="background-color: #155dfc1a; padding: 16px 20px; border-radius: 6px;">
-                <p style="margin: 0; color: #1d1d1f; font-size: 15px; line-height: 1.5;">
-                  {support_request}
-                </p>
-              </div>
-            </td>
-          </tr>
-          <tr>
-            <td style="padding: 32px 40px;">
-              <h2 style="margin: 0 0 12px; color: #1d1d1f; font-size: 17px; font-weight: 600; letter-spacing: -0.2px;">
-                Conversation History
-              </h2>
-              <div style="background-color: #155dfc1a; padding: 20px; border-radius: 8px; font-size: 14px; line-height: 1.6; color: #1d1d1f; white-space: pre-wrap;">
-                {conversation_summary}
-              </div>
-            </td>
-          </tr>
-          <tr>
-            <td style="padding: 0 40px 32px;">
-              <div style="border-top: 1px solid #f5f5f7; padding-top: 24px;">
-                <p style="margin: 0; color: #86868b; font-size: 13px; line-height: 1.5;">
-                  Sent via SharpChat AI, <a href="https://rain-meta-hack-web.vercel.app/" target="_blank" style="color: #0071e3; text-decoration: none;">CLICK TO REGISTER YOUR BUSINESS WITH US.</a>
-                </p>
-                <p style="margin: 8px 0 0; color: #86868b; font-size: 13px; line-height: 1.5;">
-                  Reply to <a href="mailto:{user_email}" style="color: #0071e3; text-decoration: none;">{user_email}</a> or call <a href="tel:{user_phone}" style="color: #0071e3; text-decoration: none;">{user_phone}</a>
-                </p>
-              </div>
-            </td>
-          </tr>
-        </table>
-      </td>
-    </tr>
-  </table>
-</body>
-
-</html>
-        """
-        
-        # Attach HTML body
-        msg.attach(MIMEText(html_body, 'html'))
-        
-        # Send email
-        logger.info(f"Sending support email to {business_email}")
+        request = {
+            "business_name": business_name,
+            "user_email": user_email,
+            "user_phone": user_phone,
+            "conversation_summary": conversation_summary,
+            "support_request": support_request,
+            "received_at": datetime.now(timezone.utc).strftime("%d %b %Y, %H:%M UTC")
+        }
+        digest = await get_digest_policy(business_id)
         
-        with smtplib.SMTP_SSL(settings.EMAIL_HOST, settings.EMAIL_PORT_SSL) as server:
-            server.login(settings.EMAIL_FROM, settings.EMAIL_PASSWORD)
-            server.send_message(msg)
+        # Digest items are rendered together when the digest is flushed
+        subject, html_body = render_support_email(request) if digest is None else (None, None)
         
-        logger.info(f"SUCCESS: Email sent to {business_email}")
-        return True
+        return await get_outbox().enqueue(
+            idempotency_key=make_idempotency_key(thread_id, request_id),
+            business_id=business_id,
+            thread_id=thread_id,
+            recipient=business_email,
+            subject=subject,
+            html_body=html_body,
+            payload=request,
+            digest=digest
+        )
         
     except Exception as e:
-        logger.error(f"ERROR: Failed to send email: {str(e)}")
+        logger.error(f"ERROR: Failed to queue email: {str(e)}")
         return False
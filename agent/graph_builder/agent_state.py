@@ -7,9 +7,12 @@ class AgentState(TypedDict):
     """State for the agent graph"""
     # Input
     messages: Annotated[List, add_messages]  # Conversation history
+    conversation_summary: Optional[str]  # Older turns folded out of messages (windowed memory)
     business_id: str
+    thread_id: str
     business_name: str
     business_email: str
+    streaming: bool  # this turn's reply is streamed to the client token by token
     
     # User contact info (for Tier 2)
     user_email: Optional[str]
@@ -17,7 +20,10 @@ class AgentState(TypedDict):
     preferred_contact_method: Optional[str]  # "email", "phone", or "both"
     
     # Routing
-    route: Optional[str]  # "tier1", "tier2", or "conversation"
+    route: Optional[str]  # "tier1", "tier2", "conversation", or "tier1+tier2" (both, in parallel)
     
     # Tier 2 state
     email_sent: bool
+    tier2_pending: bool  # contact collection open; next turn skips the supervisor
+    tier2_turns: int  # collection turns since the supervisor last ran
+    tier2_request_id: Optional[str]  # open support request; keys the outbox email, cleared once queued
@@ -0,0 +1,278 @@
+"""
+Write-behind checkpoint cache in front of AsyncPostgresSaver
+Recently active threads are served from memory, and checkpoint writes are
+flushed to Postgres in the background instead of on the request path.
+"""
+import asyncio
+import copy
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from utils.cache import TTLLRUCache
+
+logger = logging.getLogger("checkpoint_cache")
+
+LATEST_ID_SQL = (
+    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s "
+    "ORDER BY checkpoint_id DESC LIMIT 1"
+)
+
+ThreadKey = Tuple[str, str]  # (thread_id, checkpoint_ns)
+
+
+@dataclass
+class _PendingPut:
+    """One aput not yet written to Postgres, with the writes made against it."""
+    config: RunnableConfig
+    checkpoint: Checkpoint
+    metadata: CheckpointMetadata
+    new_versions: ChannelVersions
+    writes: List[Tuple[RunnableConfig, Sequence[Tuple[str, Any]], str, str]] = field(default_factory=list)
+
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Wraps a Postgres saver with a per-thread LRU of the latest checkpoint.
+
+    Reads of the latest checkpoint are served from the cache. Writes update
+    the cache and return at once; a background task flushes them to
+    Postgres at most `flush_interval` seconds later (the durability bound:
+    a crash loses at most that much). Every checkpoint is written, in
+    order and with its own writes, so each parent_checkpoint_id points at
+    a stored checkpoint and history stays complete.
+
+    Another worker may pick up the same thread (no sticky routing). With
+    `validate` on, each cache hit is checked against the newest
+    checkpoint_id in Postgres - a one-row primary-key lookup instead of
+    loading and deserializing the checkpoint - and a newer one written
+    elsewhere invalidates the entry. Writes still pending here are only
+    visible to other workers after the next flush.
+    """
+
+    def __init__(
+        self,
+        inner: BaseCheckpointSaver,
+        pool,
+        max_threads: int = 1000,
+        flush_interval: float = 0.5,
+        validate: bool = True
+    ):
+        super().__init__(serde=inner.serde)
+        self.inner = inner
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.validate = validate
+        self._latest = TTLLRUCache(max_entries=max_threads)
+        self._pending: Dict[ThreadKey, List[_PendingPut]] = defaultdict(list)
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {
+            "hits": 0, "misses": 0, "stale": 0, "puts": 0, "flushed": 0,
+            "flushes": 0, "flush_errors": 0, "last_flush_ms": 0.0
+        }
+
+    @staticmethod
+    def _key(config: RunnableConfig) -> ThreadKey:
+        configurable = config["configurable"]
+        return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+    def get_next_version(self, current, channel):
+        return self.inner.get_next_version(current, channel)
+
+    # Reads
+
+    async def _is_stale(self, key: ThreadKey, cached: CheckpointTuple) -> bool:
+        if not self.validate or self.pool is None:
+            return False
+        async with self.pool.connection() as conn:
+            cursor = await conn.execute(LATEST_ID_SQL, key)
+            row = await cursor.fetchone()
+        # Checkpoint ids are time-ordered (uuid6); ours are never behind what we flushed
+        return row is not None and row["checkpoint_id"] > cached.checkpoint["id"]
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        key = self._key(config)
+        checkpoint_id = get_checkpoint_id(config)
+        cached = self._latest.get(key)
+
+        if cached is not None and checkpoint_id in (None, cached.checkpoint["id"]):
+            if await self._is_stale(key, cached):
+                self.counters["stale"] += 1
+                self._latest.delete(key)
+                logger.info(f"Thread {key[0]} was updated by another worker - reloading")
+            else:
+                self.counters["hits"] += 1
+                # Callers get their own copy; the graph mutates channel values
+                return copy.deepcopy(cached)
+
+        self.counters["misses"] += 1
+        if self._pending.get(key):
+            await self.flush()
+        result = await self.inner.aget_tuple(config)
+        if result is not None and checkpoint_id is None:
+            self._latest.set(key, copy.deepcopy(result))
+        return result
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        await self.flush()
+        async for item in self.inner.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    # Writes
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        key = self._key(config)
+        checkpoint = copy.deepcopy(checkpoint)
+        self._pending[key].append(_PendingPut(config, checkpoint, metadata, dict(new_versions)))
+
+        next_config = {
+            "configurable": {"thread_id": key[0], "checkpoint_ns": key[1], "checkpoint_id": checkpoint["id"]}
+        }
+        parent_config = None
+        if config["configurable"].get("checkpoint_id"):
+            parent_config = {
+                "configurable": {
+                    "thread_id": key[0], "checkpoint_ns": key[1],
+                    "checkpoint_id": config["configurable"]["checkpoint_id"]
+                }
+            }
+        self._latest.set(key, CheckpointTuple(
+            config=next_config,
+            checkpoint=checkpoint,
+            metadata=metadata,
+            parent_config=parent_config,
+            pending_writes=[]
+        ))
+        self.counters["puts"] += 1
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        key = self._key(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        cached = self._latest.get(key)
+        if cached is not None and cached.checkpoint["id"] == checkpoint_id:
+            cached.pending_writes.extend(
+                (task_id, channel, copy.deepcopy(value)) for channel, value in writes
+            )
+
+        for pending in reversed(self._pending.get(key, ())):
+            if pending.checkpoint["id"] == checkpoint_id:
+                pending.writes.append((config, copy.deepcopy(writes), task_id, task_path))
+                return
+        # Checkpoint already flushed - store the writes directly
+        await self.inner.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        for key in [key for key in self._pending if key[0] == thread_id]:
+            self._pending.pop(key, None)
+            self._latest.delete(key)
+        self._latest.delete((thread_id, ""))
+        await self.inner.adelete_thread(thread_id)
+
+    # Flushing
+
+    async def _flush_thread(self, puts: List[_PendingPut]):
+        """
+        Write a thread's pending checkpoints oldest first, each followed by its writes.
+
+        Written puts are removed from `puts`, so after a failure it holds
+        only what still has to be retried.
+        """
+        while puts:
+            pending = puts[0]
+            await self.inner.aput(pending.config, pending.checkpoint, pending.metadata, pending.new_versions)
+            for config, writes, task_id, task_path in pending.writes:
+                await self.inner.aput_writes(config, writes, task_id, task_path)
+            puts.pop(0)
+            self.counters["flushed"] += 1
+
+    async def flush(self):
+        """Write everything pending to Postgres; failed threads are kept for the next flush."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, defaultdict(list)
+            started = time.perf_counter()
+
+            results = await asyncio.gather(
+                *(self._flush_thread(puts) for puts in batch.values()),
+                return_exceptions=True
+            )
+            for (key, puts), result in zip(batch.items(), results):
+                if isinstance(result, Exception):
+                    self.counters["flush_errors"] += 1
+                    logger.error(f"Checkpoint flush failed for thread {key[0]}: {result}")
+                    # Keep order: unwritten puts go before anything queued meanwhile
+                    self._pending[key] = puts + self._pending.get(key, [])
+
+            self.counters["flushes"] += 1
+            self.counters["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Checkpoint flusher error: {e}")
+
+    def start(self):
+        """Start the background flusher (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flusher and write out everything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "threads_cached": len(self._latest),
+            "max_threads": self._latest.max_entries,
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None,
+            "pending_threads": len(self._pending),
+            "pending_puts": sum(len(puts) for puts in self._pending.values()),
+            "flush_interval_ms": self.flush_interval * 1000
+        }
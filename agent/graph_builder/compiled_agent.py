@@ -1,65 +1,63 @@
 """
 LangGraph compiled agent with state management and memory
 """
+import asyncio
 import logging
+from typing import List, Union
+from langchain_core.messages import AIMessage
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from psycopg_pool import AsyncConnectionPool
-from psycopg.rows import dict_row
 from agent.graph_builder.agent_state import AgentState
+from agent.graph_builder.checkpoint_cache import CachedCheckpointSaver
 from agent.sub_agent.conversation_agent import conversation_agent
 from agent.sub_agent.tier1 import Tier1
 from agent.sub_agent.tier2 import Tier2
-from agent.sub_agent.router import route_query
+from agent.sub_agent.router import MULTI_ROUTE, merge_replies, route_query
+from agent.sub_agent.contact_extraction import extract_contacts
+from agent.telemetry import traced_node
 from config.conf import settings
+from config.postgres import get_connection_pool, close_connection_pool
 
 logger = logging.getLogger("compiled_agent")
 
 
 _checkpointer = None
-_connection_pool = None
 compiled_agent = None
 db_initialized = False
+# Startup warm-up and early requests may race to build the graph
+_build_lock = asyncio.Lock()
 
 
 async def get_checkpointer():
-    """Get or create a PostgreSQL checkpointer with connection pooling."""
-    global _checkpointer, _connection_pool, db_initialized
+    """Get or create a PostgreSQL checkpointer on the shared connection pool."""
+    global _checkpointer, db_initialized
     
     # Return existing instance if already initialized
     if db_initialized and _checkpointer is not None:
         return _checkpointer
     
-    db_url = settings.POSTGRES_DB_URL
-    
-    if not db_url:
-        logger.warning("⚠️ POSTGRES_DB_URL not found. Running without memory...")
-        return None
-    
     try:
-        logger.info("Initializing database connection pool...")
-        
-        # Create connection pool
-        connection_kwargs = {
-            "autocommit": True,
-            "prepare_threshold": 0,
-            "row_factory": dict_row
-        }
-        
-        _connection_pool = AsyncConnectionPool(
-            conninfo=db_url,
-            max_size=20,
-            kwargs=connection_kwargs,
-            open=False
-        )
+        connection_pool = await get_connection_pool()
         
-        await _connection_pool.open()
-        logger.info("✅ Database connection pool established")
+        if connection_pool is None:
+            logger.warning("⚠️ Running without memory...")
+            return None
         
         # Initialize checkpointer
-        _checkpointer = AsyncPostgresSaver(conn=_connection_pool)
+        _checkpointer = AsyncPostgresSaver(conn=connection_pool)
         await _checkpointer.setup()
         
+        if settings.CHECKPOINT_CACHE_ENABLED:
+            _checkpointer = CachedCheckpointSaver(
+                _checkpointer,
+                connection_pool,
+                max_threads=settings.CHECKPOINT_CACHE_MAX_THREADS,
+                flush_interval=settings.CHECKPOINT_FLUSH_INTERVAL_MS / 1000,
+                validate=settings.CHECKPOINT_CACHE_VALIDATE
+            )
+            _checkpointer.start()
+            logger.info("✅ Write-behind checkpoint cache enabled")
+        
         # Mark DB as initialized
         db_initialized = True
         logger.info("✅ Checkpointer setup completed")
@@ -84,76 +82,133 @@ async def build_agent_graph():
         if compiled_agent is not None:
             return compiled_agent
         
-        # Initialize checkpointer first
-        checkpointer = await get_checkpointer()
-        
-        # Define should_continue function for routing
-        def should_continue(state: AgentState) -> str:
-            """
-            Routing function that reads the route from state.
-            Used as conditional edge function.
-            """
-            route = state.get("route", "conversation")
-            # Map route to node names
-            if route == "tier1":
-                return "Tier1"
-            elif route == "tier2":
-                return "Tier2"
-            else:
-                return "conversation_agent"
-        
-        # Create graph
-        workflow = StateGraph(AgentState)
-        
-        # Add nodes
-        workflow.add_node("supervisor", route_query)
-        workflow.add_node("Tier1", Tier1)
-        workflow.add_node("Tier2", Tier2)
-        workflow.add_node("conversation_agent", conversation_agent)
-        
-        # Set entry point
-        workflow.set_entry_point("supervisor")
+        async with _build_lock:
+            if compiled_agent is None:
+                compiled_agent = await _compile_graph()
+        return compiled_agent
         
-        # Add conditional edges from supervisor
+    except Exception as e:
+        logger.error(f"Failed to build agent graph: {str(e)}")
+        raise
+
+
+async def _compile_graph():
+    """Create the checkpointer and compile the graph (called once, under the build lock)."""
+    # Initialize checkpointer first
+    checkpointer = await get_checkpointer()
+
+    # Define should_continue function for routing
+    def should_continue(state: AgentState) -> Union[str, List[str]]:
+        """
+        Routing function that reads the route from state.
+        Used as conditional edge function.
+        """
+        route = state.get("route", "conversation")
+        # Supervisor already answered (route-and-respond draft)
+        if route == "conversation" and isinstance(state["messages"][-1], AIMessage):
+            return END
+        # Compound message: both handlers run concurrently in the same step
+        if route == MULTI_ROUTE:
+            return ["Tier1", "Tier2"]
+        # Map route to node names
+        if route == "tier1":
+            return "Tier1"
+        elif route == "tier2":
+            return "Tier2"
+        else:
+            return "conversation_agent"
+
+    def entry_route(state: AgentState) -> str:
+        """
+        Skip the supervisor while a Tier 2 contact collection is open
+        (e.g. the user is answering "what's your email?"), up to
+        TIER2_MAX_BYPASS_TURNS turns before the router is consulted again.
+        """
+        if state.get("tier2_pending") and (state.get("tier2_turns") or 0) < settings.TIER2_MAX_BYPASS_TURNS:
+            return "Tier2"
+        return "supervisor"
+
+    def after_handler(state: AgentState) -> str:
+        """Compound turns join the Tier 1 and Tier 2 replies before ending."""
+        return "merge_replies" if state.get("route") == MULTI_ROUTE else END
+
+    # Create graph
+    workflow = StateGraph(AgentState)
+
+    # Add nodes (wrapped so per-node latency and LLM usage are accounted)
+    workflow.add_node("extract_contacts", traced_node("extract_contacts", extract_contacts))
+    workflow.add_node("supervisor", traced_node("supervisor", route_query))
+    workflow.add_node("Tier1", traced_node("Tier1", Tier1))
+    workflow.add_node("Tier2", traced_node("Tier2", Tier2))
+    workflow.add_node("conversation_agent", traced_node("conversation_agent", conversation_agent))
+    workflow.add_node("merge_replies", merge_replies)
+
+    # Every new message is scanned for contact details first
+    workflow.set_entry_point("extract_contacts")
+
+    # Checkpointed Tier 2 state can bypass the supervisor
+    workflow.add_conditional_edges(
+        "extract_contacts",
+        entry_route,
+        {
+            "supervisor": "supervisor",
+            "Tier2": "Tier2"
+        }
+    )
+
+    # Add conditional edges from supervisor
+    workflow.add_conditional_edges(
+        "supervisor",
+        should_continue,
+        {
+            "Tier1": "Tier1",
+            "Tier2": "Tier2",
+            "conversation_agent": "conversation_agent",
+            END: END
+        }
+    )
+
+    # Handlers end the conversation; after a fan-out both wait for the merge
+    for handler in ("Tier1", "Tier2"):
         workflow.add_conditional_edges(
-            "supervisor",
-            should_continue,
+            handler,
+            after_handler,
             {
-                "Tier1": "Tier1",
-                "Tier2": "Tier2",
-                "conversation_agent": "conversation_agent"
+                "merge_replies": "merge_replies",
+                END: END
             }
         )
+    workflow.add_edge("merge_replies", END)
+    workflow.add_edge("conversation_agent", END)
 
-        # All handlers end the conversation
-        workflow.add_edge("Tier1", END)
-        workflow.add_edge("Tier2", END)
-        workflow.add_edge("conversation_agent", END)
+    # Compile graph with memory
+    graph = workflow.compile(checkpointer=checkpointer)
 
-        # Compile graph with memory
-        compiled_agent = workflow.compile(checkpointer=checkpointer)
-        
-        logger.info("Agent graph compiled successfully")
-        return compiled_agent
-        
-    except Exception as e:
-        logger.error(f"Failed to build agent graph: {str(e)}")
-        raise
+    logger.info("Agent graph compiled successfully")
+    return graph
 
 
 
 async def close_checkpointer():
     """Close the database connection pool and cleanup resources."""
-    global _checkpointer, _connection_pool, compiled_agent, db_initialized
+    global _checkpointer, compiled_agent, db_initialized
     
     try:
-        if _connection_pool:
-            await _connection_pool.close()
-            logger.info("✅ Database connection pool closed")
+        # Pending checkpoint writes must reach Postgres before the pool closes
+        if isinstance(_checkpointer, CachedCheckpointSaver):
+            await _checkpointer.close()
     except Exception as e:
-        logger.error(f"❌ Error closing connection pool: {e}")
+        logger.error(f"❌ Error flushing checkpoint cache: {e}")
+    try:
+        await close_connection_pool()
     finally:
         _checkpointer = None
-        _connection_pool = None
         compiled_agent = None
         db_initialized = False
+
+
+def get_checkpoint_cache_stats():
+    """Write-behind cache counters, or None when the cache is disabled."""
+    if isinstance(_checkpointer, CachedCheckpointSaver):
+        return _checkpointer.stats()
+    return None
@@ -1,18 +1,313 @@
+"""
+LLM configuration - per-node model profiles
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import groq
+from langchain_core.messages import AIMessage
 from langchain_groq import ChatGroq
+from agent.llm_cache import get_llm_cache, make_cache_key
+from agent.llm_scheduler import Priority, estimate_tokens, get_scheduler
+from agent.telemetry import LLMCallRecord, record_llm_call
 from config.conf import settings
+from utils.metrics import LatencyTracker
 
+logger = logging.getLogger("llm")
 
-def get_llm():
+
+@dataclass(frozen=True)
+class LLMProfile:
+    """Model settings used by one graph node (or group of nodes)."""
+    name: str
+    model: str
+    temperature: float
+    max_tokens: int
+    cache_ttl: int = 0  # seconds; 0 means responses are never cached
+    priority: Priority = Priority.INTERACTIVE
+    hedge: bool = False
+
+
+# Built-in per-node defaults. Classification nodes only need one word back,
+# so they get a tiny max_tokens, deterministic sampling and CLASSIFIER_MODEL.
+# Any field can be overridden through settings.LLM_PROFILES.
+# "cache": True opts a node into the response cache (see agent/llm_cache.py),
+# optionally with its own "cache_ttl" in seconds. "priority": "background"
+# lets live turns overtake the node in the scheduler queue. "hedge": True
+# marks latency-sensitive nodes for hedged requests (LLM_HEDGE_ENABLED).
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "router": {"classifier": True, "max_tokens": 10, "temperature": 0.0, "cache": True, "hedge": True},
+    "tier1": {"hedge": True},
+    "conversation": {"hedge": True},
+    "route_and_respond": {"max_tokens": 300, "hedge": True},
+    "tier2": {"max_tokens": 512, "temperature": 0.3},
+    "summary": {"max_tokens": 256, "temperature": 0.3, "priority": "background"},
+}
+
+# Rolling latency per profile, reported via /metrics/llm
+profile_latency = LatencyTracker()
+
+# Model-only latency of each profile's primary model (no scheduler queue
+# wait, no hedging), which the hedge delay is derived from
+model_latency = LatencyTracker()
+
+# Hedging counters per profile: calls eligible, hedges sent, fallback wins
+hedge_stats = defaultdict(lambda: {"calls": 0, "hedged": 0, "fallback_wins": 0})
+
+
+@lru_cache(maxsize=None)
+def get_llm_profile(profile: str = "default") -> LLMProfile:
+    """
+    Resolve an LLM profile from built-in defaults and settings overrides.
+
+    Args:
+        profile: Profile name (e.g. "router", "tier1"); unknown names fall back to the global settings
+
+    Returns:
+        LLMProfile: Resolved model, temperature and max_tokens
+    """
+    spec = {**DEFAULT_PROFILES.get(profile, {}), **settings.LLM_PROFILES.get(profile, {})}
+
+    default_model = settings.LLAMA_MODEL
+    if spec.get("classifier") and settings.CLASSIFIER_MODEL:
+        default_model = settings.CLASSIFIER_MODEL
+
+    cache_ttl = 0
+    if spec.get("cache"):
+        cache_ttl = int(spec.get("cache_ttl", settings.LLM_CACHE_TTL_SECONDS))
+
+    return LLMProfile(
+        name=profile,
+        model=spec.get("model", default_model),
+        temperature=float(spec.get("temperature", settings.TEMPERATURE)),
+        max_tokens=int(spec.get("max_tokens", settings.MAX_TOKENS)),
+        cache_ttl=cache_ttl,
+        priority=Priority[str(spec.get("priority", "interactive")).upper()],
+        hedge=bool(spec.get("hedge", False))
+    )
+
+
+@lru_cache(maxsize=None)
+def get_llm(profile: str = "default", model: Optional[str] = None):
     """
-    Initialize and return the LLM (Groq) instance.
-    
+    Initialize and return the LLM (Groq) instance for a profile.
+
+    Instances are cached per profile so the underlying HTTP client
+    (and its connection pool) is reused across requests. When the LLM
+    scheduler is enabled it owns retries, and Groq's rate-limit headers
+    are fed back to it through an httpx response hook.
+
+    Args:
+        profile: Profile name, see DEFAULT_PROFILES
+        model: Override the profile's model (used for hedged fallbacks)
+
     Returns:
         ChatGroq: Configured LLM instance
     """
+    config = get_llm_profile(profile)
+    client_kwargs = {}
+
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        client_kwargs = {
+            "max_retries": 0,
+            "http_async_client": groq.DefaultAsyncHttpxClient(
+                event_hooks={"response": [scheduler.on_response]}
+            )
+        }
+
     llm = ChatGroq(
-        model=settings.LLAMA_MODEL,
-        temperature=settings.TEMPERATURE,
-        max_tokens=settings.MAX_TOKENS,
-        api_key=settings.GROQ_API_KEY
+        model=model or config.model,
+        temperature=config.temperature,
+        max_tokens=config.max_tokens,
+        api_key=settings.GROQ_API_KEY,
+        **client_kwargs
+    )
+    return llm
+
+
+async def _call_model(config: LLMProfile, model: str, prompt, priority: Priority, stats: Dict[str, float]):
+    """Single model call, admitted through the scheduler when enabled."""
+    llm = get_llm(config.name, model)
+    scheduler = get_scheduler()
+
+    async def invoke():
+        started = time.perf_counter()
+        try:
+            response = await llm.ainvoke(prompt)
+        except asyncio.CancelledError:
+            # A primary cancelled by a hedge took at least this long; keep the tail in the samples
+            if model == config.model:
+                model_latency.record(config.name, (time.perf_counter() - started) * 1000)
+            raise
+        if model == config.model:
+            model_latency.record(config.name, (time.perf_counter() - started) * 1000)
+        return response
+
+    if scheduler is None:
+        return await invoke()
+
+    estimated = estimate_tokens(prompt, config.max_tokens)
+    response = await scheduler.run(
+        invoke,
+        model=model,
+        estimated_tokens=estimated,
+        priority=priority,
+        stats=stats
     )
-    return llm
\ No newline at end of file
+    usage = getattr(response, "usage_metadata", None) or {}
+    scheduler.settle(model, estimated, usage.get("total_tokens"))
+    return response
+
+
+def hedge_delay(profile: str) -> float:
+    """
+    Seconds to wait on the primary call before hedging.
+
+    Uses the configured percentile of the primary model's recent latency
+    (model time only) once enough samples exist, never going below
+    LLM_HEDGE_MIN_DELAY_MS.
+    """
+    delay_ms = settings.LLM_HEDGE_DEFAULT_DELAY_MS
+    if model_latency.sample_count(profile) >= settings.LLM_HEDGE_MIN_SAMPLES:
+        delay_ms = model_latency.percentile(profile, settings.LLM_HEDGE_PERCENTILE)
+    return max(delay_ms, settings.LLM_HEDGE_MIN_DELAY_MS) / 1000
+
+
+async def _hedged_call(config: LLMProfile, prompt, priority: Priority, stats: Dict[str, float]):
+    """
+    Race the primary model against a late-started fallback request.
+
+    The fallback is only sent if the primary has not answered within
+    hedge_delay(). The first successful result wins and the other request
+    is cancelled; if one side fails the other is still awaited. Whatever
+    is still running when the caller is cancelled is cancelled with it.
+    """
+    fallback_model = settings.LLM_HEDGE_FALLBACK_MODEL or config.model
+    counters = hedge_stats[config.name]
+    counters["calls"] += 1
+
+    primary = asyncio.ensure_future(_call_model(config, config.model, prompt, priority, stats))
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_delay(config.name))
+        if done:
+            return primary.result()
+
+        counters["hedged"] += 1
+        logger.info(f"Hedging {config.name} call with {fallback_model}")
+        secondary = asyncio.ensure_future(_call_model(config, fallback_model, prompt, priority, stats))
+        pending = {primary, secondary}
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is secondary:
+                        counters["fallback_wins"] += 1
+                    return task.result()
+        # Both failed - surface the primary's error
+        return primary.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def invoke_llm(
+    prompt,
+    profile: str = "default",
+    priority: Optional[Priority] = None,
+    hedge: bool = True
+):
+    """
+    Invoke the LLM configured for `profile` and record its latency.
+
+    Profiles with caching enabled are answered from the response cache
+    when an identical prompt was seen before, skipping Groq entirely.
+    Otherwise the call goes through the LLM scheduler (when enabled) for
+    rate-limit admission, prioritisation and retries, and is hedged with
+    a fallback model for profiles marked "hedge" when LLM_HEDGE_ENABLED
+    is set.
+
+    Args:
+        prompt: Prompt string or list of messages
+        profile: Profile name, see DEFAULT_PROFILES
+        priority: Scheduling priority; defaults to the profile's priority
+        hedge: False when the call's tokens are streamed to the client, to
+            avoid interleaving tokens from two completions
+
+    Returns:
+        AIMessage: The model response
+    """
+    config = get_llm_profile(profile)
+    cache = get_llm_cache() if config.cache_ttl else None
+    cache_key = None
+
+    if cache is not None:
+        cache_key = make_cache_key(config.model, config.temperature, config.max_tokens, prompt)
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"LLM cache hit for profile {profile}")
+            record_llm_call(LLMCallRecord(node=None, profile=profile, model=config.model, cache_hit=True))
+            return AIMessage(content=cached, response_metadata={"cache_hit": True})
+
+    priority = priority if priority is not None else config.priority
+    stats = {"queue_wait_ms": 0.0}
+    started = time.perf_counter()
+    try:
+        if settings.LLM_HEDGE_ENABLED and config.hedge and hedge:
+            response = await _hedged_call(config, prompt, priority, stats)
+        else:
+            response = await _call_model(config, config.model, prompt, priority, stats)
+    except Exception:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        profile_latency.record(profile, elapsed_ms, error=True)
+        record_llm_call(LLMCallRecord(
+            node=None, profile=profile, model=config.model,
+            queue_wait_ms=stats["queue_wait_ms"], wall_ms=elapsed_ms
+        ))
+        raise
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    profile_latency.record(profile, elapsed_ms)
+
+    usage = getattr(response, "usage_metadata", None) or {}
+    record_llm_call(LLMCallRecord(
+        node=None,
+        profile=profile,
+        model=response.response_metadata.get("model_name", config.model),
+        prompt_tokens=usage.get("input_tokens", 0),
+        completion_tokens=usage.get("output_tokens", 0),
+        queue_wait_ms=stats["queue_wait_ms"],
+        wall_ms=elapsed_ms
+    ))
+
+    if cache is not None and isinstance(response.content, str):
+        await cache.set(cache_key, profile, response.content, config.cache_ttl)
+
+    return response
+
+
+def get_profiles_report() -> Dict[str, Any]:
+    """Resolved profiles and their observed latency, for tuning the tiers."""
+    latency = profile_latency.snapshot()
+    report = {}
+    for name in sorted(set(DEFAULT_PROFILES) | set(settings.LLM_PROFILES) | set(latency)):
+        config = get_llm_profile(name)
+        report[name] = {
+            "model": config.model,
+            "temperature": config.temperature,
+            "max_tokens": config.max_tokens,
+            "cache_ttl": config.cache_ttl,
+            "latency": latency.get(name)
+        }
+        if config.hedge:
+            stats = dict(hedge_stats[name])
+            stats["hedge_rate"] = round(stats["hedged"] / stats["calls"], 3) if stats["calls"] else None
+            report[name]["hedge"] = stats
+    return report
@@ -0,0 +1,231 @@
+"""
+Deterministic LLM response cache
+In-memory LRU tier in front of an optional Postgres tier (shared pool)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Optional, Set
+from langchain_core.messages import BaseMessage
+from config.conf import settings
+from config.postgres import get_connection_pool
+from utils.cache import TTLLRUCache
+
+logger = logging.getLogger("llm_cache")
+
+
+SETUP_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS llm_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        profile TEXT NOT NULL,
+        response TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        expires_at TIMESTAMPTZ NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS llm_response_cache_expires_at_idx ON llm_response_cache (expires_at)"
+]
+
+# Expired rows deleted per statement, so a large backlog doesn't hold long locks
+PURGE_BATCH_SIZE = 5000
+PURGE_SQL = """
+    DELETE FROM llm_response_cache
+    WHERE cache_key IN (
+        SELECT cache_key FROM llm_response_cache WHERE expires_at <= now() LIMIT %s
+    )
+"""
+
+
+def _serialize_prompt(prompt) -> list:
+    """Normalize a prompt (string or list of messages) into JSON-able data."""
+    if isinstance(prompt, str):
+        return [["human", prompt]]
+    serialized = []
+    for msg in prompt:
+        if isinstance(msg, BaseMessage):
+            serialized.append([msg.type, msg.content])
+        else:
+            serialized.append([str(msg)])
+    return serialized
+
+
+def make_cache_key(model: str, temperature: float, max_tokens: int, prompt) -> str:
+    """
+    Build a cache key from the model, its parameters and a hash of the prompt.
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "prompt": _serialize_prompt(prompt)
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PostgresCacheBackend:
+    """
+    Persistent cache tier stored in the llm_response_cache table.
+
+    Expired rows are never returned; writes also delete them in the
+    background, at most once per `purge_interval` seconds per worker.
+    """
+
+    def __init__(self, purge_interval: float = 900):
+        self._table_ready = False
+        self.purge_interval = purge_interval
+        # The first write after startup purges whatever expired meanwhile
+        self._last_purge = float("-inf")
+        self._background: Set[asyncio.Task] = set()
+        self.purged = 0
+
+    async def _get_pool(self):
+        pool = await get_connection_pool()
+        if pool is not None and not self._table_ready:
+            async with pool.connection() as conn:
+                for statement in SETUP_SQL:
+                    await conn.execute(statement)
+            self._table_ready = True
+        return pool
+
+    async def get(self, key: str) -> Optional[tuple]:
+        """Return (response, remaining_ttl_seconds) or None."""
+        pool = await self._get_pool()
+        if pool is None:
+            return None
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "SELECT response, EXTRACT(EPOCH FROM expires_at - now()) AS ttl "
+                "FROM llm_response_cache WHERE cache_key = %s AND expires_at > now()",
+                (key,)
+            )
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        return row["response"], float(row["ttl"])
+
+    async def set(self, key: str, profile: str, response: str, ttl: int):
+        pool = await self._get_pool()
+        if pool is None:
+            return
+        async with pool.connection() as conn:
+            await conn.execute(
+                "INSERT INTO llm_response_cache (cache_key, profile, response, expires_at) "
+                "VALUES (%s, %s, %s, now() + %s * interval '1 second') "
+                "ON CONFLICT (cache_key) DO UPDATE "
+                "SET response = EXCLUDED.response, expires_at = EXCLUDED.expires_at",
+                (key, profile, response, ttl)
+            )
+        self._schedule_purge()
+
+    def _schedule_purge(self):
+        if time.monotonic() - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = time.monotonic()
+        task = asyncio.create_task(self._purge_in_background())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _purge_in_background(self):
+        try:
+            removed = await self.purge_expired()
+            if removed:
+                logger.info(f"Purged {removed} expired LLM cache rows")
+        except Exception as e:
+            logger.warning(f"LLM cache purge failed: {str(e)}")
+
+    async def purge_expired(self) -> int:
+        """Delete expired rows in batches; returns the number removed."""
+        pool = await self._get_pool()
+        if pool is None:
+            return 0
+        removed = 0
+        while True:
+            async with pool.connection() as conn:
+                cursor = await conn.execute(PURGE_SQL, (PURGE_BATCH_SIZE,))
+                removed += cursor.rowcount
+            self.purged += cursor.rowcount
+            if cursor.rowcount < PURGE_BATCH_SIZE:
+                return removed
+
+
+class LLMResponseCache:
+    """
+    Two-tier response cache: process-local LRU, then (optionally) Postgres.
+
+    Backend failures are logged and treated as misses so caching can never
+    break a chat turn.
+    """
+
+    def __init__(self, max_entries: int, backend: Optional[PostgresCacheBackend] = None):
+        self.memory = TTLLRUCache(max_entries=max_entries)
+        self.backend = backend
+
+    async def get(self, key: str) -> Optional[str]:
+        response = self.memory.get(key)
+        if response is not None:
+            return response
+
+        if self.backend is None:
+            return None
+
+        try:
+            found = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache backend read failed: {str(e)}")
+            return None
+
+        if found is None:
+            return None
+
+        response, ttl = found
+        # Promote to the memory tier for the rest of its lifetime
+        if ttl > 0:
+            self.memory.set(key, response, ttl=ttl)
+        return response
+
+    async def set(self, key: str, profile: str, response: str, ttl: int):
+        self.memory.set(key, response, ttl=ttl)
+
+        if self.backend is None:
+            return
+
+        try:
+            await self.backend.set(key, profile, response, ttl)
+        except Exception as e:
+            logger.warning(f"LLM cache backend write failed: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": "postgres" if self.backend else "memory",
+            "memory": self.memory.stats(),
+            "purged_rows": self.backend.purged if self.backend else None
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Return the process-wide LLM cache, or None when LLM_CACHE_ENABLED is off.
+    """
+    global _cache
+
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+
+    if _cache is None:
+        backend = None
+        if settings.LLM_CACHE_BACKEND == "postgres":
+            backend = PostgresCacheBackend(purge_interval=settings.LLM_CACHE_PURGE_INTERVAL_SECONDS)
+        _cache = LLMResponseCache(max_entries=settings.LLM_CACHE_MAX_ENTRIES, backend=backend)
+        logger.info(f"LLM response cache enabled ({_cache.stats()['backend']} backend)")
+
+    return _cache
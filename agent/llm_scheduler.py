@@ -0,0 +1,324 @@
+"""
+Rate-limit-aware LLM scheduler
+Token-bucket admission per model, priority queueing and jittered retries
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import random
+import re
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Optional
+import groq
+import httpx
+from config.conf import settings
+from utils.metrics import LatencyTracker
+
+logger = logging.getLogger("llm_scheduler")
+
+
+class Priority(IntEnum):
+    """Lower value is admitted first."""
+    INTERACTIVE = 0  # live WhatsApp / chat turns
+    BACKGROUND = 10  # summaries and other deferred work
+
+
+# Errors worth retrying: throttling, transient network and server failures
+RETRYABLE_ERRORS = (
+    groq.RateLimitError,
+    groq.APIConnectionError,
+    groq.APITimeoutError,
+    groq.InternalServerError,
+)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse Groq reset headers such as "7.66s", "2m59.56s" or "120ms" into seconds.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in _DURATION_PART.findall(value):
+        matched = True
+        amount = float(amount)
+        total += {"ms": amount / 1000, "s": amount, "m": amount * 60, "h": amount * 3600}[unit]
+    return total if matched else None
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously over a one-minute window."""
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self.refill()
+        # A request larger than the whole bucket is admitted once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float):
+        self.refill()
+        self.tokens -= amount
+
+    def sync(self, remaining: Optional[float], reset_seconds: Optional[float] = None):
+        """Align the bucket with what the provider reports as remaining."""
+        if remaining is None:
+            return
+        self.refill()
+        self.tokens = min(self.tokens, remaining, self.capacity)
+        if remaining <= 0 and reset_seconds:
+            # Empty until the provider window resets
+            self.tokens = -reset_seconds * self.refill_rate
+
+
+class ModelLimiter:
+    """Request and token buckets plus a priority wait queue for one model."""
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.queue = []
+        self.condition = asyncio.Condition()
+
+    def delay_for(self, tokens: int) -> float:
+        return max(self.requests.delay_for(1), self.tokens.delay_for(tokens))
+
+    def update_from_headers(self, headers: httpx.Headers):
+        """Track remaining RPM/TPM from Groq's x-ratelimit-* response headers."""
+        limit_tokens = headers.get("x-ratelimit-limit-tokens")
+        if limit_tokens and limit_tokens.isdigit():
+            # Groq reports the per-minute token limit; adopt it as capacity
+            self.tokens.capacity = float(limit_tokens)
+
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+
+        self.tokens.sync(
+            float(remaining_tokens) if remaining_tokens and remaining_tokens.isdigit() else None,
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+        )
+        self.requests.sync(
+            float(remaining_requests) if remaining_requests and remaining_requests.isdigit() else None,
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+        )
+
+
+class LLMScheduler:
+    """
+    Central admission control for every LLM call.
+
+    Calls wait in a per-model priority queue until both the request bucket
+    (RPM) and the token bucket (TPM) can cover them. Interactive turns are
+    always admitted before background work. Throttling and transient
+    errors are retried with full-jitter exponential backoff, honouring
+    Retry-After when Groq sends it.
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._sequence = itertools.count()
+        self.wait_times = LatencyTracker()
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def limiter(self, model: str) -> ModelLimiter:
+        if model not in self._limiters:
+            self._limiters[model] = ModelLimiter(model, self.rpm, self.tpm)
+        return self._limiters[model]
+
+    async def on_response(self, response: httpx.Response):
+        """httpx response hook: feed rate-limit headers back into the buckets."""
+        try:
+            body = json.loads(response.request.content or b"{}")
+            model = body.get("model")
+        except (ValueError, AttributeError):
+            model = None
+
+        if model:
+            self.limiter(model).update_from_headers(response.headers)
+
+    async def _acquire(self, limiter: ModelLimiter, priority: Priority, tokens: int) -> float:
+        """Wait for admission; returns the time spent queued in milliseconds."""
+        started = time.perf_counter()
+        entry = (int(priority), next(self._sequence))
+        heapq.heappush(limiter.queue, entry)
+
+        try:
+            async with limiter.condition:
+                while True:
+                    delay = None
+                    if limiter.queue[0] == entry:
+                        delay = limiter.delay_for(tokens)
+                        if delay <= 0:
+                            heapq.heappop(limiter.queue)
+                            limiter.requests.consume(1)
+                            limiter.tokens.consume(tokens)
+                            limiter.condition.notify_all()
+                            break
+                    try:
+                        await asyncio.wait_for(limiter.condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+        except BaseException:
+            # Cancelled while queued - drop our slot and let the next caller in
+            if entry in limiter.queue:
+                limiter.queue.remove(entry)
+                heapq.heapify(limiter.queue)
+                async with limiter.condition:
+                    limiter.condition.notify_all()
+            raise
+
+        waited_ms = (time.perf_counter() - started) * 1000
+        self.wait_times.record(priority.name.lower(), waited_ms)
+        return waited_ms
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After if given."""
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = parse_reset_duration(response.headers.get("retry-after"))
+            if retry_after:
+                return min(retry_after + random.uniform(0, self.base_delay), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        model: str,
+        estimated_tokens: int,
+        priority: Priority = Priority.INTERACTIVE,
+        stats: Optional[Dict[str, float]] = None
+    ) -> Any:
+        """
+        Run `call` once admitted, retrying retryable failures.
+
+        Args:
+            call: Zero-argument coroutine factory performing the LLM request
+            model: Model name (rate limits are tracked per model)
+            estimated_tokens: Prompt + completion token estimate for admission
+            priority: Scheduling priority
+            stats: Optional dict whose "queue_wait_ms" is incremented by the time spent queued
+
+        Returns:
+            Whatever `call` returns
+        """
+        limiter = self.limiter(model)
+
+        for attempt in range(self.max_retries + 1):
+            waited_ms = await self._acquire(limiter, priority, estimated_tokens)
+            if stats is not None:
+                stats["queue_wait_ms"] = stats.get("queue_wait_ms", 0.0) + waited_ms
+            try:
+                return await call()
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, groq.RateLimitError):
+                    self.rate_limited += 1
+                    limiter.update_from_headers(e.response.headers)
+
+                if attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+
+                delay = self._backoff(attempt, e)
+                self.retries += 1
+                logger.warning(
+                    f"LLM call to {model} failed ({type(e).__name__}), "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def settle(self, model: str, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct the token bucket once the real usage of a call is known."""
+        if actual_tokens is None:
+            return
+        self.limiter(model).tokens.consume(actual_tokens - estimated_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, wait times, retry counters and bucket levels."""
+        models = {}
+        for model, limiter in self._limiters.items():
+            limiter.requests.refill()
+            limiter.tokens.refill()
+            models[model] = {
+                "queue_depth": len(limiter.queue),
+                "requests_available": round(limiter.requests.tokens, 1),
+                "tokens_available": round(limiter.tokens.tokens),
+                "tokens_per_minute": limiter.tokens.capacity
+            }
+        return {
+            "queue_depth": sum(m["queue_depth"] for m in models.values()),
+            "wait_ms": self.wait_times.snapshot(),
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "models": models
+        }
+
+
+def estimate_tokens(prompt, max_tokens: int) -> int:
+    """Rough prompt (~4 chars per token) plus completion budget estimate."""
+    if isinstance(prompt, str):
+        chars = len(prompt)
+    else:
+        chars = sum(len(str(getattr(msg, "content", msg))) for msg in prompt)
+    return chars // 4 + max_tokens
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> Optional[LLMScheduler]:
+    """Process-wide scheduler, or None when LLM_SCHEDULER_ENABLED is off."""
+    global _scheduler
+
+    if not settings.LLM_SCHEDULER_ENABLED:
+        return None
+
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            rpm=settings.LLM_RATE_LIMIT_RPM,
+            tpm=settings.LLM_RATE_LIMIT_TPM,
+            max_retries=settings.LLM_MAX_RETRIES
+        )
+    return _scheduler
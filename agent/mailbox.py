@@ -0,0 +1,182 @@
+"""
+Per-thread mailbox in front of main_agent
+Serializes agent runs per conversation thread and coalesces bursts of short
+messages (typical on WhatsApp: "hi" / "do you deliver" / "to Lekki?") into
+a single agent invocation.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from agent.main_agent import main_agent
+from config.conf import settings
+
+logger = logging.getLogger("mailbox")
+
+
+@dataclass
+class _Mailbox:
+    """Pending messages and the run lock for one thread."""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pending: List[Tuple[str, asyncio.Future]] = field(default_factory=list)
+    agent_kwargs: Dict[str, Any] = field(default_factory=dict)
+    first_arrival: float = 0.0
+    last_arrival: float = 0.0
+    debounce: float = 0.0
+    flusher: Optional[asyncio.Task] = None
+    # Runs holding or queued on the lock; lock.locked() misses the queued ones
+    users: int = 0
+
+
+class ThreadMailbox:
+    """
+    Messages for a thread are held until no new one has arrived for
+    `debounce` seconds (but never longer than `max_wait` after the first),
+    then answered with one main_agent run over the merged text. Runs for
+    the same thread never overlap, so checkpoints are written in order;
+    messages that arrive during a run form the next batch.
+
+    The caller of the last message in a batch receives the agent result;
+    earlier callers receive the same result with "coalesced": True and
+    should not send a reply of their own.
+    """
+
+    def __init__(self, debounce: float = 1.5, max_wait: float = 4.0):
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self._mailboxes: Dict[str, _Mailbox] = {}
+        self.counters = {"messages": 0, "runs": 0, "coalesced": 0}
+
+    def _mailbox(self, thread_id: str) -> _Mailbox:
+        mailbox = self._mailboxes.get(thread_id)
+        if mailbox is None:
+            mailbox = self._mailboxes[thread_id] = _Mailbox()
+        return mailbox
+
+    def _release(self, thread_id: str, mailbox: _Mailbox):
+        """Forget idle mailboxes so the dict doesn't grow with every thread ever seen."""
+        if not mailbox.pending and mailbox.flusher is None and mailbox.users == 0:
+            if self._mailboxes.get(thread_id) is mailbox:
+                del self._mailboxes[thread_id]
+
+    async def submit(
+        self,
+        thread_id: str,
+        query: str,
+        debounce: Optional[float] = None,
+        **agent_kwargs
+    ) -> Dict[str, Any]:
+        """
+        Queue a user message for the thread and wait for the answer.
+
+        Args:
+            thread_id: Conversation thread ID
+            query: The user's message
+            debounce: Override the debounce window (0 = no waiting, but messages
+                queued before the flush still merge; use run() to never merge)
+            **agent_kwargs: Passed to main_agent (the latest message's values win)
+
+        Returns:
+            main_agent's response; with "coalesced": True if the message was
+            merged into a later one that carries the reply
+        """
+        loop = asyncio.get_running_loop()
+        mailbox = self._mailbox(thread_id)
+        future = loop.create_future()
+        now = time.monotonic()
+
+        if not mailbox.pending:
+            mailbox.first_arrival = now
+        mailbox.pending.append((query, future))
+        mailbox.last_arrival = now
+        mailbox.agent_kwargs = agent_kwargs
+        mailbox.debounce = self.debounce if debounce is None else debounce
+        self.counters["messages"] += 1
+
+        if mailbox.flusher is None:
+            mailbox.flusher = asyncio.create_task(self._flush(thread_id, mailbox))
+
+        return await future
+
+    async def _flush(self, thread_id: str, mailbox: _Mailbox):
+        # Wait for the burst to end (each arrival pushes the deadline out)
+        while True:
+            deadline = min(mailbox.last_arrival + mailbox.debounce, mailbox.first_arrival + self.max_wait)
+            delay = deadline - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        async with self._locked(thread_id, mailbox):
+            batch, mailbox.pending = mailbox.pending, []
+            agent_kwargs = mailbox.agent_kwargs
+            # Later arrivals start a new batch that queues behind this run
+            mailbox.flusher = None
+
+            query = "\n".join(text for text, _ in batch)
+            if len(batch) > 1:
+                self.counters["coalesced"] += len(batch) - 1
+                logger.info(f"Coalesced {len(batch)} messages into one run (thread {thread_id})")
+
+            try:
+                result = await main_agent(query=query, thread_id=thread_id, **agent_kwargs)
+                self.counters["runs"] += 1
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                *earlier, (_, last) = batch
+                for _, future in earlier:
+                    if not future.done():
+                        future.set_result({**result, "coalesced": True})
+                if not last.done():
+                    last.set_result(result)
+
+    async def run(self, thread_id: str, query: str, **agent_kwargs) -> Dict[str, Any]:
+        """
+        Answer one message on its own, after any run in progress on the thread.
+        Serialize-only: nothing is merged, so concurrent callers each get their
+        own answer (REST clients that send one request per message).
+        """
+        self.counters["messages"] += 1
+        async with self.serialized(thread_id):
+            result = await main_agent(query=query, thread_id=thread_id, **agent_kwargs)
+            self.counters["runs"] += 1
+            return result
+
+    @asynccontextmanager
+    async def _locked(self, thread_id: str, mailbox: _Mailbox):
+        # Counted before waiting, so the mailbox (and its lock) isn't dropped under a queued run
+        mailbox.users += 1
+        try:
+            async with mailbox.lock:
+                yield
+        finally:
+            mailbox.users -= 1
+            self._release(thread_id, mailbox)
+
+    @asynccontextmanager
+    async def serialized(self, thread_id: str):
+        """Hold the thread's run lock, for callers that drive the agent themselves (streaming)."""
+        async with self._locked(thread_id, self._mailbox(thread_id)):
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "active_threads": len(self._mailboxes)}
+
+
+_mailbox: Optional[ThreadMailbox] = None
+
+
+def get_mailbox() -> ThreadMailbox:
+    """Process-wide mailbox."""
+    global _mailbox
+    if _mailbox is None:
+        _mailbox = ThreadMailbox(
+            debounce=settings.MAILBOX_DEBOUNCE_SECONDS,
+            max_wait=settings.MAILBOX_MAX_WAIT_SECONDS
+        )
+    return _mailbox
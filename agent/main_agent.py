@@ -2,20 +2,28 @@
 Main agent entry point - invokes the compiled LangGraph agent
 """
 import logging
-from typing import Dict, Any, Optional
-from langchain_core.messages import AIMessage, HumanMessage
+import time
+from typing import Dict, Any, Optional, AsyncIterator
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
 from agent.graph_builder.compiled_agent import build_agent_graph
-from config.database import business_collection
+from agent.memory import schedule_compaction, wait_for_compaction
+from agent.small_talk import detect_small_talk, get_small_talk_templates, render_reply
+from agent.telemetry import start_trace, finish_trace
+from config.conf import settings
+from repositories.business_cache import get_business_cache
 
 logger = logging.getLogger("main_agent")
 
+# Graph nodes whose LLM tokens are forwarded to streaming clients
+STREAMING_NODES = ("Tier1", "conversation_agent")
+
 
 async def get_business_info(business_id: str) -> Dict[str, str]:
     """
-    Fetch business name and email from MongoDB.
+    Fetch business name and email (cached profile, read through to MongoDB).
     """
     try:
-        business = business_collection.find_one({"business_id": business_id})
+        business = await get_business_cache().get(business_id)
         
         if not business:
             logger.warning(f"Business {business_id} not found in database")
@@ -37,6 +45,114 @@ async def get_business_info(business_id: str) -> Dict[str, str]:
         }
 
 
+def _build_input_state(
+    query: str,
+    business_id: str,
+    thread_id: str,
+    business_name: str,
+    business_email: str,
+    user_email: Optional[str],
+    user_phone: Optional[str],
+    streaming: bool = False
+) -> Dict[str, Any]:
+    """
+    Build the graph input state for a single user turn.
+
+    Contact details are only included when the caller supplied them, so
+    values extracted on earlier turns stay in the checkpoint.
+    """
+    input_state = {
+        "messages": [HumanMessage(content=query)],
+        "business_id": business_id,
+        "thread_id": thread_id,
+        "business_name": business_name,
+        "business_email": business_email,
+        "streaming": streaming,
+        "route": None,
+        "email_sent": False
+    }
+    if user_email:
+        input_state["user_email"] = user_email
+    if user_phone:
+        input_state["user_phone"] = user_phone
+    return input_state
+
+
+def _build_response(result: Dict[str, Any], business_name: str, business_email: str) -> Dict[str, Any]:
+    """Turn the final graph state into the ChatResponse payload."""
+    last_message = result["messages"][-1]
+    
+    # Handle LangChain message objects
+    if isinstance(last_message, AIMessage):
+        answer = last_message.content
+    elif isinstance(last_message, dict):
+        answer = last_message.get("content", "")
+    else:
+        answer = str(last_message)
+    
+    return {
+        "answer": answer,
+        "route": result.get("route"),
+        "email_sent": result.get("email_sent", False),
+        "business_name": business_name,
+        "business_email": business_email,
+        "user_email": result.get("user_email"),
+        "user_phone": result.get("user_phone")
+    }
+
+
+def _error_response(business_name: Optional[str], business_email: Optional[str]) -> Dict[str, Any]:
+    """Fallback payload returned when the agent run fails."""
+    return {
+        "answer": "I'm having trouble processing your request. Please try again.",
+        "route": "error",
+        "email_sent": False,
+        "business_name": business_name or "this business",
+        "business_email": business_email,
+        "user_email": None,
+        "user_phone": None
+    }
+
+
+async def _answer_small_talk(
+    compiled_agent,
+    config: Dict[str, Any],
+    input_state: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Answer greetings / thanks / goodbyes from templates without running the graph.
+    
+    The exchange is written to the thread's checkpoint as if the
+    conversation agent had replied, so later turns see a consistent history.
+    Skipped while a Tier 2 collection is open (a short "ok" may be an answer).
+    
+    Returns:
+        The final state for _build_response, or None to run the graph
+    """
+    if not settings.SMALL_TALK_ENABLED:
+        return None
+    
+    query = input_state["messages"][-1].content
+    intent = detect_small_talk(query)
+    if intent is None:
+        return None
+    
+    if compiled_agent.checkpointer is not None:
+        snapshot = await compiled_agent.aget_state(config)
+        if snapshot.values.get("tier2_pending"):
+            return None
+    
+    templates = await get_small_talk_templates(input_state["business_id"])
+    answer = AIMessage(content=render_reply(intent, input_state["business_name"], templates))
+    state = {**input_state, "messages": [*input_state["messages"], answer], "route": "conversation"}
+    
+    if compiled_agent.checkpointer is not None:
+        await compiled_agent.aupdate_state(config, state, as_node="conversation_agent")
+    
+    logger.info(f"Answered {intent} from template (thread {config['configurable']['thread_id']})")
+    return state
+
+
 async def main_agent(
     query: str,
     business_id: str,
@@ -44,7 +160,8 @@ async def main_agent(
     user_email: Optional[str] = None,
     user_phone: Optional[str] = None,
     business_name: Optional[str] = None,
-    business_email: Optional[str] = None
+    business_email: Optional[str] = None,
+    debug: bool = False
 ) -> Dict[str, Any]:    
     """
     Invoke the compiled LangGraph agent.
@@ -57,6 +174,7 @@ async def main_agent(
         user_phone: User's phone (optional, for Tier 2)
         business_name: Business name (optional, fetched from DB if not provided)
         business_email: Business email (optional, fetched from DB if not provided)
+        debug: Attach per-node timing/token accounting under "timing"
         
     Returns:
         {
@@ -69,6 +187,7 @@ async def main_agent(
             "user_phone": str | None
         }
     """
+    trace = start_trace(business_id, thread_id)
     try:
         
         logger.info(f"Processing query for business {business_id}, thread {thread_id}")
@@ -81,56 +200,128 @@ async def main_agent(
             business_email = business_email or business_info["business_email"]
         
         # Prepare input state
-        input_state = {
-            "messages": [HumanMessage(content=query)],
-            "business_id": business_id,
-            "business_name": business_name,
-            "business_email": business_email,
-            "user_email": user_email,
-            "user_phone": user_phone,
-            "route": None,
-            "email_sent": False
-        }
+        input_state = _build_input_state(
+            query, business_id, thread_id, business_name, business_email, user_email, user_phone
+        )
         
         # Build/get the compiled agent
         compiled_agent = await build_agent_graph()
         
         # Invoke agent with thread-based memory
         config = {"configurable": {"thread_id": thread_id}}
-        result = await compiled_agent.ainvoke(input_state, config)
-        
-        # Extract response
-        last_message = result["messages"][-1]
-        
-        # Handle LangChain message objects
-        if isinstance(last_message, AIMessage):
-            answer = last_message.content
-        elif isinstance(last_message, dict):
-            answer = last_message.get("content", "")
-        else:
-            answer = str(last_message)
-        
-        response = {
-            "answer": answer,
-            "route": result.get("route"),
-            "email_sent": result.get("email_sent", False),
-            "business_name": business_name,
-            "business_email": business_email,
-            "user_email": result.get("user_email"),
-            "user_phone": result.get("user_phone")
-        }
+        await wait_for_compaction(thread_id)
+        result = await _answer_small_talk(compiled_agent, config, input_state)
+        if result is None:
+            result = await compiled_agent.ainvoke(input_state, config)
+        schedule_compaction(compiled_agent, config)
+        
+        response = _build_response(result, business_name, business_email)
         
         logger.info(f"Response generated - Route: {response['route']}")
-        return response
         
     except Exception as e:
         logger.error(f"Error invoking agent: {str(e)}", exc_info=True)
-        return {
-            "answer": "I'm having trouble processing your request. Please try again.",
-            "route": "error",
-            "email_sent": False,
-            "business_name": business_name or "this business",
-            "business_email": business_email,
-            "user_email": None,
-            "user_phone": None
-        }
+        response = _error_response(business_name, business_email)
+    
+    finish_trace(trace)
+    if debug:
+        response["timing"] = trace.to_dict()
+    return response
+
+
+async def stream_main_agent(
+    query: str,
+    business_id: str,
+    thread_id: str = "default",
+    user_email: Optional[str] = None,
+    user_phone: Optional[str] = None,
+    business_name: Optional[str] = None,
+    business_email: Optional[str] = None,
+    debug: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of main_agent.
+    
+    Runs the same graph (and writes the same checkpoint) but uses the
+    compiled graph's "messages" stream mode so LLM tokens produced by the
+    answering nodes are yielded as soon as Groq emits them.
+    
+    Yields events of the form {"event": str, "data": dict}:
+        - "token":   {"content": str, "node": str} for every streamed chunk
+        - "metrics": {"ttft_ms": float | None, "total_ms": float}
+        - "done":    the final ChatResponse payload (always the last event)
+    """
+    trace = start_trace(business_id, thread_id)
+    started = time.perf_counter()
+    ttft_ms = None
+    streamed_text = ""
+    
+    try:
+        logger.info(f"Streaming query for business {business_id}, thread {thread_id}")
+        
+        if not business_name or not business_email:
+            logger.info(f"Fetching business info for {business_id}")
+            business_info = await get_business_info(business_id)
+            business_name = business_name or business_info["business_name"]
+            business_email = business_email or business_info["business_email"]
+        
+        input_state = _build_input_state(
+            query, business_id, thread_id, business_name, business_email, user_email, user_phone,
+            streaming=True
+        )
+        
+        compiled_agent = await build_agent_graph()
+        config = {"configurable": {"thread_id": thread_id}}
+        
+        await wait_for_compaction(thread_id)
+        result = await _answer_small_talk(compiled_agent, config, input_state)
+        if result is None:
+            async for mode, chunk in compiled_agent.astream(
+                input_state, config, stream_mode=["messages", "values"]
+            ):
+                if mode == "values":
+                    # Full state after each step - the last one is the final state
+                    result = chunk
+                    continue
+            
+                message_chunk, metadata = chunk
+                node = metadata.get("langgraph_node")
+                if node not in STREAMING_NODES or not isinstance(message_chunk, AIMessageChunk):
+                    continue
+            
+                content = message_chunk.content
+                if not content:
+                    continue
+            
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                    logger.info(f"Time to first token: {ttft_ms:.0f}ms (node: {node}, thread {thread_id})")
+            
+                streamed_text += content
+                yield {"event": "token", "data": {"content": content, "node": node}}
+        
+        schedule_compaction(compiled_agent, config)
+        response = _build_response(result, business_name, business_email)
+        
+        # Nodes that don't stream (e.g. Tier2) still deliver their answer as one chunk;
+        # after a compound turn the merged Tier 2 part follows the streamed Tier 1 text
+        answer, streamed = response["answer"] or "", streamed_text.strip()
+        remainder = answer[len(streamed):] if answer.startswith(streamed) else ""
+        if remainder:
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000
+            yield {"event": "token", "data": {"content": remainder, "node": None}}
+        
+        logger.info(f"Streamed response generated - Route: {response['route']}")
+        
+    except Exception as e:
+        logger.error(f"Error streaming agent: {str(e)}", exc_info=True)
+        response = _error_response(business_name, business_email)
+    
+    finish_trace(trace)
+    if debug:
+        response["timing"] = trace.to_dict()
+    
+    total_ms = (time.perf_counter() - started) * 1000
+    yield {"event": "metrics", "data": {"ttft_ms": ttft_ms, "total_ms": total_ms}}
+    yield {"event": "done", "data": response}
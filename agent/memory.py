@@ -0,0 +1,99 @@
+"""
+Windowed conversation memory - keeps the last N messages per thread verbatim
+and folds older ones into a rolling summary, so checkpoints stay a bounded
+size for long-lived (e.g. WhatsApp) threads.
+
+Compaction runs in the background after a turn has been answered; the next
+turn on the same thread waits for it so the two never write the checkpoint
+concurrently.
+"""
+import asyncio
+import contextvars
+import logging
+from typing import Any, Dict
+from langchain_core.messages import RemoveMessage
+from agent.llm import invoke_llm
+from agent.prompts import CONVERSATION_SUMMARY
+from agent.agent_utils import format_chat_history
+from config.conf import settings
+
+logger = logging.getLogger("memory")
+
+# thread_id -> running compaction
+_compactions: Dict[str, asyncio.Task] = {}
+
+_stats = {"compactions": 0, "messages_folded": 0, "errors": 0}
+
+
+async def summarize(summary: str, messages: list) -> str:
+    """Merge `messages` into the existing summary (one background-priority LLM call)."""
+    prompt = CONVERSATION_SUMMARY.render(
+        summary=summary or "None yet.",
+        transcript=format_chat_history(messages, limit=None)
+    )
+    response = await invoke_llm(prompt, profile="summary")
+    return response.content.strip()
+
+
+async def compact_thread(compiled_agent, config: Dict[str, Any]):
+    """
+    Fold everything but the last MEMORY_WINDOW_MESSAGES messages into the summary.
+
+    Only runs once the thread has grown MEMORY_SUMMARY_BATCH messages past
+    the window, so the summary LLM call is amortized over several turns.
+    """
+    snapshot = await compiled_agent.aget_state(config)
+    messages = snapshot.values.get("messages") or []
+    window = settings.MEMORY_WINDOW_MESSAGES
+    if len(messages) < window + settings.MEMORY_SUMMARY_BATCH:
+        return
+
+    folded = messages[:-window]
+    summary = await summarize(snapshot.values.get("conversation_summary") or "", folded)
+
+    await compiled_agent.aupdate_state(
+        config,
+        {
+            "messages": [RemoveMessage(id=message.id) for message in folded],
+            "conversation_summary": summary
+        },
+        as_node="conversation_agent"
+    )
+    _stats["compactions"] += 1
+    _stats["messages_folded"] += len(folded)
+    logger.info(f"Folded {len(folded)} messages into summary (thread {config['configurable']['thread_id']})")
+
+
+async def _run_compaction(compiled_agent, config: Dict[str, Any]):
+    thread_id = config["configurable"]["thread_id"]
+    try:
+        await compact_thread(compiled_agent, config)
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.error(f"Memory compaction failed for thread {thread_id}: {e}")
+    finally:
+        _compactions.pop(thread_id, None)
+
+
+def schedule_compaction(compiled_agent, config: Dict[str, Any]):
+    """Start a background compaction for the thread (no-op if disabled or already running)."""
+    if not settings.MEMORY_WINDOW_ENABLED or compiled_agent.checkpointer is None:
+        return
+    thread_id = config["configurable"]["thread_id"]
+    if thread_id in _compactions:
+        return
+    # Fresh context: the summary call must not be billed to the finished turn's trace
+    _compactions[thread_id] = asyncio.create_task(
+        _run_compaction(compiled_agent, config), context=contextvars.Context()
+    )
+
+
+async def wait_for_compaction(thread_id: str):
+    """Block until a running compaction for this thread has written its checkpoint."""
+    task = _compactions.get(thread_id)
+    if task is not None:
+        await asyncio.shield(task)
+
+
+def get_memory_stats() -> Dict[str, int]:
+    return {**_stats, "running": len(_compactions)}
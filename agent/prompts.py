@@ -0,0 +1,239 @@
+"""
+Prompt template registry
+
+Every prompt is split into an immutable system prefix (static instructions)
+and a user message carrying the dynamic data (business name, history,
+retrieved context, ...). Keeping the prefix byte-identical across requests
+lets provider-side prefix caching reuse it.
+
+Run this command to print static token counts and check prefix stability:
+python -m agent.prompts
+"""
+import hashlib
+import logging
+import string
+from dataclasses import dataclass, field
+from typing import Dict, List
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+logger = logging.getLogger("prompts")
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its encoding file unavailable
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count via tiktoken when available, else a ~4 chars/token estimate."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A static system prefix plus a format string for the dynamic part."""
+    name: str
+    system: str
+    user: str
+    static_tokens: int = field(init=False)
+    prefix_digest: str = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "static_tokens", count_tokens(self.system))
+        object.__setattr__(self, "prefix_digest", hashlib.sha256(self.system.encode("utf-8")).hexdigest())
+
+    def render(self, **values) -> List[BaseMessage]:
+        """Build [SystemMessage(static prefix), HumanMessage(dynamic content)]."""
+        return [SystemMessage(content=self.system), HumanMessage(content=self.user.format(**values))]
+
+
+PROMPTS: Dict[str, PromptTemplate] = {}
+
+
+def register(template: PromptTemplate) -> PromptTemplate:
+    PROMPTS[template.name] = template
+    return template
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    return PROMPTS[name]
+
+
+ROUTER = register(PromptTemplate(
+    name="router",
+    system="""You are a query router for a business chatbot.
+
+Classify the user query into ONE of these categories:
+
+1. **tier1** - Questions about business info (hours, location, services, prices, menu, FAQs)
+2. **tier2** - Requests needing human help (reservations, orders, complaints, custom requests)
+3. **conversation** - General greetings, small talk, unclear requests
+4. **tier1+tier2** - The message does BOTH: asks for business info AND needs human help
+   (e.g. "what's your catering price, and can someone call me to book?")
+
+Respond with ONLY ONE WORD: tier1, tier2, conversation, or tier1+tier2""",
+    user='User Query: "{user_query}"'
+))
+
+CONVERSATION = register(PromptTemplate(
+    name="conversation",
+    system="""You are SharpChatAI, a helpful and friendly customer care agent for the business named in the message.
+
+**YOUR PERSONALITY:**
+- Warm, professional, and approachable
+- Patient and understanding
+- Proactive in offering help
+- Clear and concise in communication
+
+**YOUR TASK:**
+- Respond naturally and helpfully
+- If the user asks about business info (hours, prices, etc.), suggest they ask specific questions
+- If they need help with reservations/orders, offer to connect them with the business owner
+- Keep responses friendly and concise""",
+    user="""**BUSINESS:** {business_name}
+
+**CONVERSATION HISTORY:**
+{chat_history}
+
+**USER MESSAGE:** {user_query}
+
+**RESPONSE:**"""
+))
+
+TIER1 = register(PromptTemplate(
+    name="tier1",
+    system="""You are a helpful business assistant for the business named in the message.
+
+Use the business information provided in the message to answer the user's question accurately and naturally.
+
+INSTRUCTIONS:
+- Answer based ONLY on the provided business information
+- Be friendly, concise, and helpful
+- If the information isn't in the context, say "I don't have that information, but I can help you contact the business owner"
+- Include specific details like prices (₦), hours, location when relevant
+- Don't make up information""",
+    user="""BUSINESS: {business_name}
+
+BUSINESS INFORMATION:
+{context}
+
+CONVERSATION HISTORY:
+{chat_history}
+
+USER QUESTION: {user_message}
+
+ANSWER:"""
+))
+
+ROUTE_AND_RESPOND = register(PromptTemplate(
+    name="route_and_respond",
+    system="""You are SharpChatAI, the query router and customer care agent for a business chatbot.
+
+Classify the user message into ONE of these categories:
+
+1. **tier1** - Questions about business info (hours, location, services, prices, menu, FAQs)
+2. **tier2** - Requests needing human help (reservations, orders, complaints, custom requests)
+3. **conversation** - General greetings, small talk, unclear requests
+4. **tier1+tier2** - The message does BOTH: asks for business info AND needs human help
+   (e.g. "what's your catering price, and can someone call me to book?")
+
+If the category is conversation, also write the reply: warm, professional and concise.
+If they ask about business info, suggest they ask specific questions; if they need help
+with reservations/orders, offer to connect them with the business owner.
+For the other categories leave the reply empty.
+
+Respond with ONLY a JSON object, no other text:
+{"route": "tier1" | "tier2" | "conversation" | "tier1+tier2", "reply": "<reply or empty string>"}""",
+    user="""BUSINESS: {business_name}
+
+CONVERSATION HISTORY:
+{chat_history}
+
+USER MESSAGE: {user_query}"""
+))
+
+TIER2_TURN = register(PromptTemplate(
+    name="tier2_turn",
+    system="""You are helping a customer who wants to speak with someone from the business named in the message.
+
+Read the conversation and the known contact details, then respond with ONLY a JSON object, no other text:
+{"preferred_contact_method": "email" | "phone" | "both" | "unknown", "main_issue": "...", "summary": "...", "reply": "..."}
+
+Fields:
+- preferred_contact_method: how the customer wants to be contacted.
+  "email" if they mention email, mail, or provide an email address;
+  "phone" if they mention phone, call, or provide a phone number;
+  "both" if they mention both or want multiple contact methods;
+  otherwise keep the current preference, or "unknown" if unclear.
+- main_issue: the main customer issue or request in 1 sentence.
+  Focus on WHAT the customer needs help with, not the contact collection process.
+- summary: summary of the conversation in 2-3 sentences. Focus on what the customer needs and key details.
+- reply: the message to send to the customer.
+  If the known details cover the preferred method (email: email address known; phone: phone number known;
+  both: both known), write a warm, professional confirmation that their request has been sent to the business,
+  how the business will contact them and their contact details, and ask if there's anything else you can help with (2-3 sentences).
+  Otherwise ask naturally for what is missing: how they'd like to be contacted (email, phone, or both) if
+  the preference is unknown, else the missing email address or phone number (1-2 sentences).
+  Be conversational and warm. Don't be robotic.""",
+    user="""Business: {business_name}
+
+Known contact details:
+- Current preferred contact method: {preferred_contact_method}
+- Customer email: {user_email}
+- Customer phone: {user_phone}
+
+Conversation so far:
+{conversation_history}"""
+))
+
+
+CONVERSATION_SUMMARY = register(PromptTemplate(
+    name="conversation_summary",
+    system="""You maintain the running memory of a customer conversation with a business assistant.
+
+Merge the existing summary with the new messages into ONE updated summary of at most 5 sentences.
+Keep what later turns may need: what the customer asked for, decisions made, details they gave
+(names, dates, quantities, contact details) and anything still unresolved. Drop greetings and small talk.
+Respond with only the summary text.""",
+    user="""Existing summary:
+{summary}
+
+New messages:
+{transcript}"""
+))
+
+def check_prefix_stability() -> Dict[str, str]:
+    """
+    Render every template with two unrelated sets of values and verify the
+    system prefix is byte-identical and unchanged since registration.
+
+    Returns:
+        Mapping of template name to prefix digest
+
+    Raises:
+        ValueError: if any prefix depends on the dynamic values
+    """
+    digests = {}
+    for name, template in PROMPTS.items():
+        fields = {field_name for _, field_name, _, _ in string.Formatter().parse(template.user) if field_name}
+        first = template.render(**{f: f"first {f}" for f in fields})
+        second = template.render(**{f: f"second {{{f}}} value" for f in fields})
+
+        prefix = first[0].content.encode("utf-8")
+        if prefix != second[0].content.encode("utf-8"):
+            raise ValueError(f"System prefix of '{name}' varies between requests")
+
+        digest = hashlib.sha256(prefix).hexdigest()
+        if digest != template.prefix_digest:
+            raise ValueError(f"System prefix of '{name}' changed after registration")
+        digests[name] = digest
+    return digests
+
+
+if __name__ == "__main__":
+    digests = check_prefix_stability()
+    for name, template in PROMPTS.items():
+        print(f"{name:<20} static_tokens={template.static_tokens:<5} prefix={digests[name][:12]}")
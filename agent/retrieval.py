@@ -1,6 +1,6 @@
 import logging
 from typing import List, Dict, Any, Optional
-from vector_db.vectors import VectorPipeline
+from vector_db.vectors import VectorPipeline, get_vector_pipeline
 
 logger= logging.getLogger("retrieval_tool")
 
@@ -34,7 +34,7 @@ def query_pinecone(
     """
     try:
         if pipeline is None:
-            pipeline = VectorPipeline()
+            pipeline = get_vector_pipeline()
         
         # Generate query embedding
         query_embedding = pipeline.embeddings.embed_query(query_text)
@@ -0,0 +1,105 @@
+"""
+Small-talk responder - answers greetings, thanks and goodbyes from templates
+Runs in front of the graph, so these messages never reach the router or
+conversation LLMs.
+"""
+import logging
+import re
+from difflib import get_close_matches
+from typing import Dict, Optional
+from config.conf import settings
+from repositories.business_cache import get_business_cache
+
+logger = logging.getLogger("small_talk")
+
+
+# Replies per intent; businesses can override any of them with the
+# "smallTalkTemplates" field on their profile. {business_name} is filled in.
+DEFAULT_TEMPLATES: Dict[str, str] = {
+    "greeting": "Hello! 👋 Welcome to {business_name}. How can I help you today?",
+    "thanks": "You're welcome! Is there anything else I can help you with at {business_name}?",
+    "goodbye": "Thanks for chatting with {business_name}. Have a great day! 👋",
+}
+
+PHRASES: Dict[str, list] = {
+    "greeting": [
+        "hi", "hello", "hey", "hey there", "hi there", "hello there", "hiya", "howdy",
+        "good morning", "good afternoon", "good evening", "good day", "morning", "evening",
+        "greetings", "yo", "sup", "whats up", "how are you", "hi how are you",
+        "hello how are you", "hey how are you",
+    ],
+    "thanks": [
+        "thanks", "thank you", "thanks a lot", "thank you so much", "thanks so much",
+        "thank you very much", "many thanks", "thx", "ty", "cheers", "appreciate it",
+        "thanks for your help", "thank you for your help", "ok thanks", "okay thanks",
+        "ok thank you", "okay thank you",
+    ],
+    "goodbye": [
+        "bye", "goodbye", "bye bye", "see you", "see you later", "see ya",
+        "good night", "take care", "have a nice day", "have a good day",
+    ],
+}
+
+_NON_WORD = re.compile(r"[^a-z0-9\s]")
+_WHITESPACE = re.compile(r"\s+")
+_REPEATS = re.compile(r"(.)\1+")
+
+# Anything longer than this is treated as a real question
+MAX_SMALL_TALK_CHARS = 40
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation/emoji, collapse whitespace and repeated letters ("hiii!!" -> "hi")."""
+    text = _NON_WORD.sub(" ", text.lower().replace("'", ""))
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _REPEATS.sub(r"\1", text)
+
+
+_LOOKUP: Dict[str, str] = {
+    normalize(phrase): intent
+    for intent, phrases in PHRASES.items()
+    for phrase in phrases
+}
+
+
+def detect_small_talk(message: str) -> Optional[str]:
+    """
+    Detect pure greeting / gratitude / goodbye messages.
+
+    Exact lookup on the normalized text first, then fuzzy matching for
+    typos ("helo", "thnaks"). Messages that carry anything else
+    ("hi, what time do you open?") do not match.
+
+    Returns:
+        "greeting", "thanks", "goodbye" or None
+    """
+    text = normalize(message or "")
+    if not text or len(text) > MAX_SMALL_TALK_CHARS:
+        return None
+
+    intent = _LOOKUP.get(text)
+    if intent:
+        return intent
+
+    close = get_close_matches(text, _LOOKUP.keys(), n=1, cutoff=settings.SMALL_TALK_FUZZY_CUTOFF)
+    return _LOOKUP[close[0]] if close else None
+
+
+async def get_small_talk_templates(business_id: str) -> Dict[str, str]:
+    """Business-specific template overrides (empty if none or on error)."""
+    try:
+        business = await get_business_cache().get(business_id)
+        return (business or {}).get("smallTalkTemplates") or {}
+    except Exception as e:
+        logger.error(f"Error fetching small-talk templates: {str(e)}")
+        return {}
+
+
+def render_reply(intent: str, business_name: str, templates: Optional[Dict[str, str]] = None) -> str:
+    """Fill the business's template for `intent`, falling back to the default one."""
+    template = (templates or {}).get(intent) or DEFAULT_TEMPLATES[intent]
+    try:
+        return template.format(business_name=business_name)
+    except (KeyError, IndexError, ValueError):
+        logger.warning(f"Invalid small-talk template for '{intent}', using default")
+        return DEFAULT_TEMPLATES[intent].format(business_name=business_name)
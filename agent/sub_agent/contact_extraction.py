@@ -0,0 +1,103 @@
+"""
+Contact extraction - deterministic pre-processing of each new user message
+Pulls email, phone and contact preference out of the latest message only and
+stores them in AgentState, so no handler has to rescan the history.
+"""
+import logging
+import re
+from typing import Optional
+from agent.graph_builder.agent_state import AgentState
+from agent.agent_utils import get_last_user_message
+
+logger = logging.getLogger("contact_extraction")
+
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+# Matches formats like: +234..., 0..., +1..., etc.
+PHONE_PATTERN = re.compile(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4,}')
+PHONE_SEPARATORS = re.compile(r'[\s\-\(\)]')
+
+# Contact preference keywords
+EMAIL_KEYWORDS = re.compile(r'\b(e-?mail|mail me|inbox)\b', re.IGNORECASE)
+PHONE_KEYWORDS = re.compile(r'\b(call|phone|ring|text|sms|whatsapp)\b', re.IGNORECASE)
+BOTH_KEYWORDS = re.compile(r'\b(both|either)\b', re.IGNORECASE)
+
+PLACEHOLDER_EMAILS = {"user@example.com"}
+PLACEHOLDER_PHONES = {"string", "null"}
+
+
+def extract_email(text: str) -> Optional[str]:
+    """Extract email address from text."""
+    match = EMAIL_PATTERN.search(text)
+    if match and match.group(0) not in PLACEHOLDER_EMAILS:
+        return match.group(0)
+    return None
+
+
+def extract_phone(text: str) -> Optional[str]:
+    """Extract phone number from text, without spaces, dashes or parentheses."""
+    match = PHONE_PATTERN.search(text)
+    if match:
+        phone = PHONE_SEPARATORS.sub('', match.group(0))
+        if phone not in PLACEHOLDER_PHONES:
+            return phone
+    return None
+
+
+def detect_preference(text: str, has_email: bool = False, has_phone: bool = False) -> Optional[str]:
+    """
+    Keyword rules for how the user wants to be contacted.
+
+    Args:
+        text: The user message
+        has_email / has_phone: Whether the message itself contains an address / number
+
+    Returns:
+        "email", "phone", "both", or None when the text is ambiguous
+    """
+    wants_email = has_email or bool(EMAIL_KEYWORDS.search(text))
+    wants_phone = has_phone or bool(PHONE_KEYWORDS.search(text))
+
+    if (wants_email and wants_phone) or (BOTH_KEYWORDS.search(text) and (wants_email or wants_phone)):
+        return "both"
+    if wants_email:
+        return "email"
+    if wants_phone:
+        return "phone"
+    return None
+
+
+async def extract_contacts(state: AgentState) -> dict:
+    """
+    Graph node run once per new user message, before routing.
+
+    Only the latest message is scanned. The contact preference is only
+    read from messages that carry contact details or answer an open Tier 2
+    collection, so unrelated questions ("what's your phone number?") don't
+    set it. Returns only the fields it found, plus a reset of the previous
+    turn's route: routing is decided afresh for every message, and a turn
+    that bypasses the supervisor must not inherit a "tier1+tier2" fan-out.
+    """
+    update = {"route": None} if state.get("route") is not None else {}
+
+    text = get_last_user_message(state["messages"])
+    if not text:
+        return update
+
+    email = extract_email(text)
+    if email and email != state.get("user_email"):
+        update["user_email"] = email
+        logger.info(f"Extracted email: {email}")
+
+    phone = extract_phone(text)
+    if phone and phone != state.get("user_phone"):
+        update["user_phone"] = phone
+        logger.info(f"Extracted phone: {phone}")
+
+    if email or phone or state.get("tier2_pending"):
+        preference = detect_preference(text, has_email=bool(email), has_phone=bool(phone))
+        if preference and preference != state.get("preferred_contact_method"):
+            update["preferred_contact_method"] = preference
+            logger.info(f"Detected contact preference: {preference}")
+
+    return update
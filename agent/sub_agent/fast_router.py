@@ -0,0 +1,294 @@
+"""
+Fast local router - embedding similarity against labelled exemplars
+Decides in-process with the already-loaded MiniLM model; the LLM router is
+only consulted when the local decision is not confident enough.
+
+Offline accuracy / latency against the LLM router:
+python -m agent.sub_agent.fast_router
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+from config.conf import settings
+
+logger = logging.getLogger("fast_router")
+
+
+ROUTES = ("tier1", "tier2", "conversation")
+
+# Labelled exemplars per route. Keep them short and varied - each one is a
+# point the query is compared against.
+EXEMPLARS: Dict[str, List[str]] = {
+    "tier1": [
+        "What are your opening hours?",
+        "What time do you close today?",
+        "Are you open on Sunday?",
+        "Where are you located?",
+        "What is your address?",
+        "How much does it cost?",
+        "What are your prices?",
+        "Can I see the menu?",
+        "What services do you offer?",
+        "Do you deliver?",
+        "Do you accept card payments?",
+        "Is there parking available?",
+        "How long does delivery take?",
+        "Do you have vegetarian options?",
+        "What is your refund policy?",
+        "How much is a haircut?",
+    ],
+    "tier2": [
+        "I want to make a reservation",
+        "Can I book a table for four tonight?",
+        "I'd like to place an order",
+        "I want to speak to the owner",
+        "Can someone call me back?",
+        "I have a complaint about my order",
+        "My order arrived damaged",
+        "I need a custom quote for an event",
+        "Can I talk to a human?",
+        "Please contact me about a bulk order",
+        "I want to cancel my booking",
+        "I was charged twice, please help",
+        "Can I schedule an appointment?",
+        "My email is john@example.com",
+        "You can reach me on 08012345678",
+        "Please call me",
+    ],
+    "conversation": [
+        "Hi",
+        "Hello there",
+        "Good morning",
+        "Hey, how are you?",
+        "Thanks!",
+        "Thank you so much",
+        "Okay",
+        "Bye",
+        "Who are you?",
+        "What can you do?",
+        "Nice to meet you",
+        "lol",
+        "Have a great day",
+        "Are you a bot?",
+    ],
+}
+
+# Keyword rules: a match adds ROUTER_FAST_KEYWORD_WEIGHT to that route's score
+KEYWORD_RULES: Dict[str, re.Pattern] = {
+    "tier1": re.compile(
+        r"\b(hours?|open|clos(e|ing)|address|locat(ed|ion)|price|cost|how much|menu|services?|deliver(y)?|parking|refund)\b",
+        re.IGNORECASE
+    ),
+    "tier2": re.compile(
+        r"\b(book(ing)?|reserv(e|ation)|appointment|order|complain(t)?|refund me|owner|manager|human|call me|contact me|cancel)\b"
+        r"|[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\s-]{7,}\d",
+        re.IGNORECASE
+    ),
+    "conversation": re.compile(
+        r"^\s*(hi|hello|hey|good (morning|afternoon|evening)|thanks?( you)?|ok(ay)?|bye|goodbye)\b[\s!.]*$",
+        re.IGNORECASE
+    ),
+}
+
+
+@dataclass
+class RouteDecision:
+    """Outcome of a local classification."""
+    route: str
+    margin: float  # best score minus runner-up
+    scores: Dict[str, float]
+    elapsed_ms: float
+
+
+class FastRouter:
+    """
+    Nearest-exemplar classifier on sentence embeddings.
+
+    Each route is scored by the mean cosine similarity of its top_k closest
+    exemplars, plus a fixed boost when one of its keyword rules matches.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        exemplars: Dict[str, List[str]] = EXEMPLARS,
+        keyword_rules: Dict[str, re.Pattern] = KEYWORD_RULES,
+        keyword_weight: float = 0.1,
+        top_k: int = 3
+    ):
+        self.embeddings = embeddings
+        self.exemplars = exemplars
+        self.keyword_rules = keyword_rules
+        self.keyword_weight = keyword_weight
+        self.top_k = top_k
+        self._matrix: Optional[np.ndarray] = None
+        self._labels: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.counts = {"local": 0, "fallback": 0}
+
+    def _index(self):
+        """Embed the exemplars once (normalized, so dot product = cosine)."""
+        with self._lock:
+            if self._matrix is None:
+                texts, labels = [], []
+                for route, examples in self.exemplars.items():
+                    texts.extend(examples)
+                    labels.extend([route] * len(examples))
+                self._matrix = self._normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+                self._labels = np.asarray(labels)
+        return self._matrix, self._labels
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def classify(self, query: str) -> RouteDecision:
+        """Score the query against every route (blocking; CPU bound)."""
+        started = time.perf_counter()
+        matrix, labels = self._index()
+        vector = self._normalize(np.asarray(self.embeddings.embed_query(query), dtype=np.float32))
+        similarities = matrix @ vector
+
+        scores = {}
+        for route in self.exemplars:
+            route_sims = np.sort(similarities[labels == route])[::-1][:self.top_k]
+            score = float(route_sims.mean()) if route_sims.size else 0.0
+            rule = self.keyword_rules.get(route)
+            if rule is not None and rule.search(query):
+                score += self.keyword_weight
+            scores[route] = round(score, 4)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        margin = scores[ranked[0]] - scores[ranked[1]] if len(ranked) > 1 else scores[ranked[0]]
+        return RouteDecision(
+            route=ranked[0],
+            margin=round(margin, 4),
+            scores=scores,
+            elapsed_ms=(time.perf_counter() - started) * 1000
+        )
+
+    def is_compound(self, query: str) -> bool:
+        """Both the tier1 and tier2 keyword rules match (possibly a compound request)."""
+        return all(
+            rule.search(query)
+            for route, rule in self.keyword_rules.items() if route in ("tier1", "tier2")
+        )
+
+    async def aclassify(self, query: str) -> RouteDecision:
+        """Classify off the event loop."""
+        return await asyncio.to_thread(self.classify, query)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.counts["local"] + self.counts["fallback"]
+        return {
+            **self.counts,
+            "local_rate": round(self.counts["local"] / total, 3) if total else None,
+            "min_margin": settings.ROUTER_FAST_MIN_MARGIN
+        }
+
+
+_fast_router: Optional[FastRouter] = None
+_fast_router_lock = threading.Lock()
+
+
+def get_fast_router() -> Optional[FastRouter]:
+    """
+    Process-wide fast router, or None when ROUTER_FAST_ENABLED is off.
+    The first call loads the embedding model (blocking; may raise).
+    """
+    global _fast_router
+
+    if not settings.ROUTER_FAST_ENABLED:
+        return None
+
+    with _fast_router_lock:
+        if _fast_router is None:
+            from vector_db.embedding import get_embeddings
+            _fast_router = FastRouter(get_embeddings(), keyword_weight=settings.ROUTER_FAST_KEYWORD_WEIGHT)
+    return _fast_router
+
+
+async def aget_fast_router() -> Optional[FastRouter]:
+    """get_fast_router, building it off the event loop on first use."""
+    if not settings.ROUTER_FAST_ENABLED:
+        return None
+    if _fast_router is not None:
+        return _fast_router
+    return await asyncio.to_thread(get_fast_router)
+
+
+def peek_fast_router() -> Optional[FastRouter]:
+    """The fast router if it has been built, without loading anything (metrics)."""
+    return _fast_router if settings.ROUTER_FAST_ENABLED else None
+
+
+# Held-out labelled queries (not in EXEMPLARS) for the offline comparison
+EVAL_SET = [
+    ("when do you open in the morning", "tier1"),
+    ("how far are you from the airport", "tier1"),
+    ("what's the price of jollof rice", "tier1"),
+    ("do you do home service", "tier1"),
+    ("which payment methods do you take", "tier1"),
+    ("is the shop open on public holidays", "tier1"),
+    ("I'd like to reserve a room for next weekend", "tier2"),
+    ("my package never arrived and I'm upset", "tier2"),
+    ("can the manager get in touch with me", "tier2"),
+    ("I want to order 50 cupcakes for a party", "tier2"),
+    ("reach me at ada@mail.com", "tier2"),
+    ("please ring me on +234 803 555 0199", "tier2"),
+    ("good evening", "conversation"),
+    ("thanks a lot, that helps", "conversation"),
+    ("hey there", "conversation"),
+    ("what's your name", "conversation"),
+    ("cool", "conversation"),
+    ("see you later", "conversation"),
+]
+
+
+async def _evaluate():
+    """Compare the local router with the LLM router on EVAL_SET."""
+    from vector_db.embedding import get_embeddings
+    from agent.sub_agent.router import llm_route
+
+    router = FastRouter(get_embeddings(), keyword_weight=settings.ROUTER_FAST_KEYWORD_WEIGHT)
+    router.classify("warm up")
+
+    rows = []
+    for query, expected in EVAL_SET:
+        decision = router.classify(query)
+        started = time.perf_counter()
+        try:
+            llm_choice = await llm_route(query)
+        except Exception as e:
+            logger.warning(f"LLM router failed on '{query}': {str(e)}")
+            llm_choice = None
+        llm_ms = (time.perf_counter() - started) * 1000
+        rows.append((query, expected, decision, llm_choice, llm_ms))
+
+    threshold = settings.ROUTER_FAST_MIN_MARGIN
+    n = len(rows)
+    local_acc = sum(d.route == e for _, e, d, _, _ in rows) / n
+    llm_acc = sum(l == e for _, e, _, l, _ in rows) / n
+    confident = [r for r in rows if r[2].margin >= threshold]
+    hybrid_acc = sum((d.route if d.margin >= threshold else l) == e for _, e, d, l, _ in rows) / n
+
+    print(f"{'query':<45} {'expected':<13} {'local':<13} {'margin':>7} {'llm':<13}")
+    for query, expected, decision, llm_choice, _ in rows:
+        print(f"{query[:44]:<45} {expected:<13} {decision.route:<13} {decision.margin:>7.3f} {str(llm_choice):<13}")
+
+    print()
+    print(f"local  accuracy={local_acc:.2%}  avg_ms={np.mean([r[2].elapsed_ms for r in rows]):.1f}")
+    print(f"llm    accuracy={llm_acc:.2%}  avg_ms={np.mean([r[4] for r in rows]):.1f}")
+    print(f"hybrid accuracy={hybrid_acc:.2%}  decided locally={len(confident)}/{n} (min margin {threshold})")
+    if confident:
+        print(f"local accuracy when confident={sum(r[2].route == r[1] for r in confident) / len(confident):.2%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_evaluate())
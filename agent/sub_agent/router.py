@@ -2,56 +2,183 @@
 Router/Supervisor - Classifies user queries and routes to appropriate handler
 """
 import logging
+from typing import List, Optional, Tuple
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
 from agent.graph_builder.agent_state import AgentState
-from agent.llm import get_llm
-from agent.agent_utils import get_last_user_message
+from agent.llm import invoke_llm
+from agent.prompts import ROUTE_AND_RESPOND, ROUTER
+from agent.sub_agent.fast_router import aget_fast_router
+from agent.agent_utils import format_chat_history, get_last_user_message, parse_json_object
+from config.conf import settings
 
 logger = logging.getLogger("router")
 
+# Compound message (business info + human help): Tier 1 and Tier 2 run in parallel
+MULTI_ROUTE = "tier1+tier2"
+
+VALID_ROUTES = ["tier1", "tier2", "conversation", MULTI_ROUTE]
+
+
+def route_targets(route: Optional[str]) -> List[str]:
+    """The single routes a (possibly compound) route label stands for."""
+    return (route or "conversation").split("+")
+
+
+def _route_update(route: str) -> dict:
+    """
+    State update for a routing decision. Running the supervisor restarts the
+    Tier 2 bypass budget, and routing elsewhere abandons an open collection
+    (a later Tier 2 turn starts a new support request).
+    """
+    update = {"route": route, "tier2_turns": 0}
+    if "tier2" not in route_targets(route):
+        update["tier2_pending"] = False
+        update["tier2_request_id"] = None
+    return update
+
+
+async def llm_route(user_query: str) -> str:
+    """
+    Classify a query with the router LLM.
+    
+    Returns:
+        "tier1", "tier2", "conversation" or "tier1+tier2" (invalid answers map to conversation)
+    """
+    routing_prompt = ROUTER.render(user_query=user_query)
+    
+    response = await invoke_llm(routing_prompt, profile="router")
+    route = response.content.strip().lower()
+    
+    # Validate route
+    if route not in VALID_ROUTES:
+        logger.warning(f"Invalid route '{route}', defaulting to conversation")
+        route = "conversation"
+    
+    return route
+
+
+def parse_route_and_reply(content: str) -> Tuple[str, Optional[str]]:
+    """
+    Parse the route-and-respond JSON ({"route": ..., "reply": ...}).
+    
+    Tolerates code fences or text around the object, and a bare route word.
+    Anything unparseable maps to conversation without a draft, so the
+    conversation agent answers as usual.
+    """
+    text = content.strip()
+    data = parse_json_object(text)
+    if data is not None:
+        route = str(data.get("route", "")).strip().lower()
+        reply = str(data.get("reply") or "").strip()
+        if route in VALID_ROUTES:
+            return route, reply or None
+    
+    if text.lower() in VALID_ROUTES:
+        return text.lower(), None
+    
+    logger.warning(f"Invalid route-and-respond output '{text[:80]}', defaulting to conversation")
+    return "conversation", None
+
+
+async def llm_route_and_respond(state: AgentState, user_query: str) -> Tuple[str, Optional[str]]:
+    """
+    Classify the query and, for conversation turns, draft the reply in the same call.
+    
+    Returns:
+        (route, draft reply or None)
+    """
+    prompt = ROUTE_AND_RESPOND.render(
+        business_name=state.get("business_name", "this business"),
+        chat_history=format_chat_history(state["messages"][:-1], state.get("conversation_summary")),  # Exclude current message
+        user_query=user_query
+    )
+    
+    response = await invoke_llm(prompt, profile="route_and_respond")
+    return parse_route_and_reply(response.content)
+
 
 async def route_query(state: AgentState) -> dict:
     """
     Classify/Route user query to appropriate handler.
     This is used as a GRAPH NODE, so it returns a dict to update state.
     
+    When the fast router is enabled the query is first classified locally;
+    the LLM is only called if the local margin is below ROUTER_FAST_MIN_MARGIN.
+    
+    With ROUTER_RESPOND_ENABLED the LLM call also drafts the reply; for
+    conversation turns the draft is appended as the answer and the graph
+    ends without calling the conversation agent. For other routes the
+    draft is discarded.
+    
+    Messages that both ask for business info and need human help get the
+    compound route "tier1+tier2", which fans out to both handlers.
+    
     Returns:
-        dict with "route" key set to "tier1", "tier2", or "conversation"
+        dict with "route" key set to "tier1", "tier2", "conversation" or "tier1+tier2"
     """
-    llm = get_llm()
-    
     # Get last user message
     user_query = get_last_user_message(state["messages"])
     
     if not user_query:
-        return {"route": "conversation"}
+        return _route_update("conversation")
     
-    routing_prompt = f"""You are a query router for a business chatbot.
-
-Classify the user query into ONE of these categories:
-
-1. **tier1** - Questions about business info (hours, location, services, prices, menu, FAQs)
-2. **tier2** - Requests needing human help (reservations, orders, complaints, custom requests)
-3. **conversation** - General greetings, small talk, unclear requests
-
-User Query: "{user_query}"
-
-Respond with ONLY ONE WORD: tier1, tier2, or conversation
-"""
+    try:
+        # Loading the embedding model can fail too; the LLM classifier covers it
+        fast_router = await aget_fast_router()
+        if fast_router is not None:
+            decision = await fast_router.aclassify(user_query)
+            # Only the LLM router emits the compound route, so mixed keyword hits go to it
+            if decision.margin >= settings.ROUTER_FAST_MIN_MARGIN and not fast_router.is_compound(user_query):
+                fast_router.counts["local"] += 1
+                logger.info(f"Routed locally to: {decision.route} (margin {decision.margin:.3f}, {decision.elapsed_ms:.1f}ms)")
+                return _route_update(decision.route)
+            fast_router.counts["fallback"] += 1
+            logger.info(f"Local route '{decision.route}' below margin ({decision.margin:.3f}), asking LLM")
+    except Exception as e:
+        logger.error(f"Fast router error: {str(e)}")
     
     try:
-        response = await llm.ainvoke(routing_prompt)
-        route = response.content.strip().lower()
+        if settings.ROUTER_RESPOND_ENABLED:
+            route, draft = await llm_route_and_respond(state, user_query)
+            logger.info(f"Routed to: {route} (route-and-respond)")
+            if route == "conversation" and draft:
+                return {**_route_update(route), "messages": [AIMessage(content=draft)]}
+            return _route_update(route)
         
-        # Validate route
-        if route not in ["tier1", "tier2", "conversation"]:
-            logger.warning(f"Invalid route '{route}', defaulting to conversation")
-            route = "conversation"
+        route = await llm_route(user_query)
         
         logger.info(f"Routed to: {route}")
         
         # Return dict to update state
-        return {"route": route}
+        return _route_update(route)
         
     except Exception as e:
         logger.error(f"Routing error: {str(e)}")
-        return {"route": "conversation"}
+        return _route_update("conversation")
+
+
+async def merge_replies(state: AgentState) -> dict:
+    """
+    Join the replies of a compound turn into one message.
+    
+    Tier 1 and Tier 2 each append an AIMessage in the same step; they are
+    replaced by a single message (in branch order: the business info
+    first, then the contact follow-up) so the customer gets one answer and
+    the history reads as one turn.
+    """
+    replies = []
+    for message in reversed(state["messages"]):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, AIMessage) and message.content:
+            replies.append(message)
+    replies.reverse()
+    
+    if len(replies) < 2:
+        return {"route": MULTI_ROUTE}
+    
+    merged = "\n\n".join(message.content.strip() for message in replies)
+    return {
+        "messages": [RemoveMessage(id=message.id) for message in replies] + [AIMessage(content=merged)],
+        "route": MULTI_ROUTE
+    }
@@ -5,7 +5,8 @@ Uses Pinecone retrieval to answer business-related questions
 import logging
 from langchain_core.messages import AIMessage
 from agent.retrieval import query_pinecone
-from agent.llm import get_llm
+from agent.llm import invoke_llm
+from agent.prompts import TIER1
 from agent.graph_builder.agent_state import AgentState
 from agent.agent_utils import format_chat_history, get_last_user_message
 
@@ -56,33 +57,17 @@ async def Tier1(state: AgentState) -> dict:
         context = "\n".join(context_parts)
         
         # Step 3: Build conversation context using utility
-        chat_history = format_chat_history(state["messages"][:-1])  # Exclude current message
+        chat_history = format_chat_history(state["messages"][:-1], state.get("conversation_summary"))  # Exclude current message
         
         # Step 4: Generate answer using LLM
-        llm = get_llm()
-        
-        prompt = f"""You are a helpful business assistant for {business_name}.
-
-Use the following business information to answer the user's question accurately and naturally.
-
-BUSINESS INFORMATION:
-{context}
-
-CONVERSATION HISTORY:
-{chat_history}
-
-USER QUESTION: {user_message}
-
-INSTRUCTIONS:
-- Answer based ONLY on the provided business information
-- Be friendly, concise, and helpful
-- If the information isn't in the context, say "I don't have that information, but I can help you contact the business owner"
-- Include specific details like prices (₦), hours, location when relevant
-- Don't make up information
-
-ANSWER:"""
+        prompt = TIER1.render(
+            business_name=business_name,
+            context=context,
+            chat_history=chat_history,
+            user_message=user_message
+        )
         
-        response = await llm.ainvoke(prompt)
+        response = await invoke_llm(prompt, profile="tier1", hedge=not state.get("streaming"))
         answer = response.content.strip()
         
         # Calculate confidence based on retrieval scores
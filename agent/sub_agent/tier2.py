@@ -3,35 +3,41 @@ Tier 2 Handler - Human Support Requests
 LLM-powered conversational flow for collecting contact info
 """
 import logging
-import re
-from langchain_core.messages import AIMessage
-from agent.llm import get_llm
-from agent.email_service import send_support_email
+import uuid
+from typing import Optional
+from langchain_core.messages import AIMessage, HumanMessage
+from agent.llm import invoke_llm
+from agent.prompts import TIER2_TURN
+from agent.email_service import queue_support_email
 from agent.graph_builder.agent_state import AgentState
-from agent.agent_utils import format_chat_history, get_last_user_message
+from agent.agent_utils import format_chat_history, get_last_user_message, parse_json_object
+from agent.sub_agent.router import MULTI_ROUTE
 
 logger = logging.getLogger("tier2")
 
 
-def extract_email(text: str) -> str:
-    """Extract email address from text using regex."""
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    match = re.search(email_pattern, text)
-    return match.group(0) if match else None
+def _has_required_contact(method: Optional[str], has_email: bool, has_phone: bool) -> bool:
+    """True when the collected details cover the customer's preferred method."""
+    if method == "email":
+        return has_email
+    if method == "phone":
+        return has_phone
+    if method == "both":
+        return has_email and has_phone
+    return False
 
 
-def extract_phone(text: str) -> str:
-    """Extract phone number from text using regex."""
-    # Matches formats like: +234..., 0..., +1..., etc.
-    phone_pattern = r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4,}'
-    match = re.search(phone_pattern, text)
-    if match:
-        # Clean up the phone number
-        phone = match.group(0)
-        # Remove spaces, dashes, parentheses
-        phone = re.sub(r'[\s\-\(\)]', '', phone)
-        return phone
-    return None
+def _request_id(state: AgentState) -> str:
+    """
+    The open request's ID, or for a new request the ID of the message that
+    raised it: the same when the turn is retried, new for every later request.
+    """
+    if state.get("tier2_request_id"):
+        return state["tier2_request_id"]
+    for message in reversed(state["messages"]):
+        if isinstance(message, HumanMessage) and message.id:
+            return message.id
+    return uuid.uuid4().hex
 
 
 async def Tier2(state: AgentState) -> dict:
@@ -39,12 +45,26 @@ async def Tier2(state: AgentState) -> dict:
     Handle Tier 2 queries (human support requests) using LLM for conversation.
     
     Flow:
-    1. Use LLM to have natural conversation
-    2. Extract contact preferences and info from conversation
+    1. Contact details and preference come from state (filled per message
+       by the extract_contacts stage, no history rescans)
+    2. One structured LLM call returns the main issue, summary and the
+       reply to the customer, plus the contact preference when the keyword
+       rules couldn't tell
     3. Send email when we have sufficient info
     
+    Each support request gets an ID when Tier 2 first runs for it, kept
+    while its contact collection is open. The outbox key is built from it
+    (not from the LLM's wording of the issue), so a retried turn doesn't
+    queue a second email. The ID is cleared once the email is queued, so
+    the next request on the thread is a new one.
+    
+    On a compound turn (route "tier1+tier2") this runs alongside Tier 1 and
+    keeps the compound route, so the graph merges both replies.
+    
     Returns dict to update state.
     """
+    route = MULTI_ROUTE if state.get("route") == MULTI_ROUTE else "tier2"
+    request_id = _request_id(state)
     try:
         # Extract state variables
         user_email = state.get("user_email")
@@ -59,107 +79,50 @@ async def Tier2(state: AgentState) -> dict:
         if user_phone in ["string", None, ""]:
             user_phone = None
         
-        # Get conversation history and last user message
-        conversation_history = format_chat_history(state["messages"])
-        last_user_msg = get_last_user_message(state["messages"])
-        
-        # Extract contact info from USER messages only (not AI responses)
-        from langchain_core.messages import HumanMessage
-        user_messages = [msg for msg in state["messages"] if isinstance(msg, HumanMessage)]
+        # Get conversation history
+        conversation_history = format_chat_history(state["messages"], state.get("conversation_summary"))
         
-        if not user_email:
-            for msg in user_messages:
-                msg_content = msg.content if hasattr(msg, 'content') else str(msg)
-                extracted_email = extract_email(msg_content)
-                # Ignore placeholder emails
-                if extracted_email and extracted_email != "user@example.com":
-                    user_email = extracted_email
-                    logger.info(f"Extracted email: {user_email}")
-                    break
+        has_email = bool(user_email)
+        has_phone = bool(user_phone)
         
-        if not user_phone:
-            for msg in user_messages:
-                msg_content = msg.content if hasattr(msg, 'content') else str(msg)
-                extracted_phone = extract_phone(msg_content)
-                # Ignore placeholder phones
-                if extracted_phone and extracted_phone not in ["string", "null"]:
-                    user_phone = extracted_phone
-                    logger.info(f"Extracted phone: {user_phone}")
-                    break
+        # Single structured call: preference, issue, summary and reply together
+        turn_prompt = TIER2_TURN.render(
+            business_name=business_name,
+            preferred_contact_method=preferred_contact_method or 'not specified',
+            user_email=user_email or 'not provided',
+            user_phone=user_phone or 'not provided',
+            conversation_history=conversation_history
+        )
         
-        # Use LLM to determine contact preference if not set
-        if not preferred_contact_method:
-            llm = get_llm()
-            
-            analysis_prompt = f"""Analyze this user message and determine their preferred contact method.
-
-User message: "{last_user_msg}"
-
-Determine if they want to be contacted via:
-- "email" (if they mention email, mail, or provide an email address)
-- "phone" (if they mention phone, call, or provide a phone number)
-- "both" (if they mention both or want multiple contact methods)
-- "unknown" (if unclear)
-
-Respond with ONLY one word: email, phone, both, or unknown"""
-
-            analysis_response = await llm.ainvoke(analysis_prompt)
-            detected_method = analysis_response.content.strip().lower()
-            
-            if detected_method in ["email", "phone", "both"]:
-                preferred_contact_method = detected_method
-                logger.info(f"LLM detected contact preference: {preferred_contact_method}")
+        response = await invoke_llm(turn_prompt, profile="tier2")
+        extraction = parse_json_object(response.content) or {}
+        if not extraction:
+            logger.warning("Tier 2 extraction was not valid JSON, using fallbacks")
         
-        # Check if we have enough information to send email
-        has_email = bool(user_email)
-        has_phone = bool(user_phone)
+        # Keyword rules win; the LLM only fills in an ambiguous preference
+        detected_method = str(extraction.get("preferred_contact_method") or "").strip().lower()
+        if not preferred_contact_method and detected_method in ["email", "phone", "both"]:
+            logger.info(f"LLM detected contact preference: {detected_method}")
+            preferred_contact_method = detected_method
         
-        # Determine if we can proceed
-        can_send_email = False
-        if preferred_contact_method == "email" and has_email:
-            can_send_email = True
-        elif preferred_contact_method == "phone" and has_phone:
-            can_send_email = True
-        elif preferred_contact_method == "both" and has_email and has_phone:
-            can_send_email = True
+        reply = str(extraction.get("reply") or "").strip()
         
         # If we can send email, do it
-        if can_send_email:
+        if _has_required_contact(preferred_contact_method, has_email, has_phone):
             logger.info(f"Sufficient contact info collected - sending email to {business_email}")
             
-            # Generate conversation summary
-            llm = get_llm()
-            
-            # Extract the main customer issue
-            issue_prompt = f"""Extract the main customer issue or request from this conversation in 1 sentence.
-Focus on WHAT the customer needs help with, not the contact collection process.
-
-CONVERSATION:
-{conversation_history}
-
-MAIN ISSUE:"""
+            main_issue = str(extraction.get("main_issue") or "").strip() or get_last_user_message(state["messages"])
+            conversation_summary = str(extraction.get("summary") or "").strip() or conversation_history
             
-            issue_response = await llm.ainvoke(issue_prompt)
-            main_issue = issue_response.content.strip()
-            
-            # Generate conversation summary
-            summary_prompt = f"""Summarize this customer support conversation in 2-3 sentences.
-Focus on what the customer needs and key details.
-
-CONVERSATION:
-{conversation_history}
-
-BRIEF SUMMARY:"""
-            
-            summary_response = await llm.ainvoke(summary_prompt)
-            conversation_summary = summary_response.content.strip()
-            
-            # Send email to business owner
+            # Queue email to business owner (delivered by the outbox worker)
             email_sent = False
             
             if business_email:
-                logger.info(f"Sending support email to {business_email}")
-                email_sent = await send_support_email(
+                logger.info(f"Queueing support email to {business_email}")
+                email_sent = await queue_support_email(
+                    thread_id=state.get("thread_id") or "unknown",
+                    request_id=request_id,
+                    business_id=state.get("business_id"),
                     business_name=business_name,
                     business_email=business_email,
                     user_email=user_email or "Not provided",
@@ -170,68 +133,49 @@ BRIEF SUMMARY:"""
             else:
                 logger.warning(f"No business email found - cannot send notification")
             
-            # Generate success response using LLM
-            success_prompt = f"""Generate a friendly confirmation message for a customer.
-
-Context:
-- Business: {business_name}
-- Customer wants to be contacted via: {preferred_contact_method}
-- Customer email: {user_email or 'not provided'}
-- Customer phone: {user_phone or 'not provided'}
-- Email sent to business: {email_sent}
-
-Generate a warm, professional message confirming:
-1. Their request has been sent to the business
-2. How the business will contact them
-3. Their contact details
-4. Ask if there's anything else you can help with
-
-Keep it friendly and concise (2-3 sentences)."""
-
-            response = await llm.ainvoke(success_prompt)
+            # The reply was drafted before sending; don't confirm a notification that failed
+            if not email_sent:
+                reply = (
+                    f"I've noted your request, but I couldn't notify {business_name} right now. "
+                    f"Please try again shortly or contact them directly"
+                    f"{' at ' + business_email if business_email else ''}."
+                )
+            elif not reply:
+                reply = f"Thanks! Your request has been sent to {business_name} and they'll contact you soon. Is there anything else I can help with?"
             
             return {
-                "messages": [AIMessage(content=response.content)],
+                "messages": [AIMessage(content=reply)],
                 "email_sent": email_sent,
                 "user_email": user_email,
                 "user_phone": user_phone,
                 "preferred_contact_method": preferred_contact_method,
-                "route": "tier2"
+                "route": route,
+                "tier2_pending": False,
+                "tier2_turns": 0,
+                # Queued: the next support request gets its own ID (kept on failure for the retry)
+                "tier2_request_id": None if email_sent else request_id
             }
         
-        # We don't have enough info yet - use LLM to ask for it naturally
+        # We don't have enough info yet - ask for it with the drafted reply
         else:
-            llm = get_llm()
-            
-            # Build context for LLM
-            context = f"""You are helping a customer who wants to speak with someone from {business_name}.
-
-Current situation:
-- Preferred contact method: {preferred_contact_method or 'not specified'}
-- Has email: {has_email}
-- Has phone: {has_phone}
-
-Conversation so far:
-{conversation_history}
-
-Your task:
-Generate a friendly, natural response that:
-1. If contact preference unknown: Ask how they'd like to be contacted (email, phone, or both)
-2. If preference is email but no email: Ask for their email address
-3. If preference is phone but no phone: Ask for their phone number
-4. If preference is both but missing either: Ask for the missing info
-
-Be conversational and warm. Don't be robotic. Keep it brief (1-2 sentences)."""
-
-            response = await llm.ainvoke(context)
+            if not reply:
+                reply = (
+                    "How would you like to be contacted - email, phone, or both?"
+                    if not preferred_contact_method else
+                    "Could you share your contact details so the business can reach you?"
+                )
             
             return {
-                "messages": [AIMessage(content=response.content)],
+                "messages": [AIMessage(content=reply)],
                 "email_sent": False,
                 "user_email": user_email,
                 "user_phone": user_phone,
                 "preferred_contact_method": preferred_contact_method,
-                "route": "tier2"
+                "route": route,
+                # Keep the collection open so the reply goes straight back to Tier 2
+                "tier2_pending": True,
+                "tier2_turns": (state.get("tier2_turns") or 0) + 1,
+                "tier2_request_id": request_id
             }
         
     except Exception as e:
@@ -239,5 +183,7 @@ Be conversational and warm. Don't be robotic. Keep it brief (1-2 sentences)."""
         return {
             "messages": [AIMessage(content=f"I apologize, but I'm having trouble processing your request. Please try contacting {business_name} directly at {business_email if business_email else 'their listed contact'}.")],
             "email_sent": False,
-            "route": "tier2"
+            "route": route,
+            "tier2_pending": False,
+            "tier2_request_id": None
         }
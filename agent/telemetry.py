@@ -0,0 +1,163 @@
+"""
+Per-turn token and latency accounting across graph nodes and LLM calls
+"""
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional
+from config.conf import settings
+from utils.metrics import LatencyTracker
+
+logger = logging.getLogger("telemetry")
+
+
+@dataclass
+class LLMCallRecord:
+    """One invoke_llm call made while handling a turn."""
+    node: Optional[str]
+    profile: str
+    model: Optional[str]
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    queue_wait_ms: float = 0.0
+    wall_ms: float = 0.0
+    cache_hit: bool = False
+
+
+@dataclass
+class TurnTrace:
+    """Everything measured while handling one user message."""
+    business_id: str
+    thread_id: str
+    started: float = field(default_factory=time.perf_counter)
+    total_ms: Optional[float] = None
+    node_ms: Dict[str, float] = field(default_factory=dict)
+    llm_calls: List[LLMCallRecord] = field(default_factory=list)
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Per-node breakdown plus the raw LLM call list."""
+        nodes = {
+            name: {"wall_ms": round(ms, 1), "llm_calls": 0, "llm_ms": 0.0, "queue_wait_ms": 0.0,
+                   "prompt_tokens": 0, "completion_tokens": 0}
+            for name, ms in self.node_ms.items()
+        }
+        for call in self.llm_calls:
+            node = nodes.setdefault(call.node or "unknown", {
+                "wall_ms": None, "llm_calls": 0, "llm_ms": 0.0, "queue_wait_ms": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0
+            })
+            node["llm_calls"] += 1
+            node["llm_ms"] = round(node["llm_ms"] + call.wall_ms, 1)
+            node["queue_wait_ms"] = round(node["queue_wait_ms"] + call.queue_wait_ms, 1)
+            node["prompt_tokens"] += call.prompt_tokens
+            node["completion_tokens"] += call.completion_tokens
+
+        return {
+            "total_ms": round(self.total_ms, 1) if self.total_ms is not None else None,
+            "prompt_tokens": sum(c.prompt_tokens for c in self.llm_calls),
+            "completion_tokens": sum(c.completion_tokens for c in self.llm_calls),
+            "nodes": nodes,
+            "llm_calls": [
+                {**asdict(c), "queue_wait_ms": round(c.queue_wait_ms, 1), "wall_ms": round(c.wall_ms, 1)}
+                for c in self.llm_calls
+            ]
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar("turn_trace", default=None)
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("graph_node", default=None)
+
+
+class TelemetryAggregator:
+    """Running totals per node and per business, exported via /metrics/turns."""
+
+    def __init__(self):
+        self.node_latency = LatencyTracker()
+        self.business_latency = LatencyTracker()
+        self._tokens = defaultdict(lambda: {"prompt_tokens": 0, "completion_tokens": 0,
+                                            "llm_calls": 0, "queue_wait_ms": 0.0})
+        self._lock = threading.Lock()
+
+    def add(self, trace: TurnTrace):
+        self.business_latency.record(trace.business_id, trace.total_ms or 0.0)
+        for name, ms in trace.node_ms.items():
+            self.node_latency.record(name, ms)
+
+        with self._lock:
+            for call in trace.llm_calls:
+                for key in (f"node:{call.node or 'unknown'}", f"business:{trace.business_id}"):
+                    totals = self._tokens[key]
+                    totals["prompt_tokens"] += call.prompt_tokens
+                    totals["completion_tokens"] += call.completion_tokens
+                    totals["llm_calls"] += 1
+                    totals["queue_wait_ms"] = round(totals["queue_wait_ms"] + call.queue_wait_ms, 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tokens = {key: dict(value) for key, value in self._tokens.items()}
+
+        def merge(prefix: str, latency: Dict[str, Any]) -> Dict[str, Any]:
+            merged = {}
+            for name in set(latency) | {k[len(prefix):] for k in tokens if k.startswith(prefix)}:
+                merged[name] = {"latency": latency.get(name), **tokens.get(prefix + name, {})}
+            return merged
+
+        return {
+            "nodes": merge("node:", self.node_latency.snapshot()),
+            "businesses": merge("business:", self.business_latency.snapshot())
+        }
+
+
+aggregator = TelemetryAggregator()
+
+
+def start_trace(business_id: str, thread_id: str) -> TurnTrace:
+    """Begin accounting for a turn in the current context."""
+    trace = TurnTrace(business_id=business_id, thread_id=thread_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def finish_trace(trace: TurnTrace):
+    """Close a turn: fold it into the aggregates and optionally log it."""
+    trace.finish()
+    aggregator.add(trace)
+    if settings.TELEMETRY_LOG_TURNS:
+        logger.info(json.dumps({"business_id": trace.business_id, "thread_id": trace.thread_id, **trace.to_dict()}))
+
+
+def record_llm_call(record: LLMCallRecord):
+    """Attach an LLM call to the active turn (no-op outside a turn)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        if record.node is None:
+            record.node = _current_node.get()
+        trace.llm_calls.append(record)
+
+
+def traced_node(name: str, node: Callable) -> Callable:
+    """
+    Wrap a graph node so its wall time is recorded and LLM calls made
+    inside it are attributed to it.
+    """
+    @functools.wraps(node)
+    async def wrapper(state):
+        _current_node.set(name)
+        started = time.perf_counter()
+        try:
+            return await node(state)
+        finally:
+            trace = _current_trace.get()
+            if trace is not None:
+                elapsed = (time.perf_counter() - started) * 1000
+                trace.node_ms[name] = trace.node_ms.get(name, 0.0) + elapsed
+
+    return wrapper
@@ -1,3 +1,4 @@
+from typing import Any, Dict, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -8,7 +9,34 @@ class Settings(BaseSettings):
         extra="ignore",
     )
     MONGO_URL:str
+    # Mongo connection pool, per client and worker process (sync + async client)
+    MONGO_MAX_POOL_SIZE:int = 50
+    MONGO_MIN_POOL_SIZE:int = 0
+    MONGO_MAX_IDLE_SECONDS:float = 300
+    MONGO_CONNECT_TIMEOUT_SECONDS:float = 10
+    MONGO_SERVER_SELECTION_TIMEOUT_SECONDS:float = 10  # fail fast when no server is reachable
+    MONGO_SOCKET_TIMEOUT_SECONDS:float = 20
+    # Create the declared indexes at startup (also: python -m repositories.indexes ensure)
+    MONGO_ENSURE_INDEXES:bool = True
+    MONGO_SESSION_TTL_DAYS:float = 30  # idle WhatsApp sessions expire (0 keeps them forever)
+    # In-process cache of the agent-facing business profile (name, email, templates, digest)
+    BUSINESS_CACHE_ENABLED:bool = True
+    BUSINESS_CACHE_TTL_SECONDS:float = 300  # staleness bound for other workers without the watcher
+    BUSINESS_CACHE_MAX_ENTRIES:int = 1000
+    BUSINESS_CACHE_WATCH:bool = False  # invalidate across workers via a change stream (replica set only)
     POSTGRES_DB_URL:str
+    # Connection pool, per worker process (see README: PgBouncer)
+    POSTGRES_POOL_MIN_SIZE:int = 2
+    POSTGRES_POOL_MAX_SIZE:int = 20
+    POSTGRES_POOL_TIMEOUT_SECONDS:float = 30  # wait for a free connection
+    POSTGRES_POOL_MAX_WAITING:int = 0  # queued requests before failing fast (0 = no limit)
+    POSTGRES_POOL_MAX_IDLE_SECONDS:float = 600
+    POSTGRES_POOL_MAX_LIFETIME_SECONDS:float = 3600
+    POSTGRES_CONNECT_TIMEOUT_SECONDS:int = 10
+    # Disable prepared statements when connecting through PgBouncer in transaction mode
+    POSTGRES_PGBOUNCER:bool = False
+    # Direct server connection (not PgBouncer) for session-level locks; defaults to POSTGRES_DB_URL
+    POSTGRES_DIRECT_URL:Optional[str] = None
     PINECONE_API_KEY:str
     KB_INDEX:str
     PINECONE_CLOUD:str
@@ -17,6 +45,50 @@ class Settings(BaseSettings):
     LLAMA_MODEL:str
     TEMPERATURE:float
     MAX_TOKENS:int
+    # Per-node LLM profiles as JSON, e.g. {"router": {"model": "llama-3.1-8b-instant", "max_tokens": 5}}
+    LLM_PROFILES:Dict[str, Dict[str, Any]] = {}
+    # Small/fast model for one-word classification nodes (router)
+    CLASSIFIER_MODEL:Optional[str] = None
+    # LLM response cache (nodes opt in through their profile)
+    LLM_CACHE_ENABLED:bool = False
+    LLM_CACHE_BACKEND:str = "memory"  # "memory" or "postgres"
+    LLM_CACHE_MAX_ENTRIES:int = 2048
+    LLM_CACHE_TTL_SECONDS:int = 3600
+    LLM_CACHE_PURGE_INTERVAL_SECONDS:int = 900  # delete expired postgres rows at most this often
+    # LLM scheduler (rate-limit admission, priorities, retries); limits adapt to Groq headers.
+    # Off by default: set RPM/TPM to your Groq tier first - the request headers are per day,
+    # so the per-minute request limit never rises above LLM_RATE_LIMIT_RPM on its own
+    LLM_SCHEDULER_ENABLED:bool = False
+    LLM_RATE_LIMIT_RPM:int = 30
+    LLM_RATE_LIMIT_TPM:int = 12000
+    LLM_MAX_RETRIES:int = 3
+    # Hedged requests for latency-sensitive nodes (router, tier1, conversation)
+    LLM_HEDGE_ENABLED:bool = False
+    LLM_HEDGE_FALLBACK_MODEL:Optional[str] = None  # defaults to the node's own model
+    LLM_HEDGE_PERCENTILE:float = 95
+    LLM_HEDGE_MIN_SAMPLES:int = 20
+    LLM_HEDGE_DEFAULT_DELAY_MS:float = 2000
+    LLM_HEDGE_MIN_DELAY_MS:float = 300
+    # Local embedding router; the LLM router is only used below the margin
+    ROUTER_FAST_ENABLED:bool = False
+    ROUTER_FAST_MIN_MARGIN:float = 0.08
+    ROUTER_FAST_KEYWORD_WEIGHT:float = 0.1
+    # One supervisor call returns both the route and a draft reply for conversation turns
+    ROUTER_RESPOND_ENABLED:bool = False
+    # Answer pure greetings/thanks/goodbyes from templates, without the graph
+    SMALL_TALK_ENABLED:bool = False
+    SMALL_TALK_FUZZY_CUTOFF:float = 0.8
+    # Consecutive Tier 2 collection turns that skip the supervisor
+    TIER2_MAX_BYPASS_TURNS:int = 3
+    # Keep only the last N messages per thread; older ones are folded into a summary
+    MEMORY_WINDOW_ENABLED:bool = False
+    MEMORY_WINDOW_MESSAGES:int = 12
+    MEMORY_SUMMARY_BATCH:int = 6
+    # Messages on one thread arriving within this window are answered together (WhatsApp)
+    MAILBOX_DEBOUNCE_SECONDS:float = 1.5
+    MAILBOX_MAX_WAIT_SECONDS:float = 4
+    # Log one JSON line per turn with per-node token/latency accounting
+    TELEMETRY_LOG_TURNS:bool = False
     HUGGINGFACE_EMBED_MODEL:str
     EMAIL_HOST:str
     EMAIL_PORT:int
@@ -25,6 +97,28 @@ class Settings(BaseSettings):
     EMAIL_FROM:str
     EMAIL_TO:str
     EMAIL_PORT_SSL:int
+    # Background email outbox and pooled SMTP connections
+    EMAIL_SMTP_POOL_SIZE:int = 2
+    EMAIL_SMTP_MAX_IDLE_SECONDS:float = 60
+    EMAIL_OUTBOX_BATCH_SIZE:int = 20
+    EMAIL_OUTBOX_MAX_ATTEMPTS:int = 5
+    EMAIL_OUTBOX_POLL_SECONDS:float = 5
+    # /ready probe results are reused for this long; slower probes count as failed
+    READINESS_CACHE_SECONDS:float = 5
+    READINESS_PROBE_TIMEOUT_SECONDS:float = 2
+    # Write-behind checkpoint cache: latest checkpoint per active thread in memory,
+    # flushed to Postgres within CHECKPOINT_FLUSH_INTERVAL_MS
+    CHECKPOINT_CACHE_ENABLED:bool = False
+    CHECKPOINT_CACHE_MAX_THREADS:int = 1000
+    CHECKPOINT_FLUSH_INTERVAL_MS:float = 500
+    CHECKPOINT_CACHE_VALIDATE:bool = True  # detect threads updated by another worker
+    # Checkpoint retention (scheduled job; also: python -m agent.checkpoint_retention)
+    CHECKPOINT_RETENTION_ENABLED:bool = False
+    CHECKPOINT_RETENTION_INTERVAL_MINUTES:float = 60
+    CHECKPOINT_THREAD_TTL_DAYS:float = 30  # 0 keeps idle threads forever
+    CHECKPOINT_KEEP_LATEST_ONLY:bool = True
+    CHECKPOINT_PRUNE_MIN_IDLE_MINUTES:float = 30
+    CHECKPOINT_PRUNE_BATCH_SIZE:int = 200
     # TWILIO_ACCOUNT_SID:str
     # TWILIO_AUTH_TOKEN:str
     # TWILIO_PHONE_NUMBER:str
@@ -1,14 +1,43 @@
-from pymongo import MongoClient
+from typing import Any, Dict
+from pymongo import AsyncMongoClient, MongoClient
 from config.conf import settings
 import certifi
 
 MONGO_URL = settings.MONGO_URL
 
-# Use certifi for SSL certificate verification on macOS
-client = MongoClient(MONGO_URL, tlsCAFile=certifi.where())
+
+def client_options() -> Dict[str, Any]:
+    """
+    Pool sizing and timeouts from settings, shared by both clients.
+
+    Each client keeps its own pool per worker process, so a worker can hold
+    up to 2 * MONGO_MAX_POOL_SIZE connections per server.
+    """
+    return {
+        # Use certifi for SSL certificate verification on macOS
+        "tlsCAFile": certifi.where(),
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": min(settings.MONGO_MIN_POOL_SIZE, settings.MONGO_MAX_POOL_SIZE),
+        "maxIdleTimeMS": int(settings.MONGO_MAX_IDLE_SECONDS * 1000),
+        "connectTimeoutMS": int(settings.MONGO_CONNECT_TIMEOUT_SECONDS * 1000),
+        "serverSelectionTimeoutMS": int(settings.MONGO_SERVER_SELECTION_TIMEOUT_SECONDS * 1000),
+        "socketTimeoutMS": int(settings.MONGO_SOCKET_TIMEOUT_SECONDS * 1000)
+    }
+
+
+# Blocking client for scripts and the embedding toolkit (runs in worker threads)
+client = MongoClient(MONGO_URL, **client_options())
 
 db = client.application
 
 user_collection = db['user']
 business_collection = db['business']
-session_collection = db['session']
\ No newline at end of file
+session_collection = db['session']
+
+# Native asyncio client for request handlers and graph nodes (see repositories/)
+async_client = AsyncMongoClient(MONGO_URL, **client_options())
+
+async_db = async_client.application
+
+async_business_collection = async_db['business']
+async_session_collection = async_db['session']
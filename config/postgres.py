@@ -0,0 +1,142 @@
+"""
+Shared PostgreSQL connection pool (checkpointer, LLM cache, ...)
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from psycopg_pool import AsyncConnectionPool
+from psycopg.rows import dict_row
+from config.conf import settings
+
+logger = logging.getLogger("postgres")
+
+_connection_pool: Optional[AsyncConnectionPool] = None
+# Startup warm-up and the first request may both ask for the pool
+_pool_lock = asyncio.Lock()
+
+
+def connection_kwargs() -> Dict[str, Any]:
+    """
+    Per-connection settings.
+
+    Every statement autocommits and nothing relies on session state, so the
+    app is safe behind PgBouncer in transaction mode. The one session
+    feature left is prepared statements: with prepare_threshold=0 psycopg
+    prepares each query on first use, which a transaction-mode PgBouncer
+    older than 1.21 (or without max_prepared_statements) can route to the
+    wrong server connection. POSTGRES_PGBOUNCER disables them.
+    """
+    return {
+        "autocommit": True,
+        "prepare_threshold": None if settings.POSTGRES_PGBOUNCER else 0,
+        "connect_timeout": settings.POSTGRES_CONNECT_TIMEOUT_SECONDS,
+        "row_factory": dict_row
+    }
+
+
+def pool_options() -> Dict[str, Any]:
+    """
+    Pool sizing from settings.
+
+    Sizes are per worker process: N workers can hold up to
+    N * POSTGRES_POOL_MAX_SIZE server connections (or PgBouncer client
+    connections), so keep the product below the server's max_connections.
+    """
+    return {
+        "min_size": settings.POSTGRES_POOL_MIN_SIZE,
+        "max_size": max(settings.POSTGRES_POOL_MIN_SIZE, settings.POSTGRES_POOL_MAX_SIZE),
+        "timeout": settings.POSTGRES_POOL_TIMEOUT_SECONDS,
+        "max_waiting": settings.POSTGRES_POOL_MAX_WAITING,
+        "max_idle": settings.POSTGRES_POOL_MAX_IDLE_SECONDS,
+        "max_lifetime": settings.POSTGRES_POOL_MAX_LIFETIME_SECONDS
+    }
+
+
+async def get_connection_pool() -> Optional[AsyncConnectionPool]:
+    """
+    Get or create the shared async PostgreSQL connection pool.
+
+    Returns:
+        The opened pool, or None if POSTGRES_DB_URL is not configured
+    """
+    global _connection_pool
+
+    if _connection_pool is not None:
+        return _connection_pool
+
+    async with _pool_lock:
+        if _connection_pool is None:
+            _connection_pool = await _open_connection_pool()
+    return _connection_pool
+
+
+async def _open_connection_pool() -> Optional[AsyncConnectionPool]:
+    db_url = settings.POSTGRES_DB_URL
+
+    if not db_url:
+        logger.warning("⚠️ POSTGRES_DB_URL not found. Running without Postgres...")
+        return None
+
+    logger.info("Initializing database connection pool...")
+
+    pool = AsyncConnectionPool(
+        conninfo=db_url,
+        name="sharpchat",
+        kwargs=connection_kwargs(),
+        open=False,
+        **pool_options()
+    )
+
+    await pool.open()
+    logger.info(
+        f"✅ Database connection pool established "
+        f"(min={pool.min_size}, max={pool.max_size}{', pgbouncer mode' if settings.POSTGRES_PGBOUNCER else ''})"
+    )
+
+    return pool
+
+
+async def close_connection_pool():
+    """Close the shared connection pool if it is open."""
+    global _connection_pool
+
+    try:
+        if _connection_pool:
+            await _connection_pool.close()
+            logger.info("✅ Database connection pool closed")
+    except Exception as e:
+        logger.error(f"❌ Error closing connection pool: {e}")
+    finally:
+        _connection_pool = None
+
+
+def get_pool_stats() -> Optional[Dict[str, Any]]:
+    """
+    Connection pool usage: size, in use, waiting, wait time and errors.
+
+    Counters are cumulative since the pool was opened.
+    """
+    if _connection_pool is None:
+        return None
+
+    stats = _connection_pool.get_stats()
+    requests = stats.get("requests_num", 0)
+    size = stats.get("pool_size", 0)
+    return {
+        "min_size": stats.get("pool_min"),
+        "max_size": stats.get("pool_max"),
+        "size": size,
+        "idle": stats.get("pool_available", 0),
+        "in_use": size - stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": requests,
+        "requests_queued": stats.get("requests_queued", 0),
+        "avg_wait_ms": round(stats.get("requests_wait_ms", 0) / requests, 2) if requests else 0.0,
+        "avg_usage_ms": round(stats.get("usage_ms", 0) / requests, 2) if requests else 0.0,
+        "request_errors": stats.get("requests_errors", 0),
+        "connections_opened": stats.get("connections_num", 0),
+        "connection_errors": stats.get("connections_errors", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+        "returns_bad": stats.get("returns_bad", 0),
+        "pgbouncer_mode": settings.POSTGRES_PGBOUNCER
+    }
@@ -0,0 +1,231 @@
+"""
+Startup warm-up and readiness probes
+Everything a first request would otherwise initialize lazily (Postgres
+pool, checkpointer DDL, compiled graph, Mongo connection, LLM clients,
+embedding model, Pinecone index) is initialized when the app starts, and
+/ready only reports ready once that is done and the dependencies answer.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from config.conf import settings
+
+logger = logging.getLogger("readiness")
+
+
+async def _warm_mongo():
+    from config.database import async_client
+    await async_client.admin.command("ping")
+
+
+async def _warm_mongo_indexes():
+    if settings.MONGO_ENSURE_INDEXES:
+        from repositories.indexes import ensure_indexes
+        await ensure_indexes()
+
+
+async def _warm_graph():
+    from agent.graph_builder.compiled_agent import build_agent_graph
+    await build_agent_graph()
+
+
+async def _warm_llm_clients():
+    from agent.llm import DEFAULT_PROFILES, get_llm
+    from agent.prompts import PROMPTS
+    for profile in DEFAULT_PROFILES:
+        get_llm(profile)
+    # Token counts / prefix digests are computed on registration
+    logger.info(f"{len(PROMPTS)} prompt templates loaded")
+
+
+async def _warm_embeddings():
+    from vector_db.embedding import get_embeddings
+    # The first encode loads the tokenizer and model weights
+    await asyncio.to_thread(lambda: get_embeddings().embed_query("warm up"))
+
+
+async def _warm_vector_index():
+    from vector_db.vectors import get_vector_pipeline
+    await asyncio.to_thread(get_vector_pipeline)
+
+
+async def _warm_fast_router():
+    from agent.sub_agent.fast_router import aget_fast_router
+    router = await aget_fast_router()
+    if router is not None:
+        await asyncio.to_thread(router._index)
+
+
+# Run in order: the graph opens the Postgres pool, the fast router reuses the embeddings
+WARMUP_STEPS: Dict[str, Callable[[], Awaitable[None]]] = {
+    "mongo": _warm_mongo,
+    "mongo_indexes": _warm_mongo_indexes,
+    "graph": _warm_graph,
+    "llm_clients": _warm_llm_clients,
+    "embeddings": _warm_embeddings,
+    "vector_index": _warm_vector_index,
+    "fast_router": _warm_fast_router,
+}
+
+
+async def _probe_postgres():
+    from config.postgres import get_connection_pool
+    pool = await get_connection_pool()
+    if pool is None:
+        return  # running without memory is a supported mode
+    async with pool.connection() as conn:
+        await conn.execute("SELECT 1")
+
+
+async def _probe_mongo():
+    from config.database import async_client
+    await async_client.admin.command("ping")
+
+
+async def _probe_graph():
+    from agent.graph_builder import compiled_agent
+    # Only reports: a graph warm-up that failed at boot is rebuilt by the
+    # background retry, without the probe timeout cutting setup() DDL short
+    if compiled_agent.compiled_agent is None:
+        raise RuntimeError("agent graph not compiled yet")
+
+
+PROBES: Dict[str, Callable[[], Awaitable[None]]] = {
+    "postgres": _probe_postgres,
+    "mongo": _probe_mongo,
+    "graph": _probe_graph,
+}
+
+
+class Readiness:
+    """
+    Tracks startup warm-up and caches dependency probe results.
+
+    Orchestrators poll readiness every few seconds on every pod; results are
+    reused for `cache_seconds`, and a probe that hangs counts as failed
+    after `timeout` seconds, so the endpoint itself stays cheap and fast.
+    Failed warm-up steps are retried in the background (at most once per
+    `cache_seconds`) so a dependency that was down at boot is picked up
+    once it recovers.
+    """
+
+    def __init__(self, cache_seconds: float = 5.0, timeout: float = 2.0):
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+        self.warmed_up = False
+        self._task: Optional[asyncio.Task] = None
+        self._retry_task: Optional[asyncio.Task] = None
+        self._retried_at = float("-inf")
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def _run_step(self, name: str, step: Callable[[], Awaitable[None]]):
+        started = time.perf_counter()
+        try:
+            await step()
+            self.warmup[name] = {"ok": True}
+        except Exception as e:
+            logger.error(f"❌ Warm-up step '{name}' failed: {e}")
+            self.warmup[name] = {"ok": False, "error": str(e)[:200]}
+        self.warmup[name]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def warm_up(self):
+        """Initialize every dependency once; failures are recorded, not raised."""
+        started = time.perf_counter()
+        for name, step in WARMUP_STEPS.items():
+            await self._run_step(name, step)
+        self.warmed_up = True
+        logger.info(f"✅ Warm-up finished in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def start(self):
+        """Warm up in the background so the process can answer /health meanwhile."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.warm_up())
+
+    async def _retry_failed_steps(self):
+        for name, step in WARMUP_STEPS.items():
+            if not self.warmup.get(name, {}).get("ok"):
+                await self._run_step(name, step)
+
+    def _schedule_retry(self):
+        """Re-run failed warm-up steps in the background, at most once per cache_seconds."""
+        if all(result["ok"] for result in self.warmup.values()):
+            return
+        if self._retry_task is not None and not self._retry_task.done():
+            return
+        now = time.monotonic()
+        if now - self._retried_at < self.cache_seconds:
+            return
+        self._retried_at = now
+        self._retry_task = asyncio.create_task(self._retry_failed_steps())
+
+    async def stop(self):
+        for task in (self._task, self._retry_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    async def _run_probe(self, name: str, probe: Callable[[], Awaitable[None]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), timeout=self.timeout)
+            result = {"ok": True}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)[:200]}
+        result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def check(self) -> Dict[str, Any]:
+        """Probe results (cached), plus warm-up state; "ready" only when all pass."""
+        if not self.warmed_up:
+            # Nothing to probe yet - dependencies are still being initialized
+            return {"status": "not_ready", "warmed_up": False, "warmup": self.warmup, "checks": {}}
+
+        self._schedule_retry()
+
+        async with self._lock:
+            now = time.monotonic()
+            stale = [
+                name for name in PROBES
+                if now - self._checked_at.get(name, float("-inf")) >= self.cache_seconds
+            ]
+            if stale:
+                results = await asyncio.gather(*(self._run_probe(name, PROBES[name]) for name in stale))
+                for name, result in zip(stale, results):
+                    self._results[name] = result
+                    self._checked_at[name] = time.monotonic()
+
+        now = time.monotonic()
+        checks = {
+            name: {**result, "age_s": round(now - self._checked_at[name], 1)}
+            for name, result in self._results.items()
+        }
+        ready = all(result["ok"] for result in checks.values())
+        return {
+            "status": "ready" if ready else "not_ready",
+            "warmed_up": True,
+            "warmup": self.warmup,
+            "checks": checks
+        }
+
+
+_readiness: Optional[Readiness] = None
+
+
+def get_readiness() -> Readiness:
+    """Process-wide readiness tracker."""
+    global _readiness
+    if _readiness is None:
+        _readiness = Readiness(
+            cache_seconds=settings.READINESS_CACHE_SECONDS,
+            timeout=settings.READINESS_PROBE_TIMEOUT_SECONDS
+        )
+    return _readiness
@@ -1,11 +1,20 @@
 from fastapi import FastAPI, Depends, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from routes.utils.auth import endpoint_auth
+from config.conf import settings
+from config.database import async_client
+from repositories.business_cache import get_business_cache
+from config.readiness import get_readiness
 from agent.graph_builder.compiled_agent import close_checkpointer
+from agent.checkpoint_retention import get_checkpoint_retention
+from agent.email_outbox import get_outbox
+from agent.email_service import get_smtp_pool
 from routes.business_routes import router as BusinessRouter
 from routes.chatbot_routes import router as ChatbotRouter
 from routes.kb_route import router as KBRouter
+from routes.metrics_routes import router as MetricsRouter
 from routes.whatsapp_webhook_routes import router as WhatsAppWebhookRouter
 import logging
 
@@ -25,11 +34,27 @@ async def lifespan(app: FastAPI):
     """
     # Startup actions
     logger.info("Starting up FastAPI application...")
+    # Graph, pools and clients initialize in the background; /ready reports when done
+    get_readiness().start()
+    get_outbox().start()
+    if settings.CHECKPOINT_RETENTION_ENABLED:
+        get_checkpoint_retention().start()
+    if settings.BUSINESS_CACHE_WATCH:
+        get_business_cache().start_watcher()
     yield
     # Shutdown actions
     logger.info("Shutting down FastAPI application...")
+    await get_readiness().stop()
+    await get_checkpoint_retention().stop()
+    await get_business_cache().stop_watcher()
+    try:
+        await get_outbox().stop()
+        await get_smtp_pool().close()
+    except Exception as e:
+        logger.error(f"❌ Error stopping email outbox: {e}")
     try:
         await close_checkpointer()
+        await async_client.close()
         logger.info("✅ Database connections closed")
     except Exception as e:
         logger.error(f"❌ Error during shutdown: {e}")
@@ -69,6 +94,16 @@ async def health_check():
         "service": "SharpChat AI Chatbot"
     }
 
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint - 200 once startup warm-up is done and Postgres,
+    MongoDB and the agent graph respond; 503 otherwise.
+    """
+    result = await get_readiness().check()
+    return JSONResponse(result, status_code=200 if result["status"] == "ready" else 503)
+
 app.include_router(WhatsAppWebhookRouter, prefix="/web-hook",
                    tags=["WhatsApp Webhook"])
 app.include_router(BusinessRouter, prefix="/business",
@@ -77,3 +112,5 @@ app.include_router(ChatbotRouter, prefix="/chatbot",
                    tags=["Chatbot"], dependencies=[Depends(endpoint_auth)])
 app.include_router(KBRouter, prefix="/kb",
                    tags=["Knowledge Base"], dependencies=[Depends(endpoint_auth)])
+app.include_router(MetricsRouter, prefix="/metrics",
+                   tags=["Metrics"], dependencies=[Depends(endpoint_auth)])
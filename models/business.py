@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 class BusinessItem(BaseModel):
     name: str
@@ -10,6 +10,10 @@ class FAQ(BaseModel):
     question: str
     answer: str
 
+class NotificationDigest(BaseModel):
+    interval_minutes: Optional[int] = None  # send pending requests at least this often
+    max_requests: Optional[int] = None  # or as soon as this many are pending
+
 class Business(BaseModel):
     email: EmailStr
     password: str
@@ -27,6 +31,8 @@ class Business(BaseModel):
     extra_information: Optional[str] = None
     faqs: Optional[List[FAQ]] = []
     items: Optional[List[BusinessItem]] = []
+    smallTalkTemplates: Optional[Dict[str, str]] = None  # {"greeting"|"thanks"|"goodbye": "... {business_name} ..."}
+    notificationDigest: Optional[NotificationDigest] = None  # batch support emails instead of one per request
 
 class BusinessUpdate(BaseModel):
     businessName: Optional[str] = None
@@ -41,4 +47,6 @@ class BusinessUpdate(BaseModel):
     businessPicture: Optional[str] = None
     extra_information: Optional[str] = None
     faqs: Optional[List[FAQ]] = None
-    items: Optional[List[BusinessItem]] = None
\ No newline at end of file
+    items: Optional[List[BusinessItem]] = None
+    smallTalkTemplates: Optional[Dict[str, str]] = None
+    notificationDigest: Optional[NotificationDigest] = None
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, Dict, Any
 
 class ChatRequest(BaseModel):
     """Chat request model"""
@@ -8,6 +8,7 @@ class ChatRequest(BaseModel):
     thread_id: str  # Conversation ID (unique per user session)
     user_email: Optional[EmailStr] = None
     user_phone: Optional[str] = None
+    debug: bool = False  # Attach per-node timing/token accounting to the response
 
 
 
@@ -24,3 +25,6 @@ class ChatResponse(BaseModel):
     # User contact information (extracted during conversation)
     user_email: Optional[str] = None
     user_phone: Optional[str] = None
+    
+    # Per-node timing and token accounting (only when the request sets debug)
+    timing: Optional[Dict[str, Any]] = None
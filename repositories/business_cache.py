@@ -0,0 +1,152 @@
+"""
+Read-through cache of the agent-facing business profile
+Every chat turn needs the business name, email, small-talk templates and
+digest policy; they change rarely, so they are served from memory and only
+reloaded after the TTL or when the business is updated.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from pymongo.errors import OperationFailure
+from config.conf import settings
+from repositories.business_repository import AgentProfile, get_agent_profile
+from utils.cache import TTLLRUCache
+
+logger = logging.getLogger("business_cache")
+
+# Cached marker for unknown business IDs, so they don't hit Mongo on every message
+_NOT_FOUND = object()
+NEGATIVE_TTL_SECONDS = 30
+# Change streams need a replica set (Atlas is one); standalone servers reject them
+CHANGE_STREAM_UNSUPPORTED_CODES = (40573,)
+
+
+class BusinessProfileCache:
+    """
+    TTL + LRU cache in front of get_agent_profile.
+
+    Concurrent misses for the same business share one Mongo read. Writes
+    through the business routes invalidate the entry in this worker; other
+    workers see the change after `ttl` seconds, or immediately when the
+    change-stream watcher is running.
+
+    Cached profiles are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 1000, enabled: bool = True):
+        self.enabled = enabled
+        self._cache = TTLLRUCache(max_entries=max_entries, default_ttl=ttl)
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Bumped by every invalidation; a load that started earlier isn't cached
+        self._epoch = 0
+        self._watcher: Optional[asyncio.Task] = None
+        self.counters = {"loads": 0, "shared_loads": 0, "invalidations": 0, "watch_events": 0}
+
+    async def get(self, business_id: str) -> Optional[AgentProfile]:
+        """The business's agent profile, or None if the business doesn't exist."""
+        if not self.enabled:
+            return await get_agent_profile(business_id)
+
+        cached = self._cache.get(business_id)
+        if cached is not None:
+            return None if cached is _NOT_FOUND else cached
+
+        loading = self._loading.get(business_id)
+        if loading is not None:
+            self.counters["shared_loads"] += 1
+        else:
+            # Its own task, so a cancelled caller doesn't abort the load other callers wait on
+            loading = self._loading[business_id] = asyncio.create_task(self._load(business_id))
+            # Every caller may be gone by the time it fails; don't warn about an unretrieved exception
+            loading.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(loading)
+
+    async def _load(self, business_id: str) -> Optional[AgentProfile]:
+        epoch = self._epoch
+        try:
+            profile = await get_agent_profile(business_id)
+            self.counters["loads"] += 1
+            if epoch == self._epoch:
+                if profile is None:
+                    self._cache.set(business_id, _NOT_FOUND, ttl=NEGATIVE_TTL_SECONDS)
+                else:
+                    self._cache.set(business_id, profile)
+            return profile
+        finally:
+            self._loading.pop(business_id, None)
+
+    def invalidate(self, business_id: Optional[str] = None):
+        """Drop one business (or every business) so the next read reloads it."""
+        self._epoch += 1
+        self.counters["invalidations"] += 1
+        if business_id is None:
+            self._cache.clear()
+        else:
+            self._cache.delete(business_id)
+
+    async def _watch(self):
+        """Invalidate on every business write made by any worker (MongoDB change stream)."""
+        from config.database import async_business_collection
+
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}},
+            {"$project": {"operationType": 1, "fullDocument.business_id": 1}}
+        ]
+        while True:
+            try:
+                async with await async_business_collection.watch(pipeline, full_document="updateLookup") as stream:
+                    logger.info("✅ Watching business profile changes")
+                    async for change in stream:
+                        self.counters["watch_events"] += 1
+                        business_id = (change.get("fullDocument") or {}).get("business_id")
+                        # Deletes only carry the _id; drop everything rather than keep a stale profile
+                        self.invalidate(business_id)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    logger.error(f"❌ Business change stream unavailable, relying on the TTL: {e}")
+                    return
+                logger.error(f"Business change stream error: {e}")
+            except Exception as e:
+                logger.error(f"Business change stream error: {e}")
+            # Changes missed while disconnected are unknown
+            self.invalidate()
+            await asyncio.sleep(5)
+
+    def start_watcher(self):
+        """Start cross-worker invalidation (idempotent)."""
+        if self.enabled and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            **self._cache.stats(),
+            **self.counters,
+            "watching": self._watcher is not None and not self._watcher.done()
+        }
+
+
+_business_cache: Optional[BusinessProfileCache] = None
+
+
+def get_business_cache() -> BusinessProfileCache:
+    """Process-wide business profile cache."""
+    global _business_cache
+    if _business_cache is None:
+        _business_cache = BusinessProfileCache(
+            ttl=settings.BUSINESS_CACHE_TTL_SECONDS,
+            max_entries=settings.BUSINESS_CACHE_MAX_ENTRIES,
+            enabled=settings.BUSINESS_CACHE_ENABLED
+        )
+    return _business_cache
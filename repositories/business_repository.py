@@ -0,0 +1,91 @@
+"""
+Async data access for the business collection
+Every query states the fields it needs: the agent only reads name and email,
+while the full document (FAQs, items, ...) is only loaded for the API.
+"""
+from typing import Any, Dict, List, Optional, TypedDict
+from pymongo import ReturnDocument
+from config.database import async_business_collection
+
+
+class AgentProfile(TypedDict, total=False):
+    """Business fields the agent needs on every turn (cached, see business_cache)."""
+    businessName: str
+    email: str
+    smallTalkTemplates: Dict[str, str]
+    notificationDigest: Dict[str, int]
+
+
+class BusinessSummary(TypedDict, total=False):
+    """Enough of a business to match it by name and greet the customer."""
+    business_id: str
+    businessName: str
+    businessDescription: str
+
+
+AGENT_PROFILE_FIELDS = {"_id": 0, "businessName": 1, "email": 1, "smallTalkTemplates": 1, "notificationDigest": 1}
+SUMMARY_FIELDS = {"_id": 0, "business_id": 1, "businessName": 1, "businessDescription": 1}
+# Everything business_serial returns; never the password hash
+PUBLIC_FIELDS = {"password": 0}
+
+
+async def get_agent_profile(business_id: str) -> Optional[AgentProfile]:
+    """Name, email, small-talk templates and digest policy of a business, or None if it doesn't exist."""
+    return await async_business_collection.find_one({"business_id": business_id}, AGENT_PROFILE_FIELDS)
+
+
+async def get_business(business_id: str) -> Optional[Dict[str, Any]]:
+    """Full business document without the password."""
+    return await async_business_collection.find_one({"business_id": business_id}, PUBLIC_FIELDS)
+
+
+async def get_business_summary(business_id: str) -> Optional[BusinessSummary]:
+    return await async_business_collection.find_one({"business_id": business_id}, SUMMARY_FIELDS)
+
+
+async def list_business_summaries() -> List[BusinessSummary]:
+    """Every business, reduced to the fields used for name matching."""
+    return await async_business_collection.find({}, SUMMARY_FIELDS).to_list(None)
+
+
+async def get_business_for_login(email: str) -> Optional[Dict[str, Any]]:
+    """Full document including the password hash - only for credential checks."""
+    return await async_business_collection.find_one({"email": email})
+
+
+async def email_exists(email: str) -> bool:
+    return await async_business_collection.find_one({"email": email}, {"_id": 1}) is not None
+
+
+async def get_last_business_id() -> Optional[str]:
+    """Highest business_id issued so far (IDs are zero-padded, so they sort in order)."""
+    last_business = await async_business_collection.find_one(
+        {"business_id": {"$exists": True}},
+        {"_id": 0, "business_id": 1},
+        sort=[("business_id", -1)]
+    )
+    return (last_business or {}).get("business_id")
+
+
+async def search_businesses_by_name(name: str) -> List[Dict[str, Any]]:
+    """Case-insensitive substring match on the name (full documents without the password)."""
+    return await async_business_collection.find(
+        {"name": {"$regex": name, "$options": "i"}},
+        PUBLIC_FIELDS
+    ).to_list(None)
+
+
+async def insert_business(business: Dict[str, Any]) -> Dict[str, Any]:
+    """Insert a new business; returns the stored document including its _id."""
+    result = await async_business_collection.insert_one(business)
+    return {**business, "_id": result.inserted_id}
+
+
+async def update_business(business_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Set fields and return the updated document (without the password), or None if not found."""
+    return await async_business_collection.find_one_and_update(
+        {"business_id": business_id},
+        {"$set": fields},
+        projection=PUBLIC_FIELDS,
+        return_document=ReturnDocument.AFTER
+    )
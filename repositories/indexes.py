@@ -0,0 +1,184 @@
+"""
+Declared MongoDB indexes and query-plan checks
+The indexes every hot lookup relies on are declared here and created at
+startup (MONGO_ENSURE_INDEXES) or from the command line; the plan check runs
+explain() on each hot repository query and fails on a collection scan:
+
+    python -m repositories.indexes ensure
+    python -m repositories.indexes check
+"""
+import asyncio
+import logging
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from config.conf import settings
+from config.database import async_db
+from repositories.business_repository import AGENT_PROFILE_FIELDS
+
+logger = logging.getLogger("mongo_indexes")
+
+# createIndexes error codes for an index that exists with other options / keys
+INDEX_CONFLICT_CODES = (85, 86)
+
+
+def declared_indexes() -> Dict[str, List[IndexModel]]:
+    """Index specifications per collection."""
+    session_indexes = [IndexModel([("whatsapp_number", ASCENDING)], name="whatsapp_number_unique", unique=True)]
+    if settings.MONGO_SESSION_TTL_DAYS > 0:
+        # Abandoned WhatsApp sessions expire; every state change and chat message refreshes updated_at
+        session_indexes.append(IndexModel(
+            [("updated_at", ASCENDING)],
+            name="updated_at_ttl",
+            expireAfterSeconds=int(settings.MONGO_SESSION_TTL_DAYS * 86400)
+        ))
+    return {
+        "business": [
+            # Agent lookups, and the descending sort in generate_business_id
+            IndexModel([("business_id", ASCENDING)], name="business_id_unique", unique=True),
+            # Login and the duplicate-email check at signup
+            IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+            # Category filter in fetch_businesses_from_mongo
+            IndexModel([("businessCategory", ASCENDING)], name="businessCategory"),
+        ],
+        "session": session_indexes,
+    }
+
+
+@dataclass
+class HotQuery:
+    """A repository query that must be served by an index."""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    projection: Optional[Dict[str, Any]] = None
+    sort: Optional[Dict[str, int]] = None
+    limit: int = 1
+
+
+HOT_QUERIES = [
+    HotQuery("business by business_id", "business", {"business_id": "BUS-0001"}, AGENT_PROFILE_FIELDS),
+    HotQuery("business by email", "business", {"email": "owner@example.com"}, {"_id": 1}),
+    HotQuery("last business_id", "business", {"business_id": {"$exists": True}},
+             {"_id": 0, "business_id": 1}, sort={"business_id": -1}),
+    HotQuery("businesses by category", "business", {"businessCategory": "restaurant"}, limit=0),
+    HotQuery("session by whatsapp_number", "session", {"whatsapp_number": "whatsapp:+10000000000"}, {"_id": 0}),
+]
+
+
+async def _sync_ttl(collection, index: IndexModel) -> bool:
+    """Update the expiry of an existing TTL index in place (collMod); False if it isn't one."""
+    document = index.document
+    if "expireAfterSeconds" not in document:
+        return False
+    await async_db.command({
+        "collMod": collection.name,
+        "index": {"keyPattern": document["key"], "expireAfterSeconds": document["expireAfterSeconds"]}
+    })
+    return True
+
+
+async def ensure_indexes() -> Dict[str, Dict[str, str]]:
+    """
+    Create every declared index (a no-op for ones that already exist).
+
+    Index builds don't block reads or writes on MongoDB 4.2+. A unique index
+    fails to build while duplicates exist; that, and an index that exists
+    with other options, is reported rather than raised so the app still
+    starts.
+
+    Returns:
+        {collection: {index name: "ok" | "updated" | error message}}
+    """
+    report: Dict[str, Dict[str, str]] = {}
+    for collection_name, indexes in declared_indexes().items():
+        collection = async_db[collection_name]
+        report[collection_name] = {}
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                await collection.create_indexes([index])
+                report[collection_name][name] = "ok"
+            except OperationFailure as e:
+                if e.code in INDEX_CONFLICT_CODES and await _sync_ttl(collection, index):
+                    report[collection_name][name] = "updated"
+                    continue
+                logger.error(f"❌ Index {collection_name}.{name} not created: {e}")
+                report[collection_name][name] = str(e)[:200]
+    logger.info("✅ Mongo indexes ensured")
+    return report
+
+
+def _plan_stages(plan: Any) -> Iterator[str]:
+    """Every stage name in an explain() plan tree (classic and slot-based engine layouts)."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+async def explain_query(query: HotQuery) -> Tuple[List[str], Dict[str, Any]]:
+    """The winning plan's stages for a hot query, plus the raw queryPlanner output."""
+    find: Dict[str, Any] = {"find": query.collection, "filter": query.filter}
+    if query.projection:
+        find["projection"] = query.projection
+    if query.sort:
+        find["sort"] = query.sort
+    if query.limit:
+        find["limit"] = query.limit
+    result = await async_db.command({"explain": find, "verbosity": "queryPlanner"})
+    planner = result.get("queryPlanner", {})
+    return list(_plan_stages(planner.get("winningPlan", {}))), planner
+
+
+async def check_query_plans() -> List[Dict[str, Any]]:
+    """explain() every hot query; a row has ok=False when its plan scans the collection."""
+    rows = []
+    for query in HOT_QUERIES:
+        stages, _ = await explain_query(query)
+        rows.append({
+            "query": query.name,
+            "collection": query.collection,
+            "stages": stages,
+            "ok": "COLLSCAN" not in stages
+        })
+    return rows
+
+
+async def _main() -> int:
+    import argparse
+    from config.database import async_client
+
+    parser = argparse.ArgumentParser(description="Create MongoDB indexes / verify hot query plans")
+    parser.add_argument("command", choices=["ensure", "check"],
+                        help="ensure: create declared indexes; check: fail if a hot query does a COLLSCAN")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "ensure":
+            report = await ensure_indexes()
+            failed = 0
+            for collection_name, indexes in report.items():
+                for name, status in indexes.items():
+                    failed += status not in ("ok", "updated")
+                    print(f"{collection_name + '.' + name:<40} {status}")
+            return 1 if failed else 0
+
+        rows = await check_query_plans()
+        print(f"{'query':<30} {'collection':<10} {'plan':<40} result")
+        for row in rows:
+            plan = " <- ".join(row["stages"])
+            print(f"{row['query']:<30} {row['collection']:<10} {plan[:40]:<40} {'ok' if row['ok'] else 'COLLSCAN'}")
+        return 0 if all(row["ok"] for row in rows) else 1
+    finally:
+        await async_client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
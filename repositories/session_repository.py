@@ -0,0 +1,39 @@
+"""
+Async data access for WhatsApp sessions (one document per WhatsApp number)
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, TypedDict
+from config.database import async_session_collection
+
+
+class Session(TypedDict, total=False):
+    whatsapp_number: str
+    state: str
+    name: Optional[str]
+    business_id: Optional[str]
+    thread_id: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+async def get_session(whatsapp_number: str) -> Optional[Session]:
+    return await async_session_collection.find_one({"whatsapp_number": whatsapp_number}, {"_id": 0})
+
+
+async def create_session(session: Session) -> Session:
+    # insert_one adds _id to the dict it is given; keep the caller's copy clean
+    await async_session_collection.insert_one(dict(session))
+    return session
+
+
+async def update_session(whatsapp_number: str, updates: Dict[str, Any]):
+    await async_session_collection.update_one(
+        {"whatsapp_number": whatsapp_number},
+        {"$set": {**updates, "updated_at": datetime.now(timezone.utc)}}
+    )
+
+
+async def delete_session(whatsapp_number: str) -> bool:
+    """True if a session was deleted."""
+    result = await async_session_collection.delete_one({"whatsapp_number": whatsapp_number})
+    return result.deleted_count > 0
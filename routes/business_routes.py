@@ -1,7 +1,9 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from models.business import Business, BusinessUpdate
-from config.database import business_collection
+from repositories import business_repository
+from repositories.business_cache import get_business_cache
 from schema.schemas import business_serial, business_list_serial
 from bson import ObjectId
 from passlib.context import CryptContext
@@ -12,11 +14,11 @@ router = APIRouter()
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 
-def generate_business_id():
+async def generate_business_id():
     """Generate unique business ID like BUS-0001"""
-    last_business = business_collection.find_one(sort=[("business_id", -1)])
-    if last_business and last_business.get("business_id"):
-        last_num = int(last_business["business_id"].split("-")[1])
+    last_business_id = await business_repository.get_last_business_id()
+    if last_business_id:
+        last_num = int(last_business_id.split("-")[1])
         return f"BUS-{str(last_num + 1).zfill(4)}"
     return "BUS-0001"
 
@@ -26,8 +28,7 @@ def generate_business_id():
 @router.post("/signup")
 async def signup_business(business: Business):
     try:
-        existing = business_collection.find_one({"email": business.email})
-        if existing:
+        if await business_repository.email_exists(business.email):
             return JSONResponse(
                 status_code=400,
                 content={"message": "Email already registered", "error": True}
@@ -38,17 +39,17 @@ async def signup_business(business: Business):
         password = str(business.password)
         hashed_password = pwd_context.hash(password)
         business_dict["password"] = hashed_password
-        business_dict["business_id"] = generate_business_id()
+        business_dict["business_id"] = await generate_business_id()
         business_dict["faqs"] = business_dict.get("faqs", [])
         business_dict["items"] = business_dict.get("items", [])
 
-        result = business_collection.insert_one(business_dict)
-        new_business = business_collection.find_one(
-            {"_id": result.inserted_id})
+        new_business = await business_repository.insert_business(business_dict)
+        # The ID may have been looked up (and cached as unknown) before signup
+        get_business_cache().invalidate(new_business["business_id"])
 
-        # Trigger embedding for the new business
-        embedding_result = process_and_embed_business(
-            new_business["business_id"])
+        # Trigger embedding for the new business (blocking pipeline, off the event loop)
+        embedding_result = await asyncio.to_thread(
+            process_and_embed_business, new_business["business_id"])
 
         return JSONResponse(
             status_code=200,
@@ -67,7 +68,7 @@ async def signup_business(business: Business):
 @router.post("/login")
 async def login_business(email: str, password: str):
     try:
-        business = business_collection.find_one({"email": email})
+        business = await business_repository.get_business_for_login(email)
         if not business:
             return JSONResponse(
                 status_code=400,
@@ -114,7 +115,7 @@ async def login_business(email: str, password: str):
 @router.get("/{business_id}")
 async def get_business(business_id: str):
     try:
-        business = business_collection.find_one({"business_id": business_id})
+        business = await business_repository.get_business(business_id)
         if not business:
             return JSONResponse(
                 status_code=400,
@@ -136,8 +137,7 @@ async def get_business(business_id: str):
 @router.get("/search/{name}")
 async def search_business(name: str):
     try:
-        businesses = business_collection.find(
-            {"name": {"$regex": name, "$options": "i"}})
+        businesses = await business_repository.search_businesses_by_name(name)
 
         return JSONResponse(
             status_code=200,
@@ -164,11 +164,8 @@ async def update_business(business_id: str, update: BusinessUpdate):
                 content={"message": "No valid fields to update", "error": True}
             )
 
-        business_collection.find_one_and_update(
-            {"business_id": business_id},
-            {"$set": update_dict}
-        )
-        updated = business_collection.find_one({"business_id": business_id})
+        updated = await business_repository.update_business(business_id, update_dict)
+        get_business_cache().invalidate(business_id)
 
         if not updated:
             return JSONResponse(
@@ -177,7 +174,7 @@ async def update_business(business_id: str, update: BusinessUpdate):
             )
 
         # Trigger embedding update for the business
-        embedding_result = process_and_embed_business(business_id)
+        embedding_result = await asyncio.to_thread(process_and_embed_business, business_id)
 
         return JSONResponse(
             status_code=200,
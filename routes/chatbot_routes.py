@@ -1,11 +1,14 @@
 """
 Chatbot routes for SharpChat AI
 """
+import json
 import logging
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from agent.main_agent import main_agent
+from agent.mailbox import get_mailbox
+from agent.main_agent import stream_main_agent
 from models.chatbot import ChatRequest, ChatResponse
 logger = logging.getLogger("chatbot_routes")
 
@@ -20,13 +23,15 @@ async def chat(request: ChatRequest) -> ChatResponse:
     try:
         logger.info(f"Processing chat for business {request.business_id}, thread {request.thread_id}")
         
-        # Invoke main agent (auto-fetches business_name and business_email)
-        result = await main_agent(
-            query=request.message,
+        # Invoke main agent (auto-fetches business_name and business_email);
+        # runs on the same thread are serialized, each message answered separately
+        result = await get_mailbox().run(
+            request.thread_id,
+            request.message,
             business_id=request.business_id,
-            thread_id=request.thread_id,
             user_email=request.user_email,
-            user_phone=request.user_phone
+            user_phone=request.user_phone,
+            debug=request.debug
         )
         
         return ChatResponse(**result)
@@ -36,3 +41,38 @@ async def chat(request: ChatRequest) -> ChatResponse:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+def format_sse(event: str, data: dict) -> str:
+    """Serialize one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Streaming chat endpoint (server-sent events).
+    
+    Emits "token" events while Tier1/conversation answers are generated,
+    a "metrics" event with time-to-first-token, and finally a "done" event
+    carrying the ChatResponse fields.
+    """
+    logger.info(f"Streaming chat for business {request.business_id}, thread {request.thread_id}")
+    
+    async def event_stream():
+        async with get_mailbox().serialized(request.thread_id):
+            async for item in stream_main_agent(
+                query=request.message,
+                business_id=request.business_id,
+                thread_id=request.thread_id,
+                user_email=request.user_email,
+                user_phone=request.user_phone,
+                debug=request.debug
+            ):
+                if item["event"] == "done":
+                    item["data"] = ChatResponse(**item["data"]).model_dump()
+                yield format_sse(item["event"], item["data"])
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
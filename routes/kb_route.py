@@ -2,6 +2,7 @@
 Knowledge Base Management Routes
 Endpoints for managing the Pinecone vector database
 """
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
@@ -31,8 +32,9 @@ async def embed_documents(request: EmbedRequest):
     try:
         logger.info(f"Starting embed for all data in the MongoDB Business Collection")
         
-        # Call embed_all_documents with filters
-        result = embed_all_documents(
+        # Call embed_all_documents with filters (blocking pipeline, off the event loop)
+        result = await asyncio.to_thread(
+            embed_all_documents,
             limit=request.limit,
             category=request.category,
             chunk_text_content=True,
@@ -82,7 +84,7 @@ async def embed_single_business(request: EmbedSingleBusinessRequest):
     """
     try:
        
-        result = process_and_embed_business(request.business_id)
+        result = await asyncio.to_thread(process_and_embed_business, request.business_id)
         
         if result.get("error"):
             # If business not found (404-like error) or other error
@@ -0,0 +1,83 @@
+"""
+Metrics routes for SharpChat AI
+"""
+import logging
+from fastapi import APIRouter
+from agent.checkpoint_retention import get_checkpoint_retention
+from agent.email_outbox import get_outbox
+from agent.graph_builder.compiled_agent import get_checkpoint_cache_stats
+from agent.llm import get_profiles_report
+from agent.llm_cache import get_llm_cache
+from agent.llm_scheduler import get_scheduler
+from agent.mailbox import get_mailbox
+from agent.memory import get_memory_stats
+from agent.sub_agent.fast_router import peek_fast_router
+from agent.telemetry import aggregator
+from config.postgres import get_pool_stats
+from repositories.business_cache import get_business_cache
+
+logger = logging.getLogger("metrics_routes")
+
+router = APIRouter()
+
+
+@router.get("/llm")
+async def llm_metrics():
+    """
+    LLM profiles per node with their observed latency (p50/p95/p99),
+    response cache stats, scheduler queue depth / wait times and how
+    often the fast router decided without the LLM.
+    """
+    cache = get_llm_cache()
+    scheduler = get_scheduler()
+    # Not built here: loading the model would block the event loop
+    fast_router = peek_fast_router()
+    return {
+        "profiles": get_profiles_report(),
+        "cache": cache.stats() if cache else None,
+        "scheduler": scheduler.stats() if scheduler else None,
+        "fast_router": fast_router.stats() if fast_router else None
+    }
+
+
+@router.get("/turns")
+async def turn_metrics():
+    """
+    Token usage, queue wait and latency aggregated per graph node and per business,
+    plus windowed-memory compaction and per-thread mailbox counters.
+    """
+    return {**aggregator.snapshot(), "memory": get_memory_stats(), "mailbox": get_mailbox().stats()}
+
+
+@router.get("/email")
+async def email_metrics():
+    """
+    Email outbox delivery counters and queued/sent/failed row counts.
+    """
+    return await get_outbox().stats()
+
+
+@router.get("/checkpoints")
+async def checkpoint_metrics():
+    """
+    Checkpoint table sizes, what the last retention run deleted and the
+    write-behind cache counters.
+    """
+    return {**await get_checkpoint_retention().stats(), "cache": get_checkpoint_cache_stats()}
+
+
+@router.get("/postgres")
+async def postgres_metrics():
+    """
+    Postgres connection pool: size, connections in use, waiting requests,
+    average wait time and connection errors.
+    """
+    return {"pool": get_pool_stats()}
+
+
+@router.get("/business-cache")
+async def business_cache_metrics():
+    """
+    Business profile cache: size, hit rate, Mongo loads and invalidations.
+    """
+    return get_business_cache().stats()
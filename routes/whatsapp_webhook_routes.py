@@ -5,11 +5,11 @@ Handles multi-step conversation flow with Twilio integration
 import logging
 from fastapi import APIRouter, Request, Response, HTTPException
 from twilio.twiml.messaging_response import MessagingResponse
-from config.database import business_collection, session_collection
+from repositories import business_repository, session_repository
 from datetime import datetime, timezone
 from difflib import SequenceMatcher
 import uuid
-from agent.main_agent import main_agent
+from agent.mailbox import get_mailbox
 
 logger = logging.getLogger("whatsapp_webhook")
 
@@ -31,9 +31,9 @@ def is_exit_command(message: str) -> bool:
     return message.lower().strip() in exit_commands
 
 
-def get_or_create_session(whatsapp_number: str) -> dict:
+async def get_or_create_session(whatsapp_number: str) -> dict:
     """Get existing session or create new one"""
-    session = session_collection.find_one({"whatsapp_number": whatsapp_number})
+    session = await session_repository.get_session(whatsapp_number)
 
     if not session:
         session = {
@@ -45,32 +45,28 @@ def get_or_create_session(whatsapp_number: str) -> dict:
             "created_at": datetime.now(timezone.utc),
             "updated_at": datetime.now(timezone.utc)
         }
-        session_collection.insert_one(session)
+        await session_repository.create_session(session)
         logger.info(f"Created new session for {whatsapp_number}")
 
     return session
 
 
-def update_session(whatsapp_number: str, updates: dict):
+async def update_session(whatsapp_number: str, updates: dict):
     """Update session with new data"""
-    updates["updated_at"] = datetime.now(timezone.utc)
-    session_collection.update_one(
-        {"whatsapp_number": whatsapp_number},
-        {"$set": updates}
-    )
+    await session_repository.update_session(whatsapp_number, updates)
 
 
-def find_business_by_id(business_id: str) -> dict:
+async def find_business_by_id(business_id: str) -> dict:
     """Find business by exact ID match"""
-    return business_collection.find_one({"business_id": business_id})
+    return await business_repository.get_business_summary(business_id)
 
 
-def find_business_by_name(search_term: str, threshold: float = 0.6) -> dict:
+async def find_business_by_name(search_term: str, threshold: float = 0.6) -> dict:
     """
     Find business by name using fuzzy matching
     Returns the closest match if similarity >= threshold
     """
-    businesses = list(business_collection.find({}))
+    businesses = await business_repository.list_business_summaries()
 
     if not businesses:
         return None
@@ -125,7 +121,7 @@ async def whatsapp_webhook(request: Request):
             return Response(content=str(resp), media_type="application/xml")
 
         # Get or create session
-        session = get_or_create_session(from_number)
+        session = await get_or_create_session(from_number)
         current_state = session.get("state", SessionState.INITIAL)
         
         # Check for exit/reset commands (works in any state except INITIAL)
@@ -133,7 +129,7 @@ async def whatsapp_webhook(request: Request):
             user_name = session.get("name", "there")
             
             # Delete the session to start fresh
-            session_collection.delete_one({"whatsapp_number": from_number})
+            await session_repository.delete_session(from_number)
             
             resp.message(
                 f"👋 Session ended!\n\n"
@@ -153,7 +149,7 @@ async def whatsapp_webhook(request: Request):
                 "What's your name?\n\n"
                 "💡 Type 'exit' anytime to start over."
             )
-            update_session(from_number, {"state": SessionState.AWAITING_NAME})
+            await update_session(from_number, {"state": SessionState.AWAITING_NAME})
 
         elif current_state == SessionState.AWAITING_NAME:
             # Store name and ask for business
@@ -165,7 +161,7 @@ async def whatsapp_webhook(request: Request):
                 f"• Business ID (e.g., BUS-0001)\n"
                 f"• Business name (e.g., Joe's Coffee Shop)"
             )
-            update_session(from_number, {
+            await update_session(from_number, {
                 "state": SessionState.AWAITING_BUSINESS,
                 "name": user_name
             })
@@ -176,11 +172,11 @@ async def whatsapp_webhook(request: Request):
 
             # Check if it's a business ID (format: BUS-XXXX)
             if incoming_msg.upper().startswith("BUS-"):
-                business = find_business_by_id(incoming_msg.upper())
+                business = await find_business_by_id(incoming_msg.upper())
                 search_type = "ID"
             else:
                 # Search by name with fuzzy matching
-                business = find_business_by_name(incoming_msg)
+                business = await find_business_by_name(incoming_msg)
                 search_type = "name"
 
             if business:
@@ -197,7 +193,7 @@ async def whatsapp_webhook(request: Request):
                     f"_Type 'change business' to switch or 'exit' to end._"
                 )
 
-                update_session(from_number, {
+                await update_session(from_number, {
                     "state": SessionState.CHATTING,
                     "business_id": business_id,
                     "thread_id": thread_id
@@ -226,22 +222,31 @@ async def whatsapp_webhook(request: Request):
                     "Sorry, there was an error with your session. Let's start over.\n\n"
                     "What's your name?"
                 )
-                update_session(from_number, {
+                await update_session(from_number, {
                     "state": SessionState.AWAITING_NAME,
                     "business_id": None,
                     "thread_id": None
                 })
             else:
+                # Record the activity; the TTL index expires sessions idle since updated_at
+                await update_session(from_number, {})
+
                 try:
-                    # Call the main agent
-                    result = await main_agent(
-                        query=incoming_msg,
+                    # Call the main agent through the thread's mailbox: quick
+                    # follow-up messages are merged into one run
+                    result = await get_mailbox().submit(
+                        thread_id,
+                        incoming_msg,
                         business_id=business_id,
-                        thread_id=thread_id,
                         user_email=None,  # WhatsApp doesn't provide email
                         user_phone=from_number
                     )
 
+                    if result.get("coalesced"):
+                        # Answered in the reply to the user's latest message
+                        logger.info(f"Message from {from_number} merged into a later one")
+                        return Response(content=str(resp), media_type="application/xml")
+
                     # Send agent's response
                     answer = result.get(
                         "answer", "I'm not sure how to help with that.")
@@ -263,7 +268,7 @@ async def whatsapp_webhook(request: Request):
                 "Sorry, something went wrong. Let's start over.\n\n"
                 "What's your name?"
             )
-            update_session(from_number, {
+            await update_session(from_number, {
                 "state": SessionState.AWAITING_NAME,
                 "business_id": None,
                 "thread_id": None,
@@ -284,10 +289,7 @@ async def get_session(whatsapp_number: str):
     """
     Get session details for debugging
     """
-    session = session_collection.find_one(
-        {"whatsapp_number": whatsapp_number},
-        {"_id": 0}
-    )
+    session = await session_repository.get_session(whatsapp_number)
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -300,10 +302,7 @@ async def reset_session(whatsapp_number: str):
     """
     Reset a user's session
     """
-    result = session_collection.delete_one(
-        {"whatsapp_number": whatsapp_number})
-
-    if result.deleted_count == 0:
+    if not await session_repository.delete_session(whatsapp_number):
         raise HTTPException(status_code=404, detail="Session not found")
 
     return {"message": "Session reset successfully"}
@@ -26,7 +26,9 @@ def business_serial(business) -> dict:
         "businessPicture": business.get("businessPicture"),
         "extra_information": business.get("extra_information"),
         "faqs": business.get("faqs", []),
-        "items": business.get("items", [])
+        "items": business.get("items", []),
+        "smallTalkTemplates": business.get("smallTalkTemplates"),
+        "notificationDigest": business.get("notificationDigest")
     }
 
 def business_list_serial(businesses) -> list:
@@ -0,0 +1,28 @@
+"""
+Placeholder settings so the app modules import without a .env
+Tests never reach these services; anything set in the environment wins.
+"""
+import os
+
+for name, value in {
+    "MONGO_URL": "mongodb://localhost:1/?serverSelectionTimeoutMS=200",
+    "POSTGRES_DB_URL": "",
+    "PINECONE_API_KEY": "test",
+    "KB_INDEX": "test",
+    "PINECONE_CLOUD": "aws",
+    "PINECONE_REGION": "us-east-1",
+    "GROQ_API_KEY": "test",
+    "LLAMA_MODEL": "llama-3.3-70b-versatile",
+    "TEMPERATURE": "0.7",
+    "MAX_TOKENS": "2048",
+    "HUGGINGFACE_EMBED_MODEL": "sentence-transformers/all-MiniLM-L6-v2",
+    "EMAIL_HOST": "localhost",
+    "EMAIL_PORT": "587",
+    "EMAIL_PORT_SSL": "465",
+    "EMAIL_USER": "test",
+    "EMAIL_PASSWORD": "test",
+    "EMAIL_FROM": "bot@example.com",
+    "EMAIL_TO": "support@example.com",
+    "ENDPOINT_AUTH_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,100 @@
+"""
+Write-behind checkpoint cache against an in-memory saver
+    python -m pytest tests
+"""
+import asyncio
+import operator
+from typing import Annotated, List, TypedDict
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+from agent.graph_builder.checkpoint_cache import CachedCheckpointSaver
+
+
+class _State(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+
+def _build_graph(checkpointer):
+    graph = StateGraph(_State)
+    graph.add_node("first", lambda state: {"steps": ["first"]})
+    graph.add_node("second", lambda state: {"steps": ["second"]})
+    graph.add_edge(START, "first")
+    graph.add_edge("first", "second")
+    graph.add_edge("second", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def test_put_get_flush_keeps_every_checkpoint():
+    async def run():
+        inner = InMemorySaver()
+        cached = CachedCheckpointSaver(inner, pool=None)
+        graph = _build_graph(cached)
+        config = {"configurable": {"thread_id": "t1"}}
+
+        await graph.ainvoke({"steps": ["start"]}, config)
+        await graph.ainvoke({"steps": ["again"]}, config)
+        puts = cached.counters["puts"]
+        assert puts > 1
+        assert cached.stats()["pending_puts"] == puts
+        assert not [c async for c in inner.alist(config)]
+
+        # Served from the cache before anything reached the inner saver
+        hits = cached.counters["hits"]
+        latest = await cached.aget_tuple(config)
+        assert latest.checkpoint["channel_values"]["steps"] == [
+            "start", "first", "second", "again", "first", "second"
+        ]
+        assert cached.counters["hits"] == hits + 1
+
+        await cached.flush()
+        assert cached.stats()["pending_puts"] == 0
+        assert cached.counters["flushed"] == puts
+
+        stored = [c async for c in inner.alist(config)]
+        ids = {c.checkpoint["id"] for c in stored}
+        assert len(stored) == puts
+        # Every parent reference resolves to a stored checkpoint
+        for c in stored:
+            if c.parent_config is not None:
+                assert c.parent_config["configurable"]["checkpoint_id"] in ids
+
+        persisted = await inner.aget_tuple(config)
+        assert persisted.checkpoint["id"] == latest.checkpoint["id"]
+        assert persisted.checkpoint["channel_values"] == latest.checkpoint["channel_values"]
+
+        # A fresh cache (another worker) resumes from what was flushed
+        fresh = _build_graph(CachedCheckpointSaver(inner, pool=None))
+        state = await fresh.aget_state(config)
+        assert state.values["steps"][-3:] == ["again", "first", "second"]
+
+    asyncio.run(run())
+
+
+def test_failed_flush_is_retried_in_order():
+    class FlakySaver(InMemorySaver):
+        fail = True
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            if self.fail and checkpoint["channel_values"].get("steps", [])[-1:] == ["second"]:
+                raise ConnectionError("postgres down")
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def run():
+        inner = FlakySaver()
+        cached = CachedCheckpointSaver(inner, pool=None)
+        config = {"configurable": {"thread_id": "t2"}}
+        await _build_graph(cached).ainvoke({"steps": ["start"]}, config)
+        puts = cached.counters["puts"]
+
+        await cached.flush()
+        assert cached.counters["flush_errors"] == 1
+        remaining = cached.stats()["pending_puts"]
+        assert 0 < remaining < puts
+
+        inner.fail = False
+        await cached.flush()
+        assert cached.stats()["pending_puts"] == 0
+        assert len([c async for c in inner.alist(config)]) == puts
+        assert (await inner.aget_tuple(config)).checkpoint["channel_values"]["steps"][-1] == "second"
+
+    asyncio.run(run())
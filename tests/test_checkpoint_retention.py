@@ -0,0 +1,101 @@
+"""
+Checkpoint retention: one worker at a time, via a session advisory lock
+"""
+import asyncio
+from contextlib import asynccontextmanager
+import psycopg
+import agent.checkpoint_retention as checkpoint_retention
+from agent.checkpoint_retention import ADVISORY_LOCK_KEY, CheckpointRetention
+from config.conf import settings
+
+
+class FakeCursor:
+    def __init__(self, row=None):
+        self.row = row
+
+    async def fetchone(self):
+        return self.row
+
+    async def fetchall(self):
+        return []
+
+
+class FakeLockConnection:
+    def __init__(self, log, locked):
+        self.log = log
+        self.locked = locked
+
+    async def execute(self, sql, params=None):
+        self.log.append(("lock_conn", sql.split("(")[0], params))
+        return FakeCursor({"locked": self.locked})
+
+    async def close(self):
+        self.log.append(("lock_conn", "close", None))
+
+
+class FakePool:
+    def __init__(self, log):
+        self.log = log
+
+    @asynccontextmanager
+    async def connection(self):
+        log = self.log
+
+        class Connection:
+            async def execute(self, sql, params=None):
+                log.append(("pool", "select threads", None))
+                return FakeCursor()
+
+        yield Connection()
+
+
+def _setup(monkeypatch, locked=True):
+    log = []
+
+    async def connect(url, **kwargs):
+        assert kwargs["autocommit"] is True
+        log.append(("connect", url, None))
+        return FakeLockConnection(log, locked)
+
+    async def get_pool():
+        return FakePool(log)
+
+    monkeypatch.setattr(psycopg.AsyncConnection, "connect", connect)
+    monkeypatch.setattr(checkpoint_retention, "get_connection_pool", get_pool)
+    monkeypatch.setattr(settings, "POSTGRES_DB_URL", "postgresql://app@pooler/db")
+    monkeypatch.setattr(settings, "POSTGRES_DIRECT_URL", None)
+    monkeypatch.setattr(settings, "POSTGRES_PGBOUNCER", False)
+    return log
+
+
+def test_lock_is_held_on_its_own_connection_and_released(monkeypatch):
+    log = _setup(monkeypatch)
+    report = asyncio.run(CheckpointRetention(ttl_days=30, keep_latest=True).run_once())
+
+    assert report.skipped is None
+    assert log[0] == ("connect", "postgresql://app@pooler/db", None)
+    assert log[1] == ("lock_conn", "SELECT pg_try_advisory_lock", (ADVISORY_LOCK_KEY,))
+    # Both sweeps ran on pooled connections while the lock was held
+    assert [entry[0] for entry in log[2:-2]] == ["pool", "pool"]
+    assert log[-2] == ("lock_conn", "SELECT pg_advisory_unlock", (ADVISORY_LOCK_KEY,))
+    assert log[-1] == ("lock_conn", "close", None)
+
+
+def test_skips_when_another_worker_holds_the_lock(monkeypatch):
+    log = _setup(monkeypatch, locked=False)
+    report = asyncio.run(CheckpointRetention().run_once())
+
+    assert report.skipped == "another worker is running retention"
+    assert not [entry for entry in log if entry[0] == "pool"]
+    assert log[-1] == ("lock_conn", "close", None)
+
+
+def test_pgbouncer_needs_a_direct_url(monkeypatch):
+    log = _setup(monkeypatch)
+    monkeypatch.setattr(settings, "POSTGRES_PGBOUNCER", True)
+    assert asyncio.run(CheckpointRetention().run_once()).skipped
+    assert log == []
+
+    monkeypatch.setattr(settings, "POSTGRES_DIRECT_URL", "postgresql://app@db-host/db")
+    assert asyncio.run(CheckpointRetention().run_once()).skipped is None
+    assert log[0] == ("connect", "postgresql://app@db-host/db", None)
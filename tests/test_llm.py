@@ -0,0 +1,61 @@
+"""
+Hedged LLM requests
+"""
+import asyncio
+from langchain_core.messages import AIMessage
+import agent.llm as llm
+from config.conf import settings
+
+
+def _slow_model(monkeypatch, calls, seconds=1.0):
+    async def call_model(config, model, prompt, priority, stats):
+        calls.append(model)
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            calls.append(f"cancelled {model}")
+            raise
+        return AIMessage(content=model)
+
+    monkeypatch.setattr(llm, "_call_model", call_model)
+    monkeypatch.setattr(settings, "LLM_HEDGE_DEFAULT_DELAY_MS", 200)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_DELAY_MS", 50)
+
+
+def test_cancelling_the_caller_during_the_hedge_delay_cancels_the_primary(monkeypatch):
+    calls = []
+    _slow_model(monkeypatch, calls)
+
+    async def run():
+        task = asyncio.create_task(llm._hedged_call(llm.get_llm_profile("tier1"), "hi", None, {}))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0)
+        # Checked before asyncio.run() cancels leftover tasks on exit
+        return list(calls)
+
+    model = llm.get_llm_profile("tier1").model
+    assert asyncio.run(run()) == [model, f"cancelled {model}"]
+
+
+def test_streamed_calls_are_not_hedged(monkeypatch):
+    calls = []
+    _slow_model(monkeypatch, calls, seconds=0.3)
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_FALLBACK_MODEL", "fallback-model")
+
+    async def run():
+        streamed = await llm.invoke_llm("hi", profile="tier1", hedge=False)
+        hedged = await llm.invoke_llm("hi", profile="tier1")
+        return streamed, hedged
+
+    streamed, hedged = asyncio.run(run())
+    model = llm.get_llm_profile("tier1").model
+    assert streamed.content == model
+    assert calls[:1] == [model]
+    # The hedged call sent a fallback after the delay
+    assert "fallback-model" in calls[1:]
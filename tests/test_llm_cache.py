@@ -0,0 +1,67 @@
+"""
+LLM response cache: memory-tier expiry and Postgres purging
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from agent.llm_cache import PURGE_BATCH_SIZE, LLMResponseCache, PostgresCacheBackend
+from utils.cache import TTLLRUCache
+
+
+def test_zero_ttl_expires_immediately():
+    cache = TTLLRUCache()
+    cache.set("key", "value", ttl=0)
+    assert cache.get("key") is None
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+
+def test_backend_hit_without_remaining_ttl_is_not_promoted():
+    class Backend:
+        async def get(self, key):
+            return "cached answer", 0.0
+
+    cache = LLMResponseCache(max_entries=10, backend=Backend())
+    assert asyncio.run(cache.get("key")) == "cached answer"
+    assert len(cache.memory) == 0
+
+
+class FakePool:
+    """Records statements; each purge batch removes `expired` rows up to the batch size."""
+
+    def __init__(self, expired: int):
+        self.expired = expired
+        self.statements = []
+
+    @asynccontextmanager
+    async def connection(self):
+        async def execute(sql, params=None):
+            self.statements.append(sql)
+            rowcount = 0
+            if "DELETE" in sql:
+                rowcount = min(self.expired, params[0])
+                self.expired -= rowcount
+            return SimpleNamespace(rowcount=rowcount)
+
+        yield SimpleNamespace(execute=execute)
+
+
+def test_writes_purge_expired_rows_at_most_once_per_interval():
+    pool = FakePool(expired=PURGE_BATCH_SIZE + 10)
+    backend = PostgresCacheBackend(purge_interval=3600)
+
+    async def get_pool():
+        return pool
+
+    backend._get_pool = get_pool
+
+    async def run():
+        for i in range(3):
+            await backend.set(f"key {i}", "router", "tier1", 60)
+        await asyncio.gather(*backend._background)
+
+    asyncio.run(run())
+    purges = [sql for sql in pool.statements if "DELETE" in sql]
+    assert len(purges) == 2  # one purge, in two batches
+    assert pool.expired == 0
+    assert backend.purged == PURGE_BATCH_SIZE + 10
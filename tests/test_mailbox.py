@@ -0,0 +1,72 @@
+"""
+Per-thread mailbox: runs on one thread never overlap
+"""
+import asyncio
+import agent.mailbox as mailbox_module
+from agent.mailbox import ThreadMailbox
+
+
+def _fake_agent(log):
+    active = {"now": 0, "max": 0}
+
+    async def main_agent(query, thread_id, **kwargs):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        log.append(query)
+        return {"answer": f"re: {query}", "route": "conversation"}
+
+    return main_agent, active
+
+
+def test_concurrent_runs_on_one_thread_are_serialized(monkeypatch):
+    log = []
+    fake, active = _fake_agent(log)
+    monkeypatch.setattr(mailbox_module, "main_agent", fake)
+
+    async def call(mailbox, i):
+        # Staggered, so later callers arrive while an earlier one is still queued
+        await asyncio.sleep(i * 0.015)
+        return await mailbox.run("t1", f"message {i}")
+
+    async def run():
+        mailbox = ThreadMailbox()
+        results = await asyncio.gather(*(call(mailbox, i) for i in range(3)))
+        assert [r["answer"] for r in results] == ["re: message 0", "re: message 1", "re: message 2"]
+        assert mailbox.stats()["active_threads"] == 0
+        return mailbox
+
+    mailbox = asyncio.run(run())
+    assert active["max"] == 1
+    assert mailbox.counters["runs"] == 3
+    assert mailbox.counters["coalesced"] == 0
+
+
+def test_streaming_and_rest_runs_share_the_thread_lock(monkeypatch):
+    log = []
+    fake, active = _fake_agent(log)
+    monkeypatch.setattr(mailbox_module, "main_agent", fake)
+
+    async def stream(mailbox, query, delay):
+        await asyncio.sleep(delay)
+        async with mailbox.serialized("t1"):
+            await fake(query, "t1")
+
+    async def rest(mailbox, query, delay):
+        await asyncio.sleep(delay)
+        await mailbox.run("t1", query)
+
+    async def run():
+        mailbox = ThreadMailbox(debounce=0)
+        await asyncio.gather(
+            stream(mailbox, "streamed 0", 0),
+            rest(mailbox, "rest", 0.005),
+            stream(mailbox, "streamed 1", 0.025),
+            mailbox.submit("t1", "webhook"),
+        )
+        assert mailbox.stats()["active_threads"] == 0
+
+    asyncio.run(run())
+    assert active["max"] == 1
+    assert sorted(log) == ["rest", "streamed 0", "streamed 1", "webhook"]
@@ -0,0 +1,64 @@
+"""
+Prompt prefixes stay byte-stable across requests (provider-side prefix caching)
+"""
+import hashlib
+import string
+import pytest
+from agent.prompts import PROMPTS, check_prefix_stability
+
+REQUESTS = [
+    {
+        "business_name": "Joe's Coffee",
+        "chat_history": "User: hi\nAssistant: Hello! How can I help?",
+        "conversation_history": "User: can someone call me?",
+        "user_query": "Do you deliver to Lekki?",
+        "user_message": "Do you deliver to Lekki?",
+        "context": "Deliveries run 9am-5pm within Lagos Island.",
+        "preferred_contact_method": "phone",
+        "user_email": "not provided",
+        "user_phone": "+2348012345678",
+        "summary": "",
+        "transcript": "User: hi",
+    },
+    {
+        "business_name": "Ada's Bakery & {Cakes}",
+        "chat_history": "",
+        "conversation_history": "User: I'd like a wedding cake\nAssistant: Lovely! How should we reach you?",
+        "user_query": "What time do you close on Sundays? 🎂",
+        "user_message": "What time do you close on Sundays? 🎂",
+        "context": "Open Mon-Sat 8am-8pm, Sundays 12pm-6pm.",
+        "preferred_contact_method": "email",
+        "user_email": "ada@example.com",
+        "user_phone": "not provided",
+        "summary": "The customer ordered a cake for Saturday.",
+        "transcript": "User: make it chocolate\nAssistant: Noted!",
+    },
+]
+
+
+def _fields(template):
+    return {name for _, name, _, _ in string.Formatter().parse(template.user) if name}
+
+
+@pytest.mark.parametrize("name", sorted(PROMPTS))
+def test_system_prefix_is_identical_across_requests(name):
+    template = PROMPTS[name]
+    rendered = [
+        template.render(**{field: values[field] for field in _fields(template)})
+        for values in REQUESTS
+    ]
+
+    prefixes = [messages[0].content.encode("utf-8") for messages in rendered]
+    assert prefixes[0] == prefixes[1]
+    assert hashlib.sha256(prefixes[0]).hexdigest() == template.prefix_digest
+    # The dynamic values only ever reach the user message
+    assert rendered[0][1].content != rendered[1][1].content
+
+
+def test_every_template_field_is_covered():
+    for template in PROMPTS.values():
+        assert _fields(template) <= set(REQUESTS[0])
+
+
+def test_check_prefix_stability_reports_every_template():
+    assert set(check_prefix_stability()) == set(PROMPTS)
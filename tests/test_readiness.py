@@ -0,0 +1,46 @@
+"""
+Readiness: warm-up steps that fail at boot are retried in the background
+"""
+import asyncio
+import agent.graph_builder.compiled_agent as compiled_agent
+import config.readiness as readiness
+
+
+def test_slow_graph_build_completes_in_the_background(monkeypatch):
+    attempts = {"n": 0}
+
+    async def ok():
+        pass
+
+    async def build_agent_graph():
+        attempts["n"] += 1
+        if attempts["n"] == 1:
+            raise ConnectionError("postgres down")
+        # Slower than the probe timeout, like checkpointer.setup() on a slow database
+        await asyncio.sleep(0.3)
+        compiled_agent.compiled_agent = object()
+        return compiled_agent.compiled_agent
+
+    monkeypatch.setattr(readiness, "WARMUP_STEPS", {"graph": readiness._warm_graph})
+    monkeypatch.setattr(readiness, "PROBES", {"mongo": ok, "graph": readiness._probe_graph})
+    monkeypatch.setattr(compiled_agent, "compiled_agent", None)
+    monkeypatch.setattr(compiled_agent, "build_agent_graph", build_agent_graph)
+
+    async def run():
+        tracker = readiness.Readiness(cache_seconds=0.05, timeout=0.1)
+        await tracker.warm_up()
+        statuses = []
+        for _ in range(10):
+            result = await tracker.check()
+            statuses.append(result["status"])
+            if result["status"] == "ready":
+                break
+            await asyncio.sleep(0.1)
+        await tracker.stop()
+        return statuses, result
+
+    statuses, result = asyncio.run(run())
+    assert statuses[0] == "not_ready"
+    assert statuses[-1] == "ready"
+    assert result["warmup"]["graph"]["ok"] is True
+    assert attempts["n"] == 2
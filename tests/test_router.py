@@ -0,0 +1,26 @@
+"""
+Supervisor routing: the LLM classifier covers fast-router failures
+"""
+import asyncio
+from langchain_core.messages import HumanMessage
+import agent.sub_agent.fast_router as fast_router
+import agent.sub_agent.router as router
+from config.conf import settings
+
+
+def test_fast_router_load_failure_falls_back_to_llm(monkeypatch):
+    def broken_embeddings():
+        raise ImportError("No module named 'langchain_huggingface'")
+
+    async def llm_route(query):
+        return "tier1"
+
+    monkeypatch.setattr(settings, "ROUTER_FAST_ENABLED", True)
+    monkeypatch.setattr(settings, "ROUTER_RESPOND_ENABLED", False)
+    monkeypatch.setattr(fast_router, "_fast_router", None)
+    monkeypatch.setattr("vector_db.embedding.get_embeddings", broken_embeddings)
+    monkeypatch.setattr(router, "llm_route", llm_route)
+
+    update = asyncio.run(router.route_query({"messages": [HumanMessage(content="what are your hours?")]}))
+    assert update["route"] == "tier1"
+    assert fast_router.peek_fast_router() is None
@@ -0,0 +1,71 @@
+"""
+Lightweight in-process metrics (latency percentiles and counters)
+"""
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any, Optional
+
+
+class LatencyTracker:
+    """
+    Rolling latency samples (in milliseconds) per key.
+
+    Keeps the last `window` samples for each key so percentiles reflect
+    recent behaviour, plus lifetime call and error counts.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, key: str, elapsed_ms: float, error: bool = False):
+        """Record one observation for `key`."""
+        with self._lock:
+            self._counts[key] += 1
+            if error:
+                self._errors[key] += 1
+            else:
+                self._samples[key].append(elapsed_ms)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        """Return the `pct` percentile (0-100) of recent samples, or None if empty."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        index = max(0, math.ceil(pct / 100 * len(samples)) - 1)
+        return samples[index]
+
+    def sample_count(self, key: str) -> int:
+        """Number of recent successful samples held for `key`."""
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Summary per key: counts, average and p50/p95/p99 latency."""
+        with self._lock:
+            keys = list(self._counts.keys())
+
+        summary = {}
+        for key in keys:
+            with self._lock:
+                samples = list(self._samples.get(key, ()))
+                count = self._counts[key]
+                errors = self._errors[key]
+            summary[key] = {
+                "count": count,
+                "errors": errors,
+                "avg_ms": round(sum(samples) / len(samples), 1) if samples else None,
+                "p50_ms": self._round(self.percentile(key, 50)),
+                "p95_ms": self._round(self.percentile(key, 95)),
+                "p99_ms": self._round(self.percentile(key, 99))
+            }
+        return summary
+
+    @staticmethod
+    def _round(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
@@ -1,12 +1,15 @@
+from functools import lru_cache
 from langchain_huggingface import HuggingFaceEmbeddings
 import logging
 from config.conf import settings
 
 logger = logging.getLogger("embeddings")
 
+@lru_cache(maxsize=1)
 def get_embeddings():
     """
     Get HuggingFace embedding model.
+    Loaded once per process and shared (retrieval, fast router).
     """
     try:
         model_name = settings.HUGGINGFACE_EMBED_MODEL
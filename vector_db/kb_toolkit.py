@@ -17,6 +17,9 @@ def fetch_businesses_from_mongo(
     """
     Fetch business data from MongoDB.
     
+    Uses the blocking client: the embedding pipeline runs in worker threads
+    (asyncio.to_thread from the routes) or from the CLI.
+    
     Args:
         limit: Maximum number of businesses to fetch
         business_id: Specific business ID to fetch
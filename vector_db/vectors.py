@@ -1,5 +1,6 @@
 import logging
 import hashlib
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone, ServerlessSpec
 from config.conf import settings
@@ -56,3 +57,13 @@ class VectorPipeline:
         except Exception as e:
             logger.error(f"❌ Failed to get index stats: {str(e)}")
             return {}
+
+
+@lru_cache(maxsize=1)
+def get_vector_pipeline() -> VectorPipeline:
+    """
+    Shared pipeline for queries.
+    Created once per process so the Pinecone client and the index check
+    are not repeated on every retrieval.
+    """
+    return VectorPipeline()